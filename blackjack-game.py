@@ -5,27 +5,57 @@ lose no matter what cards bot had. If bot's deck exceeds 21, you win. If no one'
 with higher deck value wins.
 """
 
-from random import choice
+import argparse
+import asyncio
+import math
+import os
+import sys
+import time
+import tracemalloc
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from functools import lru_cache
+from random import Random, randrange
+
+try:
+    import numpy as np
+except ImportError:  # numpy is needed only for the simulation (simulate_hands)
+    np = None
 
 
 class Card:
     """
-    Create a new card
+    Card as a small int 0 - 51: suit * 13 + rank (indexes into Card.suits and Card.ranks). Hands keep only the
+    ints (see Hand), Card gives their names and values.
+
+    Args: number - card as a small int, None for a random card
     """
+    __slots__ = ('number',)
+
     suits = ('Hearts', 'Diamonds', 'Spades', 'Clubs')
     ranks = ('Two', 'Three', 'Four', 'Five', 'Six', 'Seven', 'Eight', 'Nine', 'Ten', 'Jack', 'Queen', 'King', 'Ace')
-    values = {'Two': 2, 'Three': 3, 'Four': 4, 'Five': 5, 'Six': 6, 'Seven': 7, 'Eight': 8, 'Nine': 9, 'Ten': 10,
-              'Jack': 10, 'Queen': 10, 'King': 10, 'Ace': 11}
+    values = (2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10, 11)  # by index of rank
 
-    def __init__(self):
+    def __init__(self, number=None):
+
+        self.number = randrange(52) if number is None else number
+
+    @property
+    def suit(self):
+
+        return self.suits[self.number // 13]
+
+    @property
+    def rank(self):
 
-        self.suit = choice(self.suits)
-        self.rank = choice(self.ranks)
+        return self.ranks[self.number % 13]
 
     def get_card_value(self):
         """ return the value of card """
 
-        return self.values[self.rank]
+        return self.values[self.number % 13]
 
     def get_card(self):
         """ return whole card """
@@ -33,55 +63,203 @@ class Card:
         return [self.rank, self.suit]
 
 
+ACE = 12  # index of ace in Card.ranks
+HARD_VALUES = (2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10, 1)  # values of ranks of Card.ranks, ace counted 1
+
+
+class CardCounter:
+    """
+    State of the shoe as its cards are dealt: counts of ranks left (in order of RANK_VALUES), number of cards
+    left and running count of a card counting system (see COUNT_SYSTEMS). Every dealt card updates it in O(1),
+    dealt cards are never counted again.
+
+    Args: decks - decks in the shoe
+          system - name of the counting system
+    """
+    __slots__ = ('decks', 'system', 'tags', 'counts', 'cards_left', 'running_count')
+
+    def __init__(self, decks=1, system='hi-lo'):
+
+        if system not in COUNT_SYSTEMS:
+            raise ValueError(f"Unknown counting system {system}, use one of: {', '.join(COUNT_SYSTEMS)}")
+
+        self.decks = decks
+        self.system = system
+        self.tags = COUNT_SYSTEMS[system]
+        self.reset()
+
+    def reset(self):
+        """ All cards are back in the shoe (it was shuffled) """
+
+        self.counts = [4 * self.decks] * 8 + [16 * self.decks, 4 * self.decks]
+        self.cards_left = 52 * self.decks
+        self.running_count = 0
+
+    def see(self, card):
+        """ Counts a dealt card (small int, see Card) """
+
+        rank = COMPOSITION_RANKS[card % 13]
+        self.counts[rank] -= 1
+        self.cards_left -= 1
+        self.running_count += self.tags[rank]
+
+    def true_count(self):
+        """ Running count per deck left in the shoe """
+
+        return self.running_count * 52 / self.cards_left if self.cards_left else 0.0
+
+    def composition(self):
+
+        return tuple(self.counts)
+
+    def report(self):
+
+        return f"running count {self.running_count:+d}, true count {self.true_count():+.1f} ({self.system})"
+
+
+class Shoe:
+    """
+    Shoe of 1 - 8 decks shared by player and bot. Cards are small ints: suit * 13 + rank (indexes into Card.suits
+    and Card.ranks), the same 52 numbers for every deck.
+
+    The shoe is shuffled once and cards are dealt by moving an index, so dealing a card is O(1) and cards run out
+    as in a casino. The cut card is placed at penetration (fraction of the shoe dealt before it's reshuffled),
+    the shoe is reshuffled between games once the cut card was reached. counter (CardCounter with the given
+    counting system) sees every dealt card.
+    """
+
+    def __init__(self, decks=1, penetration=0.75, rng=None, system='hi-lo'):
+
+        if not 1 <= decks <= 8:
+            raise ValueError("Shoe can have 1 - 8 decks")
+
+        self.decks = decks
+        self.rng = rng or Random()
+        self.counter = CardCounter(decks, system)
+        self.cards = list(range(52)) * decks
+        self.cut_card = max(1, int(len(self.cards) * penetration))
+        self.position = 0  # index of the next card to deal
+        self.shuffle()
+
+    def shuffle(self):
+        """ Puts all cards back to the shoe and shuffles them """
+
+        self.rng.shuffle(self.cards)
+        self.position = 0
+        self.counter.reset()
+
+    def deal(self):
+        """
+        Deal the next card, shoe is reshuffled if it runs out of cards in the middle of the game
+
+        :return: card as a small int
+        """
+
+        if self.position == len(self.cards):
+            self.shuffle()
+
+        card = self.cards[self.position]
+        self.position += 1
+        self.counter.see(card)
+        return card
+
+    def needs_shuffle(self):
+        """ True when the cut card was reached """
+
+        return self.position >= self.cut_card
+
+    def cards_left(self):
+
+        return len(self.cards) - self.position
+
+    def composition(self):
+        """ Counts of cards left in the shoe by rank in order of RANK_VALUES (tens to kings are one rank) """
+
+        return self.counter.composition()
+
+
+class Hand:
+    """
+    Cards of one side as ints (see Card). Hard total (aces counted 1) and number of aces are updated with every
+    card, so the best total is O(1) and an ace counted 11 drops to 1 whenever a later card would bust the hand
+    (A, 5 is 16 and after 10 it's 16 again, not 26).
+    """
+    __slots__ = ('cards', 'hard_total', 'soft_aces')
+
+    def __init__(self):
+
+        self.cards = []
+        self.hard_total = 0
+        self.soft_aces = 0  # aces in the hand, one of them counts 11 if the hand doesn't bust
+
+    def add(self, card):
+
+        rank = card % 13
+        self.cards.append(card)
+        self.hard_total += HARD_VALUES[rank]
+        if rank == ACE:
+            self.soft_aces += 1
+
+    def total(self):
+        """ best total of the hand """
+
+        if self.soft_aces and self.hard_total <= 11:
+            return self.hard_total + 10
+        return self.hard_total
+
+    def state(self):
+        """ :return: hard total, True if there's an ace (hand as Solver takes it) """
+
+        return self.hard_total, self.soft_aces > 0
+
+
 class Deck:
     """
     class that holds all cards stores their values, checks if the game has already ended.
 
     Args: has_move - who is on move 1 - human, 0 - bot
+          shoe - Shoe the cards are dealt from (shared by both sides), new one deck shoe if not given
     """
+    __slots__ = ('has_move', 'shoe', 'player_hand', 'bot_hand')
 
-    def __init__(self, has_move):
+    def __init__(self, has_move, shoe=None):
 
         self.has_move = has_move
-        self.player_deck_val = 0
-        self.bot_deck_val = 0
-        self.player_cards = []
-        self.bot_cards = []
+        self.shoe = shoe if shoe is not None else Shoe()
+        self.player_hand = Hand()
+        self.bot_hand = Hand()
+
+    @property
+    def player_deck_val(self):
+
+        return self.player_hand.total()
+
+    @property
+    def bot_deck_val(self):
+
+        return self.bot_hand.total()
+
+    @property
+    def player_cards(self):
+
+        return [Card(card).get_card() for card in self.player_hand.cards]
+
+    @property
+    def bot_cards(self):
+
+        return [Card(card).get_card() for card in self.bot_hand.cards]
 
     def hit(self):
         """
         Give new card
 
-        :return: updates player_deck_val and bot_deck_val
+        :return: updates player_hand or bot_hand (who has move)
         """
 
-        # create a new card
-        while True:
-            card = Card()
-            # prevent having card already used
-            if card.get_card() not in self.player_cards and card.get_card() not in self.bot_cards:
-                break
-
-        card_value = card.get_card_value()
-
-        # add card to deck
         if self.has_move == 1:
-            self.player_cards.append(card.get_card())
+            self.player_hand.add(self.shoe.deal())
         else:
-            self.bot_cards.append(card.get_card())
-
-        # add card value to deck
-        if self.has_move == 1:
-            # Ace can have values: 1 or 11
-            if card_value == 11 and self.player_deck_val + 11 > 21:
-                self.player_deck_val += 1
-            else:
-                self.player_deck_val += card_value
-        else:
-            if card_value == 11 and self.bot_deck_val + 11 > 21:
-                self.bot_deck_val += 1
-            else:
-                self.bot_deck_val += card_value
+            self.bot_hand.add(self.shoe.deal())
 
     def check_lose(self):
         """ Checks if someones deck exceeded 21, therefore whenever he lost """
@@ -118,10 +296,25 @@ class Deck:
             print()
 
 
-def play_game(num_of_player_wins, num_of_bot_wins):
-    """ Simulates game between opponents, initializes game and handles game logic"""
+def play_game(num_of_player_wins, num_of_bot_wins, shoe=None, solver=None, hints=False, smart_bot=False,
+              history=None):
+    """
+    Simulates game between opponents, initializes game and handles game logic
+
+    shoe: Shoe used for the whole session, new one deck shoe if not given
+    solver: Solver for hints and smart bot (kept for the whole session, its caches too)
+    hints: show expected values of hit and stay (and which one is better) before player decides
+    smart_bot: bot decides with solver knowing player's total, instead of hitting below 17
+    history: HandHistory the hand is recorded to
+    """
 
     player_lost = False
+    decisions = []  # True - hit, False - stay
+
+    def record(outcome):
+
+        if history is not None:
+            history.record(player.player_hand.cards, decisions, bot.bot_hand.cards, outcome)
 
     def get_input():
         """
@@ -130,6 +323,11 @@ def play_game(num_of_player_wins, num_of_bot_wins):
         :return True - get new input, False - stop asking for input
         """
 
+        if hints:
+            decision, hit_ev, stand_ev = solver.decide(shoe.composition(), *player.player_hand.state())
+            print(f"Hint: {decision} (expected value of hit {hit_ev:+.3f}, stay {stand_ev:+.3f}), {solver.report()}")
+            print(f"Shoe: {shoe.cards_left()} cards left, {shoe.counter.report()}")
+
         inp = ''
         while inp != "hit" and inp != "stay":
             inp = input("Do you want to hit or stay? (hit / stay): ").lower().strip()
@@ -152,6 +350,14 @@ def play_game(num_of_player_wins, num_of_bot_wins):
 
         return num_of_player_wins, num_of_bot_wins
 
+    def bot_hits():
+        """ True if bot takes another card """
+
+        if not smart_bot:
+            return bot.bot_deck_val < 17  # bot stops hitting when it has 17 and more deck value
+
+        return solver.bot_should_hit(shoe.composition(), *bot.bot_hand.state(), player.player_deck_val)
+
     def end_game():
 
         print()
@@ -167,8 +373,16 @@ def play_game(num_of_player_wins, num_of_bot_wins):
             print("C'mon, do you really want to be beat by a bot?")
 
     # initialize game
-    player = Deck(1)
-    bot = Deck(0)
+    if solver is None and (hints or smart_bot):
+        solver = Solver()
+    if shoe is None:
+        shoe = Shoe()
+    elif shoe.needs_shuffle():
+        print("Cut card reached, shuffling the shoe.\n")
+        shoe.shuffle()
+
+    player = Deck(1, shoe)
+    bot = Deck(0, shoe)
     player.hit()
     player.hit()
     player.print_cards()
@@ -179,14 +393,17 @@ def play_game(num_of_player_wins, num_of_bot_wins):
 
     # player plays
     while get_input():
+        decisions.append(True)
         player.hit()
         player.print_cards()
 
         if player.check_lose():  # check if player's deck exceeded 21 (he lost)
             num_of_bot_wins += 1
             print("Player's deck exceeded 21, bot won the game")
+            record(-1)
             end_game()
             return num_of_player_wins, num_of_bot_wins
+    decisions.append(False)
 
     # bot plays
     if not player_lost:  # it's useless for bot to play if player had already lost
@@ -195,7 +412,7 @@ def play_game(num_of_player_wins, num_of_bot_wins):
         bot.hit()
         bot.hit()
 
-        while bot.bot_deck_val < 17:  # bot stops hitting when it has 17 and more deck value
+        while bot_hits():
             bot.hit()
 
             if bot.check_lose():  # check if bot's deck exceeded 21 (he lost)
@@ -203,6 +420,7 @@ def play_game(num_of_player_wins, num_of_bot_wins):
                 print("Bot cards:")
                 bot.print_cards()
                 print("Bot's deck exceeded 21, player won the game")
+                record(1)
                 end_game()
                 return num_of_player_wins, num_of_bot_wins
 
@@ -218,22 +436,1563 @@ def play_game(num_of_player_wins, num_of_bot_wins):
     bot.print_cards()
 
     num_of_player_wins, num_of_bot_wins = declare_winner(num_of_player_wins, num_of_bot_wins)
+    record((player.player_deck_val > bot.bot_deck_val) - (player.player_deck_val < bot.bot_deck_val))
 
     end_game()
 
     return num_of_player_wins, num_of_bot_wins
 
 
-if __name__ == '__main__':
+def _string_hand(cards):
+    """
+    Hand as Deck kept it before Hand (for benchmark_hands): [rank, suit] lists of names, value looked up by name
+    and ace's value decided when it's drawn.
+    """
+
+    values = _STRING_VALUES
+    hand = []
+    total = 0
+    for card in cards:
+        rank, suit = Card.ranks[card % 13], Card.suits[card // 13]
+        hand.append([rank, suit])
+        value = values[rank]
+        total += 1 if value == 11 and total + 11 > 21 else value
+
+    return hand, total
+
+
+def _int_hand(cards):
+
+    hand = Hand()
+    for card in cards:
+        hand.add(card)
+
+    return hand, hand.total()
+
+
+_STRING_VALUES = dict(zip(Card.ranks, Card.values))
+
+
+def benchmark_hands(hands=100000, decks=6, seed=0):
+    """
+    Compares hands of [rank, suit] strings with Hand on the same cards: time to build a hand (cards are dealt
+    until the hand has 17 or more, dealing isn't timed) and memory the kept hands take (traced by tracemalloc).
+
+    :return: dict: name of representation -> (microseconds per hand, bytes per hand)
+    """
+
+    shoe = Shoe(decks, rng=Random(seed))
+    deals = []
+    for _ in range(hands):
+        hand = Hand()
+        while hand.total() < 17:
+            if shoe.needs_shuffle():
+                shoe.shuffle()
+            hand.add(shoe.deal())
+        deals.append(hand.cards)
+
+    results = {}
+    for name, build in (('strings', _string_hand), ('ints', _int_hand)):
+        start = time.perf_counter()
+        kept = [build(cards) for cards in deals]
+        seconds = time.perf_counter() - start
+        del kept
+
+        tracemalloc.start()
+        kept = [build(cards) for cards in deals]
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del kept
+
+        results[name] = (seconds / hands * 10 ** 6, size / hands)
+
+    return results
+
+
+RANK_VALUES = (2, 3, 4, 5, 6, 7, 8, 9, 10, 1)  # hard values of ranks in composition of the shoe (10 = ten to king)
+COMPOSITION_RANKS = (0, 1, 2, 3, 4, 5, 6, 7, 8, 8, 8, 8, 9)  # index to RANK_VALUES of every rank of Card.ranks
+Z_95 = 1.96  # confidence intervals are 95 %
+COUNT_SYSTEMS = {  # card counting systems: tags of ranks in order of RANK_VALUES (2 - 9, ten to king, ace)
+    'hi-lo': (1, 1, 1, 1, 1, 0, 0, 0, -1, -1),
+    'ko': (1, 1, 1, 1, 1, 1, 0, 0, -1, -1),
+    'hi-opt-1': (0, 1, 1, 1, 1, 0, 0, 0, -1, 0),
+    'omega-2': (1, 1, 2, 2, 2, 1, 0, -1, -2, 0),
+    'zen': (1, 1, 2, 2, 2, 1, 0, 0, -2, -1),
+}
+
+
+def _draw_cards(rng, counts, left, full, shoes, running=None, tags=None):
+    """
+    Draws one card in each of the given shoes: uniformly random card of the remaining composition, which is the
+    same as dealing the next card of the shuffled shoe. Empty shoes are reshuffled first. Running counts of the
+    shoes (if given) are updated with tags of the drawn ranks.
+
+    :return: ranks drawn (indexes to RANK_VALUES)
+    """
+
+    empty = shoes[left[shoes] == 0]
+    if empty.size:
+        counts[empty] = full
+        left[empty] = full.sum()
+        if running is not None:
+            running[empty] = 0
+
+    cards = (rng.random(shoes.size) * left[shoes]).astype(np.int32)
+    ranks = (counts[shoes].cumsum(axis=1) <= cards[:, None]).sum(axis=1)
+    counts[shoes, ranks] -= 1
+    left[shoes] -= 1
+    if running is not None:
+        running[shoes] += tags[ranks]
+
+    return ranks
+
+
+def _play_hands(rng, counts, left, full, shoes, stand_on, values, running=None, tags=None):
+    """
+    Deals 2 cards in each of the given shoes and hits while the best total is below stand_on (one total for all
+    shoes or array with total of every shoe).
+
+    :return: best totals of the hands (ace counts 11 if it doesn't bust the hand)
+    """
+
+    hard = np.zeros(len(counts), dtype=np.int32)
+    aces = np.zeros(len(counts), dtype=bool)
+    stand_on = np.broadcast_to(stand_on, hard.shape)
+    drawing = shoes
+    cards = 0
+
+    while drawing.size:
+        ranks = _draw_cards(rng, counts, left, full, drawing, running, tags)
+        hard[drawing] += values[ranks]
+        aces[drawing] |= ranks == 9
+        cards += 1
+
+        if cards >= 2:
+            best = hard[drawing] + 10 * (aces[drawing] & (hard[drawing] <= 11))
+            drawing = drawing[best < stand_on[drawing]]
+
+    return hard + 10 * (aces & (hard <= 11))
+
+
+class HandStats:
+    """
+    Streaming aggregate of simulated hands: counts of results, units wagered and mean / variance of the player's
+    win per hand (+bet, 0, -bet, bet is 1 unit unless the player bets by the count). Batches of hands and other
+    HandStats are merged with Chan's parallel formula, so no results of single hands are kept.
+    """
+
+    def __init__(self):
+
+        self.hands = 0
+        self.wins = 0
+        self.losses = 0
+        self.player_busts = 0
+        self.bot_busts = 0
+        self.wagered = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # sum of squared differences from the mean
+        self.seconds = 0.0
+
+    def _merge_moments(self, hands, mean, m2):
+
+        total = self.hands + hands
+        delta = mean - self.mean
+        self.mean += delta * hands / total
+        self.m2 += m2 + delta ** 2 * self.hands * hands / total
+        self.hands = total
+
+    def add_hands(self, wins, losses, pushes, player_busts, bot_busts, won=None, squares=None, wagered=None):
+        """
+        Adds a batch of hands given by counts of their results. If bets weren't 1 unit, also by won (sum of
+        player's wins, losses negative), squares (sum of squared wins) and wagered (sum of bets) of the batch.
+        """
+
+        hands = wins + losses + pushes
+        if not hands:
+            return
+
+        if won is None:
+            won, squares, wagered = wins - losses, wins + losses, hands
+        mean = won / hands
+        self._merge_moments(hands, mean, squares - hands * mean ** 2)
+        self.wagered += wagered
+        self.wins += wins
+        self.losses += losses
+        self.player_busts += player_busts
+        self.bot_busts += bot_busts
+
+    def merge(self, other):
+
+        if other.hands:
+            self._merge_moments(other.hands, other.mean, other.m2)
+            self.wagered += other.wagered
+            self.wins += other.wins
+            self.losses += other.losses
+            self.player_busts += other.player_busts
+            self.bot_busts += other.bot_busts
+        self.seconds += other.seconds
+
+    def variance(self):
+
+        return self.m2 / (self.hands - 1) if self.hands > 1 else 0.0
+
+    def results(self):
+        """
+        :return: dictionary with hands, wins, losses, pushes, player_busts, bot_busts, their rates, edge (player's
+                 average win per hand), 95 % confidence intervals (*_ci, +-), average_bet, edge_per_bet (win per
+                 unit wagered), seconds and hands_per_second
+        """
+
+        hands = max(self.hands, 1)
+        results = {'hands': self.hands, 'wins': self.wins, 'losses': self.losses,
+                   'pushes': self.hands - self.wins - self.losses, 'player_busts': self.player_busts,
+                   'bot_busts': self.bot_busts}
+        for name, count in (('win_rate', self.wins), ('loss_rate', self.losses), ('push_rate', results['pushes']),
+                            ('player_bust_rate', self.player_busts), ('bot_bust_rate', self.bot_busts)):
+            results[name] = count / hands
+
+        results['edge'] = self.mean
+        results['edge_ci'] = Z_95 * math.sqrt(self.variance() / hands)
+        results['average_bet'] = self.wagered / hands
+        results['edge_per_bet'] = self.mean * self.hands / self.wagered if self.wagered else 0.0
+        for name in ('win_rate', 'loss_rate', 'push_rate'):
+            results[name + '_ci'] = Z_95 * math.sqrt(results[name] * (1 - results[name]) / hands)
+        results['seconds'] = self.seconds
+        results['hands_per_second'] = self.hands / self.seconds if self.seconds else 0.0
+
+        return results
+
+
+def _simulate_stats(hands, stand_on, bot_stands_on, decks, penetration, shoes, seed, system='hi-lo', bet_spread=1,
+                    deviation=None):
+    """ Plays the simulation of simulate_hands, :return: HandStats """
+
+    start = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    values = np.array(RANK_VALUES, dtype=np.int32)
+    full = np.array([4 * decks] * 8 + [16 * decks, 4 * decks], dtype=np.int32)
+    shoes = max(1, min(shoes, hands))
+    counts = np.tile(full, (shoes, 1))
+    left = np.full(shoes, full.sum(), dtype=np.int32)
+    cut_card = full.sum() - int(full.sum() * penetration)  # cards left in the shoe when the cut card is reached
+    stats = HandStats()
+
+    counting = bet_spread > 1 or deviation is not None
+    tags = np.array(COUNT_SYSTEMS[system], dtype=np.int32) if counting else None
+    running = np.zeros(shoes, dtype=np.int32) if counting else None
+    player_stands_on = np.full(shoes, stand_on, dtype=np.int32)
+
+    for played in range(0, hands, shoes):
+        active = np.arange(min(shoes, hands - played))
+        reshuffle = left <= cut_card
+        counts[reshuffle] = full
+        left[reshuffle] = full.sum()
+
+        bets = None
+        if counting:
+            running[reshuffle] = 0
+            true_count = running[active] * 52 / left[active]
+            if bet_spread > 1:
+                bets = np.clip(np.floor(true_count), 1, bet_spread)  # 1 unit below true count 2, then true count
+            if deviation is not None:  # stand one total lower on high counts (more tens), one higher on low ones
+                player_stands_on[active] = stand_on - (true_count >= deviation) + (true_count <= -deviation)
+
+        player = _play_hands(rng, counts, left, full, active, player_stands_on, values, running, tags)[active]
+        busted = player > 21
+        bot = _play_hands(rng, counts, left, full, active[~busted], bot_stands_on, values, running, tags)[active]
+
+        won = ~busted & ((bot > 21) | (player > bot))
+        lost = busted | ((bot <= 21) & (player < bot))
+        wins = int(won.sum())
+        losses = int(lost.sum())
+        if bets is None:
+            stats.add_hands(wins, losses, active.size - wins - losses, int(busted.sum()),
+                            int((~busted & (bot > 21)).sum()))
+        else:
+            stats.add_hands(wins, losses, active.size - wins - losses, int(busted.sum()),
+                            int((~busted & (bot > 21)).sum()), float(bets[won].sum() - bets[lost].sum()),
+                            float((bets[won | lost] ** 2).sum()), float(bets.sum()))
+
+    stats.seconds = time.perf_counter() - start
+    return stats
+
+
+def simulate_hands(hands, stand_on=17, bot_stands_on=17, decks=1, penetration=0.75, shoes=100000, seed=None,
+                   system='hi-lo', bet_spread=1, deviation=None):
+    """
+    Monte Carlo simulation of the game with NumPy: plays hands in many shoes at once, one hand in every shoe per
+    round, so every shoe is dealt down to its cut card (and reshuffled) as in a real game. Player hits while
+    the total is below stand_on, bot while it's below bot_stands_on; ace counts 11 while it doesn't bust the hand.
+    Player who busts loses right away, otherwise higher total wins and equal totals are a push.
+
+    Every shoe keeps its running count (of the counting system, see COUNT_SYSTEMS) updated with each drawn card
+    when the player bets or plays by the count: bets are the true count before the hand (1 unit below true count
+    2, bet_spread units at most) and with deviation the player stands one total lower when the true count is
+    deviation or more and one higher when it's -deviation or less.
+
+    :param hands: number of hands to play
+    :param stand_on: player stands on this total and higher
+    :param bot_stands_on: bot stands on this total and higher (17 in play_game)
+    :param decks: decks in a shoe
+    :param penetration: fraction of the shoe dealt before it's reshuffled
+    :param shoes: number of shoes played at once (more is faster, but needs more memory)
+    :param seed: seed of numpy's random generator (int or numpy.random.SeedSequence)
+    :param system: card counting system
+    :param bet_spread: biggest bet (in units), 1 for flat betting
+    :param deviation: true count when the player stands one total lower, None for no deviations
+    :return: dictionary of results, see HandStats.results
+    """
+
+    if np is None:
+        raise RuntimeError("Simulation needs numpy")
+
+    return _simulate_stats(hands, stand_on, bot_stands_on, decks, penetration, shoes, seed, system, bet_spread,
+                           deviation).results()
+
+
+def _simulate_shard(hands, variant, seed):
+    """ Plays one shard of sweep in a worker process, :return: HandStats, pid of the worker """
+
+    return _simulate_stats(hands, variant['stand_on'], variant['bot_stands_on'], variant['decks'],
+                           variant['penetration'], 100000, seed, variant.get('system', 'hi-lo'),
+                           variant.get('bet_spread', 1), variant.get('deviation')), os.getpid()
+
+
+def sweep(variants, hands, workers=None, shard_hands=10 ** 6, seed=0):
+    """
+    Simulates every rule variant (see simulate_hands) in shards spread across a process pool.
+
+    Every variant gets a child of numpy.random.SeedSequence(seed) and each of its shards a child of that one, so
+    the results depend only on seed and shard_hands, not on the number of workers or on which worker played
+    the shard. Results of shards are merged in order into one HandStats per variant as they come.
+
+    :param variants: list of dictionaries with stand_on, bot_stands_on, decks and penetration (and optionally
+                     system, bet_spread and deviation)
+    :param hands: hands per variant
+    :param workers: number of worker processes, None for the number of CPUs
+    :param shard_hands: hands played by a worker at once
+    :param seed: seed of the whole sweep
+    :return: stats, workers_stats: list of HandStats (one per variant) and dictionary pid of worker ->
+             (hands, seconds) it played
+    """
+
+    if np is None:
+        raise RuntimeError("Simulation needs numpy")
+
+    workers = workers or os.cpu_count() or 1
+    shards = -(-hands // shard_hands)
+    variant_seeds = np.random.SeedSequence(seed).spawn(len(variants))
+    tasks = ((i, min(shard_hands, hands - shard * shard_hands), shard_seed)
+             for i, variant_seed in enumerate(variant_seeds)
+             for shard, shard_seed in enumerate(variant_seed.spawn(shards)))
+    stats = [HandStats() for _ in variants]
+    workers_stats = {}
+
+    def merge(i, future):
+        shard_stats, pid = future.result()
+        stats[i].merge(shard_stats)
+        worker_hands, worker_seconds = workers_stats.get(pid, (0, 0.0))
+        workers_stats[pid] = worker_hands + shard_stats.hands, worker_seconds + shard_stats.seconds
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for i, task_hands, shard_seed in tasks:
+            if len(pending) >= 2 * workers:
+                merge(*pending.popleft())
+            pending.append((i, executor.submit(_simulate_shard, task_hands, variants[i], shard_seed)))
+        while pending:
+            merge(*pending.popleft())
+
+    return stats, workers_stats
+
+
+@lru_cache(maxsize=None)
+def bot_hands(bot_stands_on=17):
+    """
+    All hands the bot can end with when it hits below bot_stands_on. Probability of drawing a hand from the shoe
+    depends only on its cards, not on their order, so bot's distribution of final totals for any composition of
+    the shoe is a sum over these hands (see Solver).
+
+    :return: tuple of (cards, size, orders, total): cards as tuple of (rank, count) pairs (ranks are indexes to
+             RANK_VALUES), number of cards, number of orders in which the bot draws them (it stops only after the
+             last one) and final total (Solver.BUST when busted)
+    """
+
+    hands = {}
+    cards = [0] * len(RANK_VALUES)
+
+    def draw(hard, soft, drawn):
+        total = hard + 10 if soft and hard <= 11 else hard
+        if hard > 21 or (drawn >= 2 and total >= bot_stands_on):
+            key = (tuple((rank, count) for rank, count in enumerate(cards) if count), min(total, Solver.BUST))
+            hands[key] = hands.get(key, 0) + 1
+            return
+
+        for rank, value in enumerate(RANK_VALUES):
+            cards[rank] += 1
+            draw(hard + value, soft or rank == 9, drawn + 1)
+            cards[rank] -= 1
+
+    draw(0, False, 0)
+    return tuple((hand, sum(count for _, count in hand), orders, total) for (hand, total), orders in hands.items())
+
+
+@lru_cache(maxsize=None)
+def _bot_hands_arrays(bot_stands_on):
+    """
+    bot_hands as numpy arrays: the longest run of one rank in a hand, choices (one row per hand, one column per
+    rank and its count in the hand, 1 where the hand has it), sizes, logs of orders and results (one row per hand,
+    1 in the column of its outcome).
+    """
+
+    hands = bot_hands(bot_stands_on)
+    longest = max(count for hand, _, _, _ in hands for _, count in hand)
+    choices = np.zeros((len(hands), len(RANK_VALUES) * (longest + 1)))
+    for i, (hand, _, _, _) in enumerate(hands):
+        counts = dict(hand)
+        for rank in range(len(RANK_VALUES)):
+            choices[i, rank * (longest + 1) + counts.get(rank, 0)] = 1
+
+    sizes = np.array([size for _, size, _, _ in hands])
+    orders = np.log([orders for _, _, orders, _ in hands])
+    results = np.zeros((len(hands), Solver.BUST - bot_stands_on + 1))
+    results[np.arange(len(hands)), [total - bot_stands_on for _, _, _, total in hands]] = 1
+
+    return longest, choices, sizes, orders, results
+
+
+class Solver:
+    """
+    Exact expected values of hitting and staying (1 unit bet: +1 win, 0 push, -1 loss) for composition of cards
+    left in the shoe: tuple of counts of ranks in order of RANK_VALUES (see Shoe.composition). Every card drawn
+    changes the composition, so the values are exact for the shoe, not for an infinite deck.
+
+    Hands are given as hard total (aces counted 1) and soft (True if there's an ace, which can count 11).
+    decide first collects all compositions the player can reach by hitting, then computes bot's distribution of
+    final totals for all of them at once (with numpy, see bot_hands) and then values of player's hands by dynamic
+    programming. Distributions and values are memoized, so decisions later in the same hand are looked up.
+
+    Player's values assume the bot of play_game (hits below bot_stands_on). bot_should_hit is a stronger bot,
+    which knows the player's total.
+    """
+
+    BUST = 22
+
+    def __init__(self, bot_stands_on=17):
+
+        self.bot_stands_on = bot_stands_on
+        self._bot_cache = {}  # composition -> distribution of bot's final total
+        self._player_cache = {}  # (composition, hard, soft) -> value of the hand
+        self._duel_cache = {}  # (composition, hard, soft, player's total) -> value of bot's hand
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.solves = 0
+        self.solve_seconds = 0.0
+        self.last_seconds = 0.0
+
+    @staticmethod
+    def best_total(hard, soft):
+
+        return hard + 10 if soft and hard <= 11 else hard
+
+    def _lookup(self, cache, key):
+
+        value = cache.get(key)
+        if value is None:
+            self.cache_misses += 1
+        else:
+            self.cache_hits += 1
+        return value
+
+    def _bot_totals(self, compositions):
+        """
+        Computes and caches bot's distributions of final totals for the compositions: tuples of probabilities of
+        totals bot_stands_on .. 21 and bust (last).
+        """
+
+        hands = bot_hands(self.bot_stands_on)
+        outcomes = self.BUST - self.bot_stands_on + 1
+
+        if np is None:
+            for counts in compositions:
+                cards_left = sum(counts)
+                falling = [[1] * (count + 2) for count in counts]  # falling[rank][k] = count * (count - 1) * ...
+                for rank, count in enumerate(counts):
+                    for k in range(1, count + 1):
+                        falling[rank][k] = falling[rank][k - 1] * (count - k + 1)
+                totals = [0.0] * outcomes
+                for hand, size, orders, total in hands:
+                    if size > cards_left:
+                        continue
+                    weight = orders
+                    for rank, count in hand:
+                        weight *= falling[rank][count] if count <= counts[rank] else 0
+                    if weight:
+                        for k in range(size):
+                            weight /= cards_left - k
+                        totals[total - self.bot_stands_on] += weight
+                self._bot_cache[counts] = tuple(totals)
+            return
+
+        longest, choices, sizes, orders, results = _bot_hands_arrays(self.bot_stands_on)
+
+        counts = np.array(compositions, dtype=float)
+        # log of falling factorials count * (count - 1) * ... for every rank and number of its cards in the hand,
+        # drawing more cards than there are is impossible (very small log)
+        factors = counts[:, :, None] - np.arange(longest)
+        logs = np.zeros(factors.shape[:2] + (longest + 1,))
+        logs[:, :, 1:] = np.cumsum(np.log(np.maximum(factors, 1)), axis=2)
+        logs[:, :, 1:][np.minimum.accumulate(factors, axis=2) < 1] = -1e9
+        cards_left = counts.sum(axis=1)
+        factors = cards_left[:, None] - np.arange(sizes.max())
+        draws = np.zeros((len(counts), sizes.max() + 1))
+        draws[:, 1:] = np.cumsum(np.log(np.maximum(factors, 1)), axis=1)
+
+        weights = logs.reshape(len(counts), -1) @ choices.T - draws[:, sizes] + orders
+        weights[sizes[None, :] > cards_left[:, None]] = -np.inf
+        for composition, totals in zip(compositions, np.exp(weights) @ results):
+            self._bot_cache[composition] = tuple(totals.tolist())
+
+    def _collect(self, counts, hard, soft, compositions, seen):
+        """ Collects compositions (without cached bot's distribution) reachable by player's hitting. """
+
+        if (counts, hard, soft) in seen or (counts, hard, soft) in self._player_cache:
+            return
+        seen.add((counts, hard, soft))
+        if counts not in self._bot_cache:
+            compositions.add(counts)
+
+        for rank, count in enumerate(counts):
+            if count and hard + RANK_VALUES[rank] <= 21:
+                child = counts[:rank] + (count - 1,) + counts[rank + 1:]
+                self._collect(child, hard + RANK_VALUES[rank], soft or rank == 9, compositions, seen)
+
+    def stand_ev(self, counts, player_total):
+        """ Expected value of staying with player_total (bot plays with the rest of the shoe). """
+
+        totals = self._lookup(self._bot_cache, counts)
+        if totals is None:
+            self._bot_totals([counts])
+            totals = self._bot_cache[counts]
+
+        value = totals[-1]  # bot busts
+        for total, probability in enumerate(totals[:-1], self.bot_stands_on):
+            if total < player_total:
+                value += probability
+            elif total > player_total:
+                value -= probability
+        return value
+
+    def hit_ev(self, counts, hard, soft):
+        """ Expected value of taking a card and then playing the best way. """
+
+        cards_left = sum(counts)
+        value = 0.0
+        for rank, count in enumerate(counts):
+            if not count:
+                continue
+            new_hard = hard + RANK_VALUES[rank]
+            if new_hard > 21:
+                value -= count / cards_left
+            else:
+                child = counts[:rank] + (count - 1,) + counts[rank + 1:]
+                value += count / cards_left * self._player_value(child, new_hard, soft or rank == 9)
+
+        return value
+
+    def _player_value(self, counts, hard, soft):
+        """ Expected value of player's hand played the best way. """
+
+        value = self._lookup(self._player_cache, (counts, hard, soft))
+        if value is None:
+            value = self.stand_ev(counts, self.best_total(hard, soft))
+            if hard < 21 and sum(counts):
+                value = max(value, self.hit_ev(counts, hard, soft))
+            self._player_cache[counts, hard, soft] = value
+
+        return value
+
+    def decide(self, counts, hard, soft):
+        """
+        :param counts: composition of cards left in the shoe
+        :param hard: player's hard total
+        :param soft: True if player has an ace
+        :return: decision, hit_ev, stand_ev: 'hit' or 'stay' (the one with bigger expected value) and both values
+        """
+
+        start = time.perf_counter()
+        counts = tuple(counts)
+        compositions = set()
+        self._collect(counts, hard, soft, compositions, set())
+        if compositions:
+            self._bot_totals(list(compositions))
+
+        stand_ev = self.stand_ev(counts, self.best_total(hard, soft))
+        hit_ev = self.hit_ev(counts, hard, soft) if hard < 21 else -1.0
+        self._count_solve(start)
+
+        return ('hit' if hit_ev > stand_ev else 'stay'), hit_ev, stand_ev
+
+    def _bot_value(self, counts, hard, soft, player_total):
+        """ Expected value of bot's hand (2 cards or more) for the bot playing the best it can. """
+
+        total = self.best_total(hard, soft)
+        value = (total > player_total) - (total < player_total)  # value of staying
+        if value == 1 or not sum(counts):
+            return value
+
+        key = (counts, hard, soft, player_total)
+        cached = self._lookup(self._duel_cache, key)
+        if cached is None:
+            cached = max(value, self._bot_hit_value(counts, hard, soft, player_total))
+            self._duel_cache[key] = cached
+        return cached
+
+    def _bot_hit_value(self, counts, hard, soft, player_total):
+
+        cards_left = sum(counts)
+        value = 0.0
+        for rank, count in enumerate(counts):
+            if not count:
+                continue
+            new_hard = hard + RANK_VALUES[rank]
+            if new_hard > 21:
+                value -= count / cards_left
+            else:
+                child = counts[:rank] + (count - 1,) + counts[rank + 1:]
+                value += count / cards_left * self._bot_value(child, new_hard, soft or rank == 9, player_total)
+
+        return value
+
+    def bot_should_hit(self, counts, hard, soft, player_total):
+        """
+        Stronger bot: the bot plays after the player stayed, so it knows what total it has to beat. It hits when
+        hitting has better expected value than staying.
+        """
+
+        start = time.perf_counter()
+        counts = tuple(counts)
+        total = self.best_total(hard, soft)
+        stand_value = (total > player_total) - (total < player_total)
+        should_hit = (stand_value < 1 and sum(counts) > 0
+                      and self._bot_hit_value(counts, hard, soft, player_total) > stand_value)
+        self._count_solve(start)
+
+        return should_hit
+
+    def _count_solve(self, start):
+
+        self.last_seconds = time.perf_counter() - start
+        self.solves += 1
+        self.solve_seconds += self.last_seconds
+
+    def cache_hit_rate(self):
+
+        lookups = self.cache_hits + self.cache_misses
+        return self.cache_hits / lookups if lookups else 0.0
+
+    def report(self):
+        """ :return: statistics of solving as one line of text """
+
+        cached = len(self._bot_cache) + len(self._player_cache) + len(self._duel_cache)
+        return (f"solved in {self.last_seconds * 1000:.1f} ms "
+                f"(average {self.solve_seconds / max(self.solves, 1) * 1000:.1f} ms, "
+                f"cache hit rate {self.cache_hit_rate():.0%}, {cached} positions cached)")
+
+
+HISTORY_COLUMNS = (  # name, array typecode: one file of fixed width values per column
+    ('player_card1', 'B'),
+    ('player_card2', 'B'),
+    ('bot_upcard', 'B'),  # bot's first card, NO_CARD if the bot didn't play
+    ('player_start', 'B'),  # total of the first 2 cards
+    ('player_total', 'B'),
+    ('bot_total', 'B'),  # 0 if the bot didn't play
+    ('decisions', 'H'),  # bit i is 1 if player's decision i was hit
+    ('decision_count', 'B'),
+    ('outcome', 'b'),  # 1 - player won, 0 - push, -1 - player lost
+)
+NO_CARD = 255
+HISTORY_OUTCOMES = {'WIN': 1, 'PUSH': 0, 'LOSS': -1}
+
+
+class HandHistory:
+    """
+    Records played hands to a directory of column files (see HISTORY_COLUMNS), every column is a file of fixed
+    width values, i-th value of every column belongs to i-th hand. Records are buffered in arrays and appended to
+    the files in chunks of buffer_hands hands (and on flush / close), so recording a hand doesn't touch the disk.
+    HistoryReader reads the columns back.
+
+    Args: path - directory of the history, created if it doesn't exist, new hands are appended to existing ones
+          buffer_hands - hands kept in memory before they are written
+    """
+
+    def __init__(self, path, buffer_hands=65536):
+
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.buffer_hands = buffer_hands
+        self.columns = {name: array(typecode) for name, typecode in HISTORY_COLUMNS}
+        self.hands = 0  # hands recorded by this HandHistory
+        self.flushes = 0
+
+    def record(self, player_cards, decisions, bot_cards, outcome):
+        """
+        :param player_cards: player's cards (small ints, see Card), first 2 are the starting cards
+        :param decisions: True for every hit, False for stay (nothing after a hit that busted)
+        :param bot_cards: bot's cards, empty if the bot didn't play
+        :param outcome: 1 - player won, 0 - push, -1 - player lost
+        """
+
+        player, bot = Hand(), Hand()
+        for card in player_cards[:2]:
+            player.add(card)
+        start = player.total()
+        for card in player_cards[2:]:
+            player.add(card)
+        for card in bot_cards:
+            bot.add(card)
+
+        columns = self.columns
+        columns['player_card1'].append(player_cards[0])
+        columns['player_card2'].append(player_cards[1])
+        columns['bot_upcard'].append(bot_cards[0] if bot_cards else NO_CARD)
+        columns['player_start'].append(start)
+        columns['player_total'].append(player.total())
+        columns['bot_total'].append(bot.total())
+        columns['decisions'].append(sum(1 << i for i, hit in enumerate(decisions[:16]) if hit))
+        columns['decision_count'].append(len(decisions))
+        columns['outcome'].append(outcome)
+
+        self.hands += 1
+        if len(columns['outcome']) >= self.buffer_hands:
+            self.flush()
+
+    def flush(self):
+        """ Appends buffered hands to the column files """
+
+        if not self.columns['outcome']:
+            return
+
+        for name, column in self.columns.items():
+            with open(os.path.join(self.path, name + '.col'), 'ab') as file:
+                column.tofile(file)
+            del column[:]
+        self.flushes += 1
+
+    def close(self):
+
+        self.flush()
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, *exc):
+
+        self.close()
+
+
+class HistoryReader:
+    """
+    Memory maps columns of a HandHistory directory as numpy arrays, aggregates are computed over whole columns,
+    no Python objects are made for single hands. A column cut short by an interrupted flush is ignored from the
+    shortest column on.
+    """
+
+    def __init__(self, path):
+
+        if np is None:
+            raise RuntimeError("Reading hand history needs numpy")
+
+        self.path = path
+        self.columns = {}
+        for name, typecode in HISTORY_COLUMNS:
+            file_name = os.path.join(path, name + '.col')
+            if os.path.exists(file_name) and os.path.getsize(file_name):
+                self.columns[name] = np.memmap(file_name, dtype=np.dtype(typecode), mode='r')
+            else:
+                self.columns[name] = np.zeros(0, dtype=np.dtype(typecode))
+        self.hands = min(len(column) for column in self.columns.values())
+        self.columns = {name: column[:self.hands] for name, column in self.columns.items()}
+
+    def __len__(self):
+
+        return self.hands
+
+    def _rates(self, keys, hits, mask=None, size=32):
+        """ :return: dictionary key -> (hands, rate of hits) for keys in 0 .. size - 1 with some hands """
+
+        if mask is not None:
+            keys, hits = keys[mask], hits[mask]
+        hands = np.bincount(keys, minlength=size)
+        counts = np.bincount(keys, weights=hits, minlength=size)
+        return {key: (int(hands[key]), counts[key] / hands[key]) for key in np.flatnonzero(hands).tolist()}
+
+    def win_rate_by_start_total(self):
+        """ :return: dictionary player's starting total -> (hands, win rate) """
+
+        outcome = self.columns['outcome']
+        return self._rates(self.columns['player_start'], outcome == 1)
+
+    def bust_rate_by_upcard(self):
+        """ :return: dictionary rank of bot's first card (index to Card.ranks) -> (hands, bot's bust rate) """
+
+        upcard = self.columns['bot_upcard']
+        played = upcard != NO_CARD
+        return self._rates(upcard % 13, self.columns['bot_total'] > 21, played, 13)
+
+    def summary(self):
+        """ :return: dictionary with hands and rates of wins, losses, pushes and player's busts """
+
+        outcome = self.columns['outcome']
+        hands = max(self.hands, 1)
+        return {'hands': self.hands, 'win_rate': np.count_nonzero(outcome == 1) / hands,
+                'loss_rate': np.count_nonzero(outcome == -1) / hands,
+                'push_rate': np.count_nonzero(outcome == 0) / hands,
+                'player_bust_rate': np.count_nonzero(self.columns['player_total'] > 21) / hands,
+                'average_hits': float((self.columns['decision_count'] - (self.columns['player_total'] <= 21)).sum())
+                / hands}
+
+
+TABLE_SEATS = 7
+
+
+def card_code(card):
+    """ Card (small int) as 2 letters: rank and suit, QH is queen of hearts """
+
+    return '23456789TJQKA'[card % 13] + 'HDSC'[card // 13]
+
+
+class _Seat:
+    """ One player sitting at a Table, owner is whatever the caller uses to reach the player. """
+
+    __slots__ = ('name', 'owner', 'hand', 'decisions', 'playing', 'wins', 'losses', 'pushes')
+
+    def __init__(self, name, owner):
+
+        self.name = name
+        self.owner = owner
+        self.hand = Hand()
+        self.decisions = []  # True - hit, False - stay
+        self.playing = False  # has cards in the current round and didn't stay or bust yet
+        self.wins = 0
+        self.losses = 0
+        self.pushes = 0
+
+
+class Table:
+    """
+    Blackjack table: up to `seats` players play against one bot with one shoe. Every round each seated player
+    gets 2 cards and players decide in order of seats (hit or stay), then the bot takes its cards and hits below
+    bot_stands_on. Player who busts loses right away, if everyone busted the bot doesn't play. Players sitting
+    down during a round play from the next one. Wins, losses and pushes are kept for every seat, finished hands
+    are recorded to history (HandHistory) if given.
+
+    Table only keeps the state, the caller tells everyone what happened (see TableServer).
+    """
+
+    def __init__(self, seats=TABLE_SEATS, shoe=None, bot_stands_on=17, history=None):
+
+        self.history = history
+        self.seats = [None] * seats
+        self.shoe = shoe if shoe is not None else Shoe(6)
+        self.bot_stands_on = bot_stands_on
+        self.bot = Hand()
+        self.turn = None  # index of the seat on move, None between rounds
+        self.rounds = 0
+
+    def players(self):
+        """ :return: list of (index, seat) of seated players """
+
+        return [(i, seat) for i, seat in enumerate(self.seats) if seat is not None]
+
+    def sit(self, name, owner=None):
+        """ :return: index of the seat, None if the table is full """
+
+        for i, seat in enumerate(self.seats):
+            if seat is None:
+                self.seats[i] = _Seat(name, owner)
+                return i
+
+        return None
+
+    def leave(self, index):
+        """ Frees the seat, the player stays if it was on move. """
+
+        if self.turn == index:
+            self.stay(index)
+        self.seats[index] = None
+
+    def start_round(self):
+        """
+        Deals 2 cards to every seated player, the shoe is reshuffled first if the cut card was reached.
+
+        :return: list of (index, card, total of the hand with the card) in order of dealing, empty list if nobody
+                 sits at the table
+        """
+
+        players = self.players()
+        if not players:
+            return []
+
+        if self.shoe.needs_shuffle():
+            self.shoe.shuffle()
+        self.rounds += 1
+        self.bot = Hand()
+        for _, seat in players:
+            seat.hand = Hand()
+            seat.decisions = []
+            seat.playing = True
+
+        dealt = []
+        for _ in range(2):
+            for i, seat in players:
+                card = self.shoe.deal()
+                seat.hand.add(card)
+                dealt.append((i, card, seat.hand.total()))
+
+        self.turn = players[0][0]
+        return dealt
+
+    def hit(self, index):
+        """ :return: card dealt to the player, the turn moves on if the player busted """
+
+        seat = self.seats[index]
+        card = self.shoe.deal()
+        seat.hand.add(card)
+        seat.decisions.append(True)
+        if seat.hand.total() > 21:
+            seat.playing = False
+            seat.losses += 1
+            if self.history is not None:
+                self.history.record(seat.hand.cards, seat.decisions, [], -1)
+            self._next_turn()
+
+        return card
+
+    def stay(self, index):
+
+        self.seats[index].playing = False
+        self.seats[index].decisions.append(False)
+        self._next_turn()
+
+    def _next_turn(self):
+
+        for i in range(self.turn + 1, len(self.seats)):
+            if self.seats[i] is not None and self.seats[i].playing:
+                self.turn = i
+                return
+        self.turn = None
+
+    def finish_round(self):
+        """
+        Bot plays once all players decided.
+
+        :return: bot_cards, results: cards the bot took and list of (index, 'WIN' / 'LOSS' / 'PUSH') of players
+                 who didn't bust
+        """
+
+        standing = [(i, seat) for i, seat in self.players() if seat.hand.total() <= 21 and seat.hand.cards]
+        bot_cards = []
+        while standing and (len(bot_cards) < 2 or self.bot.total() < self.bot_stands_on):
+            card = self.shoe.deal()
+            self.bot.add(card)
+            bot_cards.append(card)
+
+        results = []
+        bot_total = self.bot.total()
+        for i, seat in standing:
+            total = seat.hand.total()
+            if bot_total > 21 or total > bot_total:
+                seat.wins += 1
+                results.append((i, 'WIN'))
+            elif total == bot_total:
+                seat.pushes += 1
+                results.append((i, 'PUSH'))
+            else:
+                seat.losses += 1
+                results.append((i, 'LOSS'))
+            if self.history is not None:
+                self.history.record(seat.hand.cards, seat.decisions, bot_cards, HISTORY_OUTCOMES[results[-1][1]])
+
+        return bot_cards, results
+
+
+class _TableSession:
+    """ One connected client of TableServer. """
+
+    __slots__ = ('writer', 'table', 'seat')
+
+    def __init__(self, writer):
+
+        self.writer = writer
+        self.table = None
+        self.seat = None
+
+
+class TableServer:
+    """
+    asyncio TCP server running many blackjack tables (see Table) in one process.
+
+    Line based protocol, seats are numbered from 1 (0 is the bot), cards are rank and suit letters (see card_code):
+        SIT name   -> SEATED table seat, then every round to the whole table: ROUND number, DEALT seat card total
+                      for every card, TURN seat of the player on move
+        HIT        -> DEALT seat card total (to the whole table)
+        STAY       -> STAYED seat total (player on move who doesn't answer in turn_timeout seconds gets TIMEOUT
+                      seat and stays)
+                      after the last player the bot's DEALT 0 card total and RESULT WIN / LOSS / PUSH total bot_total
+                      to every player who didn't bust (BUST total right after the card that busted)
+        QUIT       -> leaves the table
+    Players sit at the first table with a free seat, a round starts round_delay seconds after the previous one (or
+    after the first player sat down). Events are written without waiting for anyone, a client which doesn't read
+    them and has more than max_buffer bytes unsent is disconnected, so slow clients stall only their own table
+    (until their turn times out) and never other tables. Hands of all tables are recorded to history if given.
+    """
+
+    def __init__(self, seats=TABLE_SEATS, decks=6, turn_timeout=10.0, round_delay=0.5, max_buffer=1 << 16,
+                 seed=None, history=None):
+
+        self.history = history  # HandHistory of all tables
+        self.seats = seats
+        self.decks = decks
+        self.turn_timeout = turn_timeout
+        self.round_delay = round_delay
+        self.max_buffer = max_buffer
+        self.rng = Random(seed)
+        self.tables = []
+        self._turn_timers = {}  # table -> handle of its turn timeout
+        self._round_timers = {}  # table -> handle of its next round
+        self.sessions = 0
+        self.hands = 0
+        self.decisions = 0
+        self.timeouts = 0
+        self.dropped = 0  # clients disconnected for not reading
+
+    async def serve(self, host='127.0.0.1', port=8766):
+        """ Runs the server until it's cancelled. """
+
+        server = await asyncio.start_server(self.handle_client, host, port, limit=1024)
+        async with server:
+            await server.serve_forever()
+
+    async def handle_client(self, reader, writer):
+
+        session = _TableSession(writer)
+        self.sessions += 1
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ConnectionError, ValueError):
+                    break
+                if not line:
+                    break
+                words = line.decode(errors='replace').split()
+                if not words:
+                    continue
+
+                command = words[0].upper()
+                if command == 'QUIT':
+                    break
+                elif command == 'SIT':
+                    self._sit(session, words[1:])
+                elif command in ('HIT', 'STAY'):
+                    self._decide(session, command)
+                else:
+                    self._send(session, "ERR unknown command, expected SIT, HIT, STAY or QUIT")
+                await writer.drain()
+        finally:
+            self._leave(session)
+            self.sessions -= 1
+            writer.close()
+
+    def _send(self, session, line):
+
+        if session.writer.is_closing():
+            return
+        session.writer.write(line.encode() + b"\n")
+        if session.writer.transport.get_write_buffer_size() > self.max_buffer:
+            self.dropped += 1
+            session.writer.close()  # its handle_client ends and the player leaves the table
+
+    def _broadcast(self, table, line):
+
+        for _, seat in table.players():
+            self._send(seat.owner, line)
+
+    def _sit(self, session, args):
+
+        if session.table is not None:
+            self._send(session, "ERR already sitting at a table")
+            return
+        if not args:
+            self._send(session, "ERR usage: SIT name")
+            return
+
+        for table in self.tables:
+            seat = table.sit(args[0], session)
+            if seat is not None:
+                break
+        else:
+            table = Table(self.seats, Shoe(self.decks, rng=Random(self.rng.getrandbits(64))), history=self.history)
+            self.tables.append(table)
+            seat = table.sit(args[0], session)
+
+        session.table, session.seat = table, seat
+        self._send(session, f"SEATED {self.tables.index(table) + 1} {seat + 1}")
+        if table.turn is None and table not in self._round_timers:
+            self._schedule_round(table)
+
+    def _schedule_round(self, table):
+
+        loop = asyncio.get_running_loop()
+        self._round_timers[table] = loop.call_later(self.round_delay, self._start_round, table)
+
+    def _start_round(self, table):
+
+        del self._round_timers[table]
+        dealt = table.start_round()
+        if not dealt:
+            return
+
+        self._broadcast(table, f"ROUND {table.rounds}")
+        for i, card, total in dealt:
+            self._broadcast(table, f"DEALT {i + 1} {card_code(card)} {total}")
+        self._next_turn(table)
+
+    def _decide(self, session, command):
+
+        table = session.table
+        if table is None:
+            self._send(session, "ERR not sitting at a table")
+            return
+        if table.turn != session.seat:
+            self._send(session, "ERR not your turn")
+            return
+
+        self.decisions += 1
+        self._play(table, session.seat, command)
+
+    def _play(self, table, index, command):
+
+        hand = table.seats[index].hand
+        if command == 'HIT':
+            card = table.hit(index)
+            self._broadcast(table, f"DEALT {index + 1} {card_code(card)} {hand.total()}")
+            if hand.total() > 21:
+                self.hands += 1
+                self._send(table.seats[index].owner, f"BUST {hand.total()}")
+        else:
+            table.stay(index)
+            self._broadcast(table, f"STAYED {index + 1} {hand.total()}")
+        self._next_turn(table)
+
+    def _timeout(self, table):
+
+        del self._turn_timers[table]
+        self.timeouts += 1
+        self._broadcast(table, f"TIMEOUT {table.turn + 1}")
+        self._play(table, table.turn, 'STAY')
+
+    def _next_turn(self, table):
+        """ Tells the table who's on move (and starts the timeout) or finishes the round. """
+
+        timer = self._turn_timers.pop(table, None)
+        if timer is not None:
+            timer.cancel()
+
+        if table.turn is not None:
+            self._broadcast(table, f"TURN {table.turn + 1}")
+            loop = asyncio.get_running_loop()
+            self._turn_timers[table] = loop.call_later(self.turn_timeout, self._timeout, table)
+            return
+
+        bot_cards, results = table.finish_round()
+        bot = Hand()
+        for card in bot_cards:
+            bot.add(card)
+            self._broadcast(table, f"DEALT 0 {card_code(card)} {bot.total()}")
+        for i, result in results:
+            seat = table.seats[i]
+            self._send(seat.owner, f"RESULT {result} {seat.hand.total()} {table.bot.total()}")
+        self.hands += len(results)
+        self._schedule_round(table)
+
+    def _leave(self, session):
+
+        table = session.table
+        if table is None:
+            return
+
+        on_move = table.turn == session.seat
+        table.leave(session.seat)
+        session.table = session.seat = None
+        if on_move:
+            self._next_turn(table)
+        elif not table.players() and table in self._round_timers:
+            self._round_timers.pop(table).cancel()
+
+
+async def _table_client(host, port, name, hands, latencies, rng, slow=False):
+    """
+    Bot client of run_table_load: sits down and plays hands (stands on random total 12 - 18), appends seconds
+    from its decision to the server's answer. Slow clients never answer their turns.
+
+    :return: hands played
+    """
+
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(f"SIT {name}\n".encode())
+    stands_on = rng.randint(12, 18)
+    seat = None
+    total = 0
+    sent = None
+    played = 0
+
+    while played < hands:
+        line = await reader.readline()
+        if not line:
+            break
+        words = line.decode().split()
+
+        if words[0] == 'SEATED':
+            seat = words[2]
+        elif words[0] in ('DEALT', 'STAYED') and words[1] == seat:
+            total = int(words[-1])
+            if sent is not None:
+                latencies.append(time.perf_counter() - sent)
+                sent = None
+        elif words[0] == 'TURN' and words[1] == seat and not slow:
+            writer.write(b"HIT\n" if total < stands_on else b"STAY\n")
+            sent = time.perf_counter()
+        elif words[0] in ('RESULT', 'BUST'):
+            played += 1
+
+    writer.write(b"QUIT\n")
+    await writer.drain()
+    writer.close()
+
+    return played
+
+
+async def run_table_load(host=None, port=8766, clients=700, hands=20, slow=0, turn_timeout=1.0, round_delay=0.05,
+                         seed=0):
+    """
+    Load generator: bot clients play hands on TableServer, 7 of them at a table.
+
+    :param host: Host of the server, None starts a server in this process (on a free port).
+    :param port: Port of the server.
+    :param clients: Number of simultaneous clients.
+    :param hands: Hands played by every client.
+    :param slow: How many of the clients never answer (their turns time out), they are spread over the tables.
+    :param turn_timeout: Seconds the local server waits for a decision.
+    :param round_delay: Seconds between rounds of the local server.
+    :param seed: Seed of the clients' decisions (and of the local server's shoes).
+    :return: Dictionary with hands, seconds, hands_per_second, decisions, decision latency percentiles
+             (milliseconds) and, with the local server, tables and timeouts.
+    """
+
+    server = table_server = None
+    if host is None:
+        table_server = TableServer(turn_timeout=turn_timeout, round_delay=round_delay, seed=seed)
+        server = await asyncio.start_server(table_server.handle_client, '127.0.0.1', 0, limit=1024)
+        host, port = server.sockets[0].getsockname()[:2]
+
+    rng = Random(seed)
+    slow_every = clients // slow if slow else 0
+    latencies = []
+    start = time.perf_counter()
+    try:
+        played = await asyncio.gather(*(_table_client(host, port, f"bot{i}", hands, latencies,
+                                                      Random(rng.getrandbits(64)),
+                                                      slow_every and i % slow_every == 0 and i // slow_every < slow)
+                                        for i in range(clients)))
+    finally:
+        if server is not None:
+            server.close()
+            await server.wait_closed()
+    seconds = time.perf_counter() - start
+
+    latencies.sort()
+    percentiles = {f"p{p}_ms": latencies[min(len(latencies) - 1, len(latencies) * p // 100)] * 1000
+                   for p in (50, 90, 99)} if latencies else {}
+    stats = {'hands': sum(played), 'seconds': seconds, 'hands_per_second': sum(played) / seconds,
+             'decisions': len(latencies), **percentiles}
+    if table_server is not None:
+        stats['tables'] = len(table_server.tables)
+        stats['timeouts'] = table_server.timeouts
+
+    return stats
+
+
+def record_hands(history, hands, stand_on=17, decks=6, seats=1, seed=None):
+    """
+    Plays hands at a Table (every seat hits below stand_on) and records them to history.
+
+    :param history: HandHistory
+    :param hands: number of hands to play (whole rounds, so up to seats - 1 more)
+    :return: seconds it took
+    """
+
+    start = time.perf_counter()
+    table = Table(seats, Shoe(decks, rng=Random(seed)), history=history)
+    for i in range(seats):
+        table.sit(f"bot{i + 1}")
+
+    for _ in range(-(-hands // seats)):
+        table.start_round()
+        while table.turn is not None:
+            if table.seats[table.turn].hand.total() < stand_on:
+                table.hit(table.turn)
+            else:
+                table.stay(table.turn)
+        table.finish_round()
+    history.flush()
+
+    return time.perf_counter() - start
+
+
+def _parse_values(text, value_type=int):
+    """ Parses comma separated values, integers can also be given as range: 12-17 """
+
+    values = []
+    for part in text.split(','):
+        if value_type is int and '-' in part.strip('-'):
+            low, high = part.split('-')
+            values.extend(range(int(low), int(high) + 1))
+        else:
+            values.append(value_type(part))
+
+    return values
+
+
+def run_command(argv):
+    """
+    Runs the game in command line mode (simulation instead of the interactive game).
+
+    :param argv: command line arguments without the name of the program
+    """
+
+    parser = argparse.ArgumentParser(prog="blackjack-game.py")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    simulate = commands.add_parser("simulate", help="estimate results of stand thresholds by Monte Carlo simulation")
+    simulate.add_argument("--hands", type=int, default=10 ** 7)
+    simulate.add_argument("--stand-on", default="17", help="comma separated totals the player stands on")
+    simulate.add_argument("--bot-stands-on", type=int, default=17)
+    simulate.add_argument("--decks", type=int, default=1)
+    simulate.add_argument("--penetration", type=float, default=0.75)
+    simulate.add_argument("--seed", type=int, default=None)
+    simulate.add_argument("--count", choices=COUNT_SYSTEMS, default="hi-lo", help="card counting system")
+    simulate.add_argument("--bet-spread", type=int, default=1, help="bet the true count, up to this many units")
+    simulate.add_argument("--deviation", type=float, default=None,
+                          help="stand one total lower from this true count (one higher from minus it)")
+
+    sweep_parser = commands.add_parser("sweep", help="simulate all combinations of rule variants in worker processes")
+    sweep_parser.add_argument("--hands", type=int, default=10 ** 7, help="hands per variant")
+    sweep_parser.add_argument("--stand-on", default="12-18", help="player's stand totals, e.g. 12-18 or 15,17")
+    sweep_parser.add_argument("--bot-stands-on", default="17")
+    sweep_parser.add_argument("--decks", default="1,6")
+    sweep_parser.add_argument("--penetration", default="0.75", help="comma separated fractions of shoe dealt")
+    sweep_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    sweep_parser.add_argument("--shard-hands", type=int, default=10 ** 6, help="hands played by a worker at once")
+    sweep_parser.add_argument("--seed", type=int, default=0)
+    sweep_parser.add_argument("--count", choices=COUNT_SYSTEMS, default="hi-lo", help="card counting system")
+    sweep_parser.add_argument("--bet-spread", default="1", help="comma separated biggest bets, 1 for flat betting")
+    sweep_parser.add_argument("--deviation", type=float, default=None)
+
+    play = commands.add_parser("play", help="play the interactive game")
+    play.add_argument("--decks", type=int, choices=range(1, 9), default=None)
+    play.add_argument("--hints", action="store_true", help="show expected values of hit and stay")
+    play.add_argument("--smart-bot", action="store_true", help="bot decides by expected values, not below 17")
+    play.add_argument("--count", choices=COUNT_SYSTEMS, default="hi-lo", help="counting system shown with hints")
+    play.add_argument("--history", default=None, help="directory the hands are recorded to")
+
+    serve = commands.add_parser("serve", help="run the server of multi seat tables (see TableServer)")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8766)
+    serve.add_argument("--seats", type=int, choices=range(1, TABLE_SEATS + 1), default=TABLE_SEATS)
+    serve.add_argument("--decks", type=int, choices=range(1, 9), default=6)
+    serve.add_argument("--turn-timeout", type=float, default=10.0, help="seconds a player has to decide")
+    serve.add_argument("--round-delay", type=float, default=0.5, help="seconds between rounds")
+    serve.add_argument("--history", default=None, help="directory the hands are recorded to")
+
+    load = commands.add_parser("loadgen", help="load test the table server with bot clients")
+    load.add_argument("--host", default=None, help="server host, runs a local server if not given")
+    load.add_argument("--port", type=int, default=8766)
+    load.add_argument("--clients", type=int, default=700)
+    load.add_argument("--hands", type=int, default=20, help="hands per client")
+    load.add_argument("--slow", type=int, default=0, help="clients which never answer (their turns time out)")
+    load.add_argument("--turn-timeout", type=float, default=1.0, help="turn timeout of the local server")
+    load.add_argument("--round-delay", type=float, default=0.05, help="seconds between rounds of the local server")
+    load.add_argument("--seed", type=int, default=0)
+
+    history = commands.add_parser("history", help="record hands to a columnar hand history or aggregate it")
+    history.add_argument("action", choices=("record", "stats"))
+    history.add_argument("path", help="directory of the history")
+    history.add_argument("--hands", type=int, default=10 ** 6)
+    history.add_argument("--stand-on", type=int, default=17)
+    history.add_argument("--decks", type=int, choices=range(1, 9), default=6)
+    history.add_argument("--seats", type=int, choices=range(1, TABLE_SEATS + 1), default=TABLE_SEATS)
+    history.add_argument("--seed", type=int, default=None)
+
+    bench = commands.add_parser("bench", help="time and memory per hand of string cards and int cards")
+    bench.add_argument("--hands", type=int, default=100000)
+    bench.add_argument("--decks", type=int, choices=range(1, 9), default=6)
+    bench.add_argument("--seed", type=int, default=0)
+
+    solve = commands.add_parser("solve", help="expected values of hit and stay for all starting hands")
+    solve.add_argument("--decks", type=int, choices=range(1, 9), default=1)
+    solve.add_argument("--bot-stands-on", type=int, default=17)
+
+    args = parser.parse_args(argv)
+
+    if (args.command in ("simulate", "sweep") or args.command == "history" and args.action == "stats") and np is None:
+        parser.error("simulation needs numpy (pip install numpy)")
+
+    if args.command == "play":
+        with HandHistory(args.history) if args.history else nullcontext() as history:
+            play_interactive(args.decks, args.hints, args.smart_bot, args.count, history)
+
+    elif args.command == "serve":
+        print(f"Serving blackjack tables on {args.host}:{args.port}")
+        history = HandHistory(args.history) if args.history else None
+        try:
+            asyncio.run(TableServer(args.seats, args.decks, args.turn_timeout, args.round_delay, history=history)
+                        .serve(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if history is not None:
+                history.close()
+
+    elif args.command == "loadgen":
+        stats = asyncio.run(run_table_load(args.host, args.port, args.clients, args.hands, args.slow,
+                                           args.turn_timeout, args.round_delay, args.seed))
+        print(f"{stats['hands']} hands in {stats['seconds']:.2f} s ({stats['hands_per_second']:.0f} hands/s), "
+              f"{stats['decisions']} decisions, latency p50 {stats.get('p50_ms', 0):.1f} ms, "
+              f"p90 {stats.get('p90_ms', 0):.1f} ms, p99 {stats.get('p99_ms', 0):.1f} ms")
+        if 'tables' in stats:
+            print(f"{stats['tables']} tables, {stats['timeouts']} turns timed out")
+
+    elif args.command == "history" and args.action == "record":
+        with HandHistory(args.path) as history:
+            seconds = record_hands(history, args.hands, args.stand_on, args.decks, args.seats, args.seed)
+        print(f"{history.hands} hands recorded in {seconds:.1f} s ({history.hands / seconds:.0f} hands/s, "
+              f"{history.flushes} chunks written)")
+
+    elif args.command == "history":
+        start = time.perf_counter()
+        reader = HistoryReader(args.path)
+        summary = reader.summary()
+        print(f"{summary['hands']} hands: win {summary['win_rate']:.2%}, loss {summary['loss_rate']:.2%}, "
+              f"push {summary['push_rate']:.2%}, player busts {summary['player_bust_rate']:.2%}, "
+              f"{summary['average_hits']:.2f} hits per hand")
+        print(f"\n{'start':>5} {'hands':>10} {'win rate':>8}")
+        for total, (hands, rate) in reader.win_rate_by_start_total().items():
+            print(f"{total:>5} {hands:>10} {rate:>8.2%}")
+        print(f"\n{'upcard':>6} {'hands':>10} {'bot busts':>9}")
+        for rank, (hands, rate) in reader.bust_rate_by_upcard().items():
+            print(f"{Card.ranks[rank]:>6} {hands:>10} {rate:>9.2%}")
+        print(f"\naggregated in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    elif args.command == "bench":
+        results = benchmark_hands(args.hands, args.decks, args.seed)
+        print(f"{'cards':>8} {'us/hand':>8} {'bytes/hand':>10}")
+        for name, (micros, size) in results.items():
+            print(f"{name:>8} {micros:>8.2f} {size:>10.0f}")
+        print(f"\nints: {results['strings'][0] / results['ints'][0]:.1f}x faster, "
+              f"{results['strings'][1] / results['ints'][1]:.1f}x less memory")
+
+    elif args.command == "solve":
+        # every starting hand from a full shoe, pairs of ranks (RANK_VALUES indexes) with different totals
+        solver = Solver(args.bot_stands_on)
+        full = [4 * args.decks] * 8 + [16 * args.decks, 4 * args.decks]
+        print(f"{'hand':>8} {'decision':>8} {'hit EV':>8} {'stay EV':>8} {'ms':>7}")
+        hands = {}
+        for first in range(len(RANK_VALUES)):
+            for second in range(first, len(RANK_VALUES)):
+                hard, soft = RANK_VALUES[first] + RANK_VALUES[second], second == 9
+                hands.setdefault((hard, soft), (first, second))
+
+        for (hard, soft), (first, second) in sorted(hands.items(), key=lambda item: (item[0][1], item[0][0])):
+            counts = list(full)
+            counts[first] -= 1
+            counts[second] -= 1
+            decision, hit_ev, stand_ev = solver.decide(counts, hard, soft)
+            name = f"soft {hard + 10}" if soft and hard <= 11 else f"{hard}"
+            print(f"{name:>8} {decision:>8} {hit_ev:>+8.3f} {stand_ev:>+8.3f} {solver.last_seconds * 1000:>7.1f}")
+        print(f"\n{solver.solves} hands solved in {solver.solve_seconds * 1000:.0f} ms, "
+              f"cache hit rate {solver.cache_hit_rate():.0%}")
+
+    elif args.command == "sweep":
+        variants = [{'stand_on': stand_on, 'bot_stands_on': bot_stands_on, 'decks': decks, 'penetration': penetration,
+                     'system': args.count, 'bet_spread': bet_spread, 'deviation': args.deviation}
+                    for decks in _parse_values(args.decks)
+                    for penetration in _parse_values(args.penetration, float)
+                    for bet_spread in _parse_values(args.bet_spread)
+                    for bot_stands_on in _parse_values(args.bot_stands_on)
+                    for stand_on in _parse_values(args.stand_on)]
+
+        start = time.perf_counter()
+        stats, workers_stats = sweep(variants, args.hands, args.workers, args.shard_hands, args.seed)
+        seconds = time.perf_counter() - start
+
+        print(f"{'decks':>5} {'pen.':>5} {'bets':>4} {'bot':>4} {'stand':>5} {'win':>7} {'loss':>7} {'push':>7} "
+              f"{'player edge':>17} {'per bet':>8}")
+        for variant, variant_stats in zip(variants, stats):
+            results = variant_stats.results()
+            print(f"{variant['decks']:>5} {variant['penetration']:>5.2f} {variant['bet_spread']:>4} "
+                  f"{variant['bot_stands_on']:>4} {variant['stand_on']:>5} {results['win_rate']:>7.2%} "
+                  f"{results['loss_rate']:>7.2%} {results['push_rate']:>7.2%} {results['edge']:>+9.2%} "
+                  f"+-{results['edge_ci']:.2%} {results['edge_per_bet']:>+8.2%}")
+
+        total_hands = sum(variant_stats.hands for variant_stats in stats)
+        print(f"\n{total_hands} hands in {seconds:.1f} s ({total_hands / seconds:.0f} hands/s)")
+        for i, (worker_hands, worker_seconds) in enumerate(workers_stats.values()):
+            print(f"worker {i + 1}: {worker_hands} hands, {worker_hands / worker_seconds:.0f} hands/s")
+
+    elif args.command == "simulate":
+        print(f"{'stand on':>8} {'win':>15} {'loss':>15} {'push':>15} {'player edge':>17} {'avg bet':>7} "
+              f"{'per bet':>8} {'hands/s':>10}")
+        for stand_on in [int(total) for total in args.stand_on.split(',')]:
+            results = simulate_hands(args.hands, stand_on, args.bot_stands_on, args.decks, args.penetration,
+                                     seed=args.seed, system=args.count, bet_spread=args.bet_spread,
+                                     deviation=args.deviation)
+            print(f"{stand_on:>8}" + "".join(f" {results[name]:>7.2%} +-{results[name + '_ci']:.2%}"
+                                             for name in ('win_rate', 'loss_rate', 'push_rate'))
+                  + f" {results['edge']:>+9.2%} +-{results['edge_ci']:.2%} {results['average_bet']:>7.2f}"
+                  + f" {results['edge_per_bet']:>+8.2%} {results['hands_per_second']:>10.0f}")
+
+
+def play_interactive(decks=None, hints=False, smart_bot=False, system='hi-lo', history=None):
+    """
+    Plays games until the player wants to stop, with one shoe (asks for number of its decks if not given), its
+    count (of the counting system) is shown with hints. Hands are recorded to history (HandHistory) if given.
+    """
 
     num_of_player_wins = 0
     num_of_bot_wins = 0
     end = "yes"
 
+    if decks is None:
+        decks = ''
+        while decks not in [str(i) for i in range(1, 9)]:
+            decks = input("How many decks in the shoe? (1 - 8, default 6): ").strip() or '6'
+    shoe = Shoe(int(decks), system=system)
+    solver = Solver() if hints or smart_bot else None
+
     while end != 'n' and end != 'no':
         if end == "yes" or end == "y":
-            num_of_player_wins, num_of_bot_wins = play_game(num_of_player_wins, num_of_bot_wins)
+            num_of_player_wins, num_of_bot_wins = play_game(num_of_player_wins, num_of_bot_wins, shoe, solver,
+                                                            hints, smart_bot, history)
         end = input("Continue playing? y / n: ").lower().strip()
     print("\nThank you for playing the game!")
 
-        
+
+if __name__ == '__main__':
+
+    if len(sys.argv) > 1:
+        run_command(sys.argv[1:])
+    else:
+        play_interactive()
@@ -1,28 +1,155 @@
-from random import randint
+import argparse
+import asyncio
+import io
+import math
+import mmap
+import os
+import shutil
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_left
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from multiprocessing import Lock, shared_memory
+from multiprocessing.util import Finalize
+from random import Random, randint
+
+try:
+    import numpy as np
+except ImportError:  # numpy is needed only for batch win detection (batch_lines, batch_winners)
+    np = None
+
+
+@lru_cache(maxsize=None)
+def zobrist_keys(size):
+    """
+    Random 64 bit key for every piece on every square. Hash of a position is XOR of keys of all pieces on board,
+    so it can be updated incrementally with every move. Keys are the same for all boards of given size.
+
+    :return: Dictionary piece -> list of keys indexed by square (row * size + col).
+    """
+
+    rng = Random(size)
+    return {piece: [rng.getrandbits(64) for _ in range(size * size)] for piece in ('X', 'O')}
+
+
+def default_win_needed(size):
+    """
+    How many pieces in one row / column / diagonal are needed to win on the board of the size.
+
+    :param size: Size of the board, None for unbounded board (plays gomoku).
+    """
+
+    if size is None or size >= 9:
+        return 5
+    if size >= 5:
+        return 4
+    return 3
+
+
+@lru_cache(maxsize=4)
+def line_windows(size, win_needed):
+    """
+    All windows of win_needed squares in order (in rows, columns and both diagonals) on the board.
+
+    :return: windows, square_windows: Tuple of windows (each a tuple of squares) and for every square a tuple of
+             indexes of windows the square is in.
+    """
+
+    windows = []
+    for row_step, col_step in ((0, 1), (1, 0), (1, 1), (1, -1)):
+        for row in range(size):
+            for col in range(size):
+                end_row = row + row_step * (win_needed - 1)
+                end_col = col + col_step * (win_needed - 1)
+                if 0 <= end_row < size and 0 <= end_col < size:
+                    windows.append(tuple((row + row_step * k) * size + col + col_step * k
+                                         for k in range(win_needed)))
+
+    square_windows = [[] for _ in range(size * size)]
+    for i, window in enumerate(windows):
+        for square in window:
+            square_windows[square].append(i)
+
+    return tuple(windows), tuple(tuple(ids) for ids in square_windows)
 
 
 class Board:
 
-    def __init__(self, size):
+    def __init__(self, size, win_needed=None):
         """
         :param size: Size of the board.
+        :param win_needed: Overrides how many pieces in order are needed to win (by default depends on size).
 
         position: Current position on the board.
         moves_played: Contains all moves played to ban players from overriding pieces on board.
         win_needed: How many pieces in one row / column / diagonal are needed to win the game.
+
+        Squares are also numbered row * size + col. Empty squares are kept in a pool (list) together with index of
+        each square in the pool (-1 for occupied squares), so checking a square, picking a random empty square and
+        removing a square from the pool (swapping it with the last one) are all O(1).
+
+        hash: Zobrist hash of the position, updated with every move (see zobrist_keys).
+        live: For each piece, number of windows of win_needed squares in order without any opponent's piece,
+              i.e. where the player can still win. Counted arithmetically at the start and updated with every move
+              from counts of pieces of windows which have some (see _windows); when it's 0 for both players, the
+              game is a draw no matter how it continues. Backends share it, so they end games the same way.
+        winner: Piece which won according to the last has_ended call, None otherwise.
         """
 
-        self.position = [[0 for _ in range(size)] for _ in range(size)]
         self.size = size
         self.moves_played = []
+        self._empty = list(range(size * size))
+        self._empty_index = list(range(size * size))
+        self._removed_at = []  # index in the pool each played square had, to put it back on undo_move
+        self._zobrist = zobrist_keys(size)
+        self.hash = 0
+        self._result_key = None  # has_ended arguments and move count of the cached result
+        self._result = None
+        self.winner = None
 
-        # calculate how many pieces in one row / column / diagonal are needed for win
-        if size >= 9:
-            self.win_needed = 5
-        elif size >= 5:
-            self.win_needed = 4
-        else:
-            self.win_needed = 3
+        self.win_needed = win_needed if win_needed is not None else default_win_needed(size)
+
+        span = max(0, size - self.win_needed + 1)
+        windows = 2 * size * span + 2 * span * span
+        self.live = {'X': windows, 'O': windows}
+        self._window_counts = {'X': {}, 'O': {}}  # window -> number of pieces, only windows with a piece
+
+        self._setup_position()
+
+    def _setup_position(self):
+        """ Allocates an empty position, backends override it with their own storage. """
+
+        self.position = [[0 for _ in range(self.size)] for _ in range(self.size)]
+
+    def _windows(self, row, col):
+        """
+        Ids (first square * 4 + direction) of windows of win_needed squares in order which contain the square.
+
+        Windows of one direction are the square's window shifted by k squares back for k in a range given by the
+        borders of the board, so their ids are an arithmetic sequence (a range) and no window is checked.
+        """
+
+        size = self.size
+        last = self.win_needed - 1
+        high = size - 1 - last  # last row / column a window can start at
+        base = (row * size + col) * 4
+
+        # k squares back, for the row, column, diagonal and anti-diagonal
+        row_ks = max(0, col - high), min(col, last)
+        col_ks = max(0, row - high), min(row, last)
+        diagonal_ks = max(0, row - high, col - high), min(row, col, last)
+        anti_ks = max(0, row - high, last - col), min(row, size - 1 - col, last)
+
+        return [*range(base - row_ks[1] * 4, base - row_ks[0] * 4 + 1, 4),
+                *range(base + 1 - col_ks[1] * size * 4, base + 2 - col_ks[0] * size * 4, size * 4),
+                *range(base + 2 - diagonal_ks[1] * (size + 1) * 4, base + 3 - diagonal_ks[0] * (size + 1) * 4,
+                       (size + 1) * 4),
+                *range(base + 3 - anti_ks[1] * (size - 1) * 4, base + 4 - anti_ks[0] * (size - 1) * 4,
+                       (size - 1) * 4)]
 
     def make_move(self, row, col, piece):
         """
@@ -33,10 +160,122 @@ class Board:
         :param piece: Which piece played the move (X or O).
         """
 
-        self.position[row][col] = piece
+        self._place(row, col, piece)
         self.moves_played.append([row, col])
 
-    def has_ended(self, row, col, piece, player_name):
+        # remove the square from the pool of empty squares
+        square = row * self.size + col
+        self.hash ^= self._zobrist[piece][square]
+        i = self._empty_index[square]
+        last = self._empty.pop()
+        if last != square:
+            self._empty[i] = last
+            self._empty_index[last] = i
+        self._empty_index[square] = -1
+        self._removed_at.append(i)
+
+        # the first piece in a window takes it from the opponent
+        counts = self._window_counts[piece]
+        blocked = 0
+        for window in self._windows(row, col):
+            count = counts.get(window, 0)
+            if not count:
+                blocked += 1
+            counts[window] = count + 1
+        self.live[other_piece(piece)] -= blocked
+
+    def undo_move(self):
+        """
+        Takes back the lastly played move, exactly restoring the state before it (including order of the pool of
+        empty squares, so search code can push and pop moves without copying the board).
+
+        :return: row, col of the move taken back.
+        """
+
+        row, col = self.moves_played.pop()
+        square = row * self.size + col
+        piece = self.piece_at(row, col)
+        self.hash ^= self._zobrist[piece][square]
+        self._remove(row, col)
+        self._result_key = None
+
+        counts = self._window_counts[piece]
+        freed = 0
+        for window in self._windows(row, col):
+            counts[window] -= 1
+            if not counts[window]:
+                del counts[window]
+                freed += 1
+        self.live[other_piece(piece)] += freed
+
+        i = self._removed_at.pop()
+        if i == len(self._empty):
+            self._empty.append(square)
+        else:
+            moved = self._empty[i]
+            self._empty[i] = square
+            self._empty_index[moved] = len(self._empty)
+            self._empty.append(moved)
+        self._empty_index[square] = i
+
+        return row, col
+
+    def _place(self, row, col, piece):
+        """ Puts the piece on the square. """
+
+        self.position[row][col] = piece
+
+    def _remove(self, row, col):
+        """ Takes the piece away from the square. """
+
+        self.position[row][col] = 0
+
+    def contains(self, row, col):
+        """ Checks if the square is on the board. """
+
+        return 0 <= row < self.size and 0 <= col < self.size
+
+    def is_free(self, row, col):
+        """ Checks in O(1) if there's no piece on the square. """
+
+        return self._empty_index[row * self.size + col] >= 0
+
+    def piece_at(self, row, col):
+        """ Piece on the square (X or O), 0 if it's empty. """
+
+        return self.position[row][col]
+
+    def empty_count(self):
+        """ Number of squares still without a piece. """
+
+        return len(self._empty)
+
+    def random_move(self, rng):
+        """
+        Picks uniformly random empty square in O(1).
+
+        :param rng: Instance of random.Random (or the random module itself).
+        :return: row, col of the square.
+        """
+
+        return divmod(self._empty[int(rng.random() * len(self._empty))], self.size)
+
+    def legal_moves(self):
+        """
+        Iterates over all empty squares (as row, col). The pool is copied first, so moves can be made and taken
+        back while iterating.
+        """
+
+        size = self.size
+        for square in tuple(self._empty):
+            yield divmod(square, size)
+
+    def is_forced_draw(self):
+        """ Checks if neither player can get win_needed pieces in order anymore (see live). """
+
+        return self.live is not None and not self.live['X'] and not self.live['O']
+
+    def has_ended(self, row, col, piece, player_name, draws=False):
         """
         Checks if we the lastly played player is a winner / if game ended.
 
@@ -44,6 +283,8 @@ class Board:
         :param col: Column of lastly played move.
         :param piece: Which piece played the move (X or O).
         :param player_name: Name of player who played the move.
+        :param draws: Also report a forced draw (see is_forced_draw), not only a win. Which one it was tells
+                      the winner attribute.
 
         The end of game is determined by lastly placed piece. We search just for player's pieces (:param piece),
         we don't care about opponent's. We check one row, one column and two diagonals (from left to right and
@@ -55,10 +296,40 @@ class Board:
         We don't need to check more, the lastly placed piece couldn't influence more squares. Then we look if the
         player obtained a winning position pattern.
 
+        The result is cached, so asking again about the same move costs nothing.
+
         returns: If the game ended: A massage of who won and how the win was obtained.
                  If the game still continues: Nothing.
         """
 
+        key = (len(self.moves_played), row, col, piece, player_name, draws)
+        if key == self._result_key:
+            return self._result
+
+        line = self._find_line(row, col, piece)
+
+        self.winner = None
+        if line:
+            self.winner = piece
+            self._result = ' '.join((f"{player_name} (player with {piece} pieces) won by having {self.win_needed}",
+                                     f"pieces in one {line}, congratulations."))
+        elif draws and self.is_forced_draw():
+            self._result = (f"Nobody can get {self.win_needed} pieces in one row / column / diagonal anymore, "
+                            "the game ended in draw.")
+        else:
+            self._result = None
+        self._result_key = key
+
+        return self._result
+
+    def _find_line(self, row, col, piece):
+        """
+        Searches the row, column and both diagonals around the lastly placed piece (see has_ended).
+
+        :return: 'row' if the winning line is a row or a column, 'diagonal' if it's one of the diagonals,
+                 None if there's no winning line.
+        """
+
         pieces_row = 0
         pieces_col = 0
         pieces_lr = 0
@@ -75,8 +346,7 @@ class Board:
                     pieces_row = 0
 
                 if pieces_row >= self.win_needed:
-                    return ' '.join((f"{player_name} (player with {piece} pieces) won by having {self.win_needed}",
-                                    "pieces in one row, congratulations."))
+                    return 'row'
             """ ----------- """
 
             """ search columns """
@@ -87,8 +357,7 @@ class Board:
                     pieces_col = 0
 
                 if pieces_col >= self.win_needed:
-                    return ' '.join((f"{player_name} (player with {piece} pieces) won by having {self.win_needed}",
-                                     "pieces in one row, congratulations."))
+                    return 'row'
             """ ---------- """
 
             """ Search diagonals. """
@@ -108,280 +377,3360 @@ class Board:
                         pieces_rl = 0
 
                 if pieces_lr >= self.win_needed or pieces_rl >= self.win_needed:
-                    return ' '.join((f"{player_name} (player with {piece} pieces) won by having {self.win_needed}",
-                                     "pieces in one diagonal, congratulations."))
+                    return 'diagonal'
             """ --------------- """
 
-    def print_board(self):
-        """ Prints current position. """
+    def board_string(self):
+        """ Current position as text (rows end with new lines), the whole frame built at once. """
+
+        position = self.position
+        border = "----" * self.size + "-"
+
+        # numbers above the board which indicate index of column
+        lines = ["".join(" " * (3 - len(str(j + 1))) + f"{j + 1} " for j in range(self.size)), border]
 
         for i in range(self.size):
+            # pieces in current row, ' ' if there's no piece on the square, number of row on the right
+            lines.append("|" + "".join(f" {' ' if x == 0 else x} |" for x in position[i]) + f" {i + 1}")
+            lines.append(border)
 
-            # Stores individual pieces in current row to print. If there's no pieces on square, stores ' '.
-            v = [' ' if x == 0 else x for x in self.position[i]]
-
-            """ Printing first 2 rows of the board. """
-            if i == 0:
-                # Printing numbers above the board which indicates index of column.
-                for j in range(self.size):
-                    q = len(str(j + 1))
-                    print(" " * int(3-q) + f"{j + 1} ", end='')
-                print()
-                print("----" * len(self.position) + "-")
-            """ ----------------------------------- """
-
-            """ For printing all rows that contain pieces. """
-            for j in range(self.size):
-                if j == 0:
-                    print(f"|", end='')
-                print(f" {v[j]} |", end='')  # Printing pieces.
-                if j == self.size - 1:
-                    print(f" {i + 1}", end='')  # Printing numbers indicating squares for the players.
-            """ -------------------------------------------- """
-
-            """ Printing bottom borders of board """
-            print()
-            print("----" * len(self.position) + "-")
-            """ -------------------------------- """
+        return "\n".join(lines) + "\n\n"
 
-        print()
+    def print_board(self):
+        """ Prints current position (with one write). """
 
+        sys.stdout.write(self.board_string())
 
-class Player:
-    """ Template for creating and managing player1 and player2. """
 
-    def __init__(self, name, piece, wins):
+class BitBoard(Board):
+    """
+    Board backend which packs each side's pieces into one Python int (bitboard).
+
+    Square [row, col] is bit row * stride + col, where stride = size + 1. The extra (always empty) padding column
+    at the end of each row stops shifts from wrapping a line around into the next row, so checking whether the
+    player has win_needed pieces in order is just a few shifts and ANDs over the whole board, for any board size.
+    The interface (make_move / has_ended / print_board / position) is the same as the one of Board.
+    """
+
+    def _setup_position(self):
         """
-        :param name: Name of player we want to create.
-        :param piece: Which piece has the player (X or O).
-        :param wins: How many games the player won.
+        bits: Bitboard of each piece.
+        shifts: How far the bits move when going one square along a row, column and both diagonals.
         """
 
-        self.name = name
-        self.piece = piece
-        self.wins = wins
+        self.stride = self.size + 1
+        self.bits = {'X': 0, 'O': 0}
+        self.shifts = (('row', 1), ('row', self.stride), ('diagonal', self.stride + 1),
+                       ('diagonal', self.stride - 1))
+
+        # For every direction: kind of line, shift, how far back the checked line starts, bits of the
+        # 2 * win_needed - 1 checked squares, bits of the first win_needed squares and the doubling shifts
+        # used to find win_needed pieces in order.
+        self._directions = []
+        for line, shift in self.shifts:
+            doubling = []
+            length = 1
+            while length < self.win_needed:
+                step = min(length, self.win_needed - length)
+                doubling.append(step * shift)
+                length += step
+
+            self._directions.append((line, shift, (self.win_needed - 1) * shift,
+                                     sum(1 << (k * shift) for k in range(2 * self.win_needed - 1)),
+                                     sum(1 << (k * shift) for k in range(self.win_needed)),
+                                     tuple(doubling)))
+
+    @property
+    def position(self):
+        """ Position as a list of lists of 0 / 'X' / 'O' (same as Board.position), built from the bitboards. """
+
+        position = [[0] * self.size for _ in range(self.size)]
+        for piece, bits in self.bits.items():
+            while bits:
+                low = bits & -bits
+                row, col = divmod(low.bit_length() - 1, self.stride)
+                position[row][col] = piece
+                bits ^= low
+
+        return position
+
+    def _place(self, row, col, piece):
+
+        self.bits[piece] |= 1 << (row * self.stride + col)
+
+    def piece_at(self, row, col):
+
+        bit = 1 << (row * self.stride + col)
+        if self.bits['X'] & bit:
+            return 'X'
+        if self.bits['O'] & bit:
+            return 'O'
+        return 0
+
+    def _remove(self, row, col):
+
+        mask = ~(1 << (row * self.stride + col))
+        self.bits['X'] &= mask
+        self.bits['O'] &= mask
+
+    def _find_line(self, row, col, piece):
+        """
+        Same squares as Board checks, but for each direction we shift the bitboard so the checked line starts at
+        bit 0 and keep only its 2 * win_needed - 1 squares (squares outside the board are zeros). Then we AND the
+        line with itself shifted by a doubling number of squares, which leaves only squares starting win_needed
+        pieces in order, and look if one of them starts a line through the lastly placed piece.
+        """
 
-    def add_win(self):
+        bits = self.bits[piece]
+        square = row * self.stride + col
 
-        self.wins += 1
+        for line, shift, back, span_mask, line_mask, doubling in self._directions:
+            offset = square - back
+            if offset >= 0:
+                starts = (bits >> offset) & span_mask
+            else:
+                starts = (bits << -offset) & span_mask
 
-    def print_score(self):
+            for step in doubling:
+                starts &= starts >> step
 
-        print(f"{self.name} ({self.piece}): {self.wins} wins")
+            if starts & line_mask:
+                return line
 
 
-def assign_pieces(name1):
+class RunBoard(Board):
     """
-    Assigns to player1 and player2 pieces according to the choice of player1.
-
-    :param name1: Name of player1.
-    :return: piece1, piece2: assigned pieces.
+    Board backend which keeps, for every direction, the length of each side's runs of pieces in order, updated
+    in place with every move. has_ended then only reads 4 integers, the lengths of the runs through the lastly
+    placed piece.
+
+    Lengths are kept in flat lists with one (always empty) square of padding around the board, so neighbours never
+    need bounds checks. Only the two ends of every run are kept up to date: the new piece joins the runs ending
+    next to it, whose lengths are read from their ends, and the joined length is written to the new ends and to
+    the new piece. That's O(1) per direction. Lengths of the joined runs are saved, so undo_move can split them
+    back exactly.
     """
 
-    while True:
-        piece1 = input(f"{name1} (player1), Do you want to be X or O?:\n").upper()
+    def _setup_position(self):
+        """
+        runs: For every piece and direction (row, column, diagonal, anti-diagonal) lengths of runs, indexed by
+              (row + 1) * width + col + 1.
+        """
 
-        if piece1 != 'X' and piece1 != 'O':
-            print("Wrong format.\n")
-            continue
+        super()._setup_position()  # position is still used to print the board
+        self.width = self.size + 2
+        self.steps = (1, self.width, self.width + 1, self.width - 1)
+        self.runs = {piece: [[0] * (self.width * self.width) for _ in self.steps] for piece in ('X', 'O')}
+        self._joined = []  # lengths of the runs joined by every move, to split them on undo_move
 
-        break
+    def _place(self, row, col, piece):
 
-    if piece1 == 'X':
-        piece2 = 'O'
-    else:
-        piece2 = 'X'
+        super()._place(row, col, piece)
 
-    return piece1, piece2
+        square = (row + 1) * self.width + col + 1
+        joined = []
+        for runs, step in zip(self.runs[piece], self.steps):
+            before = runs[square - step]  # length of the run ending right before the square
+            after = runs[square + step]   # length of the run starting right after the square
+            length = before + 1 + after
+            runs[square - before * step] = length
+            runs[square + after * step] = length
+            runs[square] = length
+            joined.append(before)
+            joined.append(after)
 
+        self._joined.append(joined)
 
-def get_board_size():
-    """
-    Asks player to choose the size of board until it's in correct form.
+    def _remove(self, row, col):
 
-    :return: Size of board.
-    """
+        square = (row + 1) * self.width + col + 1
+        joined = self._joined.pop()
+        for i, (runs, step) in enumerate(zip(self.runs[self.position[row][col]], self.steps)):
+            before = joined[2 * i]
+            after = joined[2 * i + 1]
+            # the runs on both sides of the square get back their own lengths
+            runs[square - before * step] = before
+            runs[square + after * step] = after
+            runs[square] = 0
 
-    while True:
-        try:
-            size_board = int(input("Choose size of the board (3+):\n"))
-        except ValueError:
-            print("Wrong input / not integer\n")
-            continue
-        if size_board <= 2:
-            print("Too small... Please select board of size 3 and more\n")
-            continue
-        break
+        super()._remove(row, col)
 
-    return size_board
+    def _find_line(self, row, col, piece):
+
+        square = (row + 1) * self.width + col + 1
+        for line, runs in zip(('row', 'row', 'diagonal', 'diagonal'), self.runs[piece]):
+            if runs[square] >= self.win_needed:
+                return line
+
+
+def _mix64(value):
+    """ splitmix64 finalizer, used as Zobrist key of squares which can't be precomputed. """
+
+    value = (value + 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+    return value ^ (value >> 31)
 
 
-def get_player_move(piece_on_move, name_on_move, size_board, moves_played, print_board):
+class SparseBoard(Board):
     """
-    Asks for player to make a move. Next it checks if the move is playable
+    Board backend which stores only occupied squares, for gomoku-scale or unbounded (size None) boards.
 
-    :param piece_on_move: Piece of the player on move (X or O).
-    :param name_on_move: Name of player on move.
-    :param size_board: Size of board.
-    :param moves_played: All moves which have been played so far to avoid rewriting a piece.
-    :param print_board: Function of class Board, which prints a board after execution.
+    Squares are kept in a dictionary keyed by packed ints, (row + OFFSET) << 32 | (col + OFFSET), so a neighbour
+    is just the key plus a constant (1 for the next column, 1 << 32 for the next row). Memory is proportional to
+    the number of moves played, has_ended walks at most win_needed - 1 squares in every direction and
+    print_board shows only a viewport around the lastly played move.
 
-    :return: row and column of correct / playable move made by player.
+    On a bounded board live windows (see Board) are tracked in dictionaries of windows which have any piece, so
+    forced draws are still found; an unbounded board is never a forced draw. Empty squares aren't pooled, so
+    random_move samples squares. Computer opponents keep arrays of all squares, so they play only on bounded
+    boards (in the interactive game below SPARSE_BOARD_FROM).
     """
 
-    while True:
-        print("To make a move, you have to provide row and column separated\n"
-              "by space [row col], rows and columns starts at 1.\n\n"
-              f"{name_on_move}, please make a move (player with {piece_on_move} pieces):\n", end='')
-        try:
-            row, col = map(int, input().rstrip().split())
-        except ValueError:
-            print_board()
-            print("Incorrect form of move, please make sure it's in form -> row column separated by space.\n")
-            continue
+    OFFSET = 1 << 31
+    ROW = 1 << 32
+    # (kind of line, row step, col step) of every direction
+    DIRECTIONS = (('row', 0, 1), ('row', 1, 0), ('diagonal', 1, 1), ('diagonal', 1, -1))
 
-        # to index arrays
-        row -= 1
-        col -= 1
+    def __init__(self, size=None, win_needed=None, viewport=15):
+        """
+        :param size: Size of the board, None for unbounded board.
+        :param win_needed: How many pieces in order are needed to win (default depends on size, 5 if unbounded).
+        :param viewport: How many rows and columns print_board shows.
 
-        print_board()
+        cells: Dictionary packed square -> piece.
+        """
 
-        if (row < 0 or row >= size_board) or (col < 0 or col >= size_board):
-            print("Square doesn't exist / out of borders.\n")
-            continue
+        self.size = size
+        self.win_needed = win_needed if win_needed is not None else default_win_needed(size)
 
-        if [row, col] in moves_played:
-            print("There's already piece on the square.\n")
-            continue
+        self.viewport = viewport
+        self.moves_played = []
+        self.cells = {}
+        self.hash = 0
+        self._result_key = None
+        self._result = None
+        self.winner = None
+
+        self._window_counts = {'X': {}, 'O': {}}  # window -> number of pieces, only windows with a piece
+        if size is None:
+            self.live = None
+        else:
+            span = max(0, size - self.win_needed + 1)
+            windows = 2 * size * span + 2 * span * span
+            self.live = {'X': windows, 'O': windows}
 
-        break
+    def _key(self, row, col):
 
-    return row, col
+        return (row + self.OFFSET) * self.ROW + col + self.OFFSET
 
+    def contains(self, row, col):
 
-def start_again():
-    """
-    Asks player to start a game again.
+        return self.size is None or (0 <= row < self.size and 0 <= col < self.size)
 
-    :return True if player chooses to play game again.
-            False if player wants to stop playing.
-    """
+    def _windows(self, row, col):
+        """ Ids of windows of win_needed squares in order which contain the square (bounded board only). """
 
-    while True:
-        again = input("Start again? (y/n):\n").lower()
-        if again == 'y' or again == 'yes' or again == 'n' or again == 'no':
-            break
-        else:
-            print("Wrong input, expected y/n\n")
+        size = self.size
+        last = self.win_needed - 1
+        key = self._key(row, col)
+        ids = []
 
-    if again == 'n' or again == 'no':
-        return False
+        for direction, (_, row_step, col_step) in enumerate(self.DIRECTIONS):
+            step = row_step * self.ROW + col_step
+            for k in range(last + 1):
+                start_row = row - k * row_step
+                start_col = col - k * col_step
+                end_col = start_col + last * col_step
+                if (start_row >= 0 and start_row + last * row_step < size
+                        and 0 <= start_col < size and 0 <= end_col < size):
+                    ids.append((key - k * step) * 4 + direction)
 
-    return True
+        return ids
 
+    def make_move(self, row, col, piece):
 
-def play_game(player1, player2,  size_board):
-    """
-    Handles whole playing logic with help of various functions.
+        key = self._key(row, col)
+        self.cells[key] = piece
+        self.moves_played.append([row, col])
+        self.hash ^= _mix64(key * 2 + (piece == 'O'))
 
-    Randomly decides which player should start first. Then prints a board, plays a move and checks if the game
-    has ended in loop. Loops until all moves have been played, in that case declares draw. Updates wins in player1
-    and player2 if the game wasn't drawn.
+        if self.live is not None:
+            counts = self._window_counts[piece]
+            blocked = 0
+            for window in self._windows(row, col):
+                if window not in counts:
+                    blocked += 1
+                    counts[window] = 0
+                counts[window] += 1
+            self.live[other_piece(piece)] -= blocked
 
-    :param player1: Instance of the class Player. Player1 doesn't mean he has to start first.
-    :param player2: Another instance of class Player.
-    :return: Nothing.
-    """
+    def undo_move(self):
 
-    board = Board(size_board)
+        row, col = self.moves_played.pop()
+        key = self._key(row, col)
+        piece = self.cells.pop(key)
+        self.hash ^= _mix64(key * 2 + (piece == 'O'))
+        self._result_key = None
 
-    # randomly assign who starts first
-    starts_first = randint(1, 2)
+        if self.live is not None:
+            counts = self._window_counts[piece]
+            freed = 0
+            for window in self._windows(row, col):
+                counts[window] -= 1
+                if not counts[window]:
+                    del counts[window]
+                    freed += 1
+            self.live[other_piece(piece)] += freed
 
-    print("Randomly assigning who starts first...")
-    if starts_first == 1:
-        print(f"{player1.name} with pieces {player1.piece} starts first.\n")
-    else:
-        print(f"{player2.name} with pieces {player2.piece} starts first.\n")
+        return row, col
 
-    for i in range(size_board ** 2):
+    def is_free(self, row, col):
 
-        print("Current score is:")
-        player1.print_score()
-        player2.print_score()
-        print()
+        return self._key(row, col) not in self.cells
 
-        board.print_board()
+    def piece_at(self, row, col):
 
-        if (i % 2 == 0 and starts_first == 1) or (i % 2 == 1 and starts_first == 2):  # player1 on move
-            piece_on_move = player1.piece
-            name_on_move = player1.name
-        else:  # player2 on move
-            piece_on_move = player2.piece
-            name_on_move = player2.name
+        return self.cells.get(self._key(row, col), 0)
 
-        if i == 0:
-            print(f"Having {board.win_needed} pieces in order wins")
-            print()
+    def empty_count(self):
 
-        # gets row and column of lastly played move
-        row, col = get_player_move(piece_on_move, name_on_move, size_board, board.moves_played, board.print_board)
+        return float('inf') if self.size is None else self.size * self.size - len(self.cells)
 
-        print('\n' * 100)  # clear the console
+    def random_move(self, rng):
+        """
+        Random empty square: uniformly sampled on a bounded board, on unbounded board a random empty square at
+        most 2 squares from a placed piece (the middle of the board if there's none).
+        """
 
-        board.make_move(row, col, piece_on_move)
+        if self.size is None:
+            if not self.moves_played:
+                return 0, 0
+            while True:
+                row, col = self.moves_played[int(rng.random() * len(self.moves_played))]
+                row += int(rng.random() * 5) - 2
+                col += int(rng.random() * 5) - 2
+                if self.is_free(row, col):
+                    return row, col
+
+        if len(self.cells) * 2 > self.size * self.size:  # crowded board, sample only empty squares
+            empty = list(self.legal_moves())
+            return empty[int(rng.random() * len(empty))]
+
+        while True:
+            row = int(rng.random() * self.size)
+            col = int(rng.random() * self.size)
+            if self._key(row, col) not in self.cells:
+                return row, col
+
+    def legal_moves(self):
+        """
+        Iterates over empty squares: all of them on a bounded board, squares next to placed pieces on unbounded.
+        """
 
-        if board.has_ended(row, col, piece_on_move, name_on_move):  # we have a winner
+        if self.size is not None:
+            for row in range(self.size):
+                for col in range(self.size):
+                    if self._key(row, col) not in self.cells:
+                        yield row, col
+            return
 
-            board.print_board()
-            print(board.has_ended(row, col, piece_on_move, name_on_move) + '\n')  # print message
+        seen = set()
+        for row, col in list(self.moves_played):
+            for i in (-1, 0, 1):
+                for j in (-1, 0, 1):
+                    if (row + i, col + j) not in seen and self.is_free(row + i, col + j):
+                        seen.add((row + i, col + j))
+                        yield row + i, col + j
+
+    def _find_line(self, row, col, piece):
+        """ Walks from the lastly placed piece to both sides of every direction (at most win_needed - 1 squares). """
+
+        cells = self.cells
+        key = self._key(row, col)
+        for line, row_step, col_step in self.DIRECTIONS:
+            step = row_step * self.ROW + col_step
+            count = 1
+            for direction in (step, -step):
+                neighbour = key + direction
+                while count < self.win_needed and cells.get(neighbour) == piece:
+                    count += 1
+                    neighbour += direction
+            if count >= self.win_needed:
+                return line
+
+    @property
+    def position(self):
+        """ Position of the viewport as a list of lists (see print_board). """
+
+        rows, cols = self.view()
+        return [[self.piece_at(row, col) for col in cols] for row in rows]
+
+    def view(self, center=None):
+        """
+        Rows and columns shown by print_board: viewport squares around the center (lastly played move by default),
+        kept on the board if it's bounded.
 
-            # add a win
-            if name_on_move == player1.name:
-                player1.add_win()
+        :return: rows, cols: Ranges of rows and columns.
+        """
+
+        if center is None:
+            center = self.moves_played[-1] if self.moves_played else (0, 0) if self.size is None else \
+                (self.size // 2, self.size // 2)
+
+        ranges = []
+        for middle in center:
+            start = middle - self.viewport // 2
+            if self.size is not None:
+                start = max(0, min(start, self.size - self.viewport))
+                ranges.append(range(start, min(start + self.viewport, self.size)))
             else:
-                player2.add_win()
+                ranges.append(range(start, start + self.viewport))
 
-            return
+        return ranges[0], ranges[1]
 
-    board.print_board()
-    print("Looks like the game ended in draw (booring).\n")
+    def print_board(self, center=None):
+        """ Prints the viewport (see board_string). """
 
+        sys.stdout.write(self.board_string(center))
 
-if __name__ == '__main__':
+    def board_string(self, center=None):
+        """
+        The viewport (see view) as text in the same form as Board.board_string; squares are wider when row or
+        column numbers have more than 3 digits.
 
-    name1 = input("Please enter your name player1:\n")
-    name2 = input("Please enter your name player2:\n")
-    piece1, piece2 = assign_pieces(name1)  # get who starts and get other player
+        :param center: [row, col] the viewport is centered on (lastly played move by default).
+        """
 
-    player1 = Player(name=name1, piece=piece1, wins=0)
-    player2 = Player(name=name2, piece=piece2, wins=0)
+        rows, cols = self.view(center)
+        width = max(3, len(str(cols[-1] + 1)), len(str(cols[0] + 1)))
+        line = ("-" * (width + 1)) * len(cols) + "-"
 
-    playing = True
+        output = ["".join(f"{col + 1:>{width}} " for col in cols), line]
+        for row in rows:
+            pieces = "".join(f"{self.cells.get(self._key(row, col)) or ' ':^{width}}|" for col in cols)
+            output.append(f"|{pieces} {row + 1}")
+            output.append(line)
 
-    while playing:
-        size_board = get_board_size()  # get size of board user wants to have
+        return "\n".join(output) + "\n\n"
 
-        play_game(player1, player2, size_board)  # starts playing game
 
-        print("Current score is:")
-        player1.print_score()
-        player2.print_score()
-        print()
+BOARD_BACKENDS = {'list': Board, 'bitboard': BitBoard, 'runs': RunBoard, 'sparse': SparseBoard}
+SPARSE_BOARD_FROM = 100  # games get SparseBoard from this size, computer opponents play only on smaller boards
 
-        if not start_again():  # start game again or end game
-            playing = False
 
-    print(f"Game ended with score:")
-    player1.print_score()
-    player2.print_score()
-    print()
+class TerminalRenderer:
+    """
+    Draws frames (score and board) to the terminal, every frame with a single write.
+
+    On terminals which understand ANSI escape codes the first frame clears the screen and the next frames only
+    overwrite characters which changed since the previous frame (cursor is moved right to them), then everything
+    below the frame (prompts, messages) is cleared. Cursor positions are absolute, so that works only while the
+    frame fits the terminal (with a line for the prompt) and no line wraps; bigger frames are redrawn whole after
+    clearing the screen. Dumb terminals (or output which isn't a terminal) get the whole frame after 100 new
+    lines, which pushes the old one out of the screen.
+    """
 
-    if player1.wins > player2.wins:
-        print(f"Player {player1.name} won, congratulations.\n")
-    elif player1.wins == player2.wins:
-        print("Game ended in draw.\n")
-    else:
-        print(f"Player {player2.name} won, congratulations.\n")
+    def __init__(self, stream=None, ansi=None, terminal_size=None):
+        """
+        :param stream: Where to write (sys.stdout by default).
+        :param ansi: Use ANSI escape codes, by default if the stream is a terminal and TERM isn't dumb.
+        :param terminal_size: (columns, lines) the frames are drawn to, by default the size of the terminal
+                              checked before every frame (shutil.get_terminal_size).
+        """
 
-    print("Thanks for playing!")
+        self.stream = stream or sys.stdout
+        if ansi is None:
+            ansi = (hasattr(self.stream, 'isatty') and self.stream.isatty()
+                    and os.environ.get('TERM', 'dumb') != 'dumb')
+        self.ansi = ansi
+        self.terminal_size = terminal_size
+        self.previous = None  # lines of the last frame, None if the next frame has to be drawn whole
+
+    def frame_text(self, frame):
+        """
+        :param frame: Whole frame as text.
+        :return: What has to be written to show the frame.
+        """
+
+        lines = frame.rstrip("\n").split("\n")
+
+        if not self.ansi:
+            self.previous = lines
+            return "\n" * 100 + frame
+
+        columns, rows = self.terminal_size or shutil.get_terminal_size()
+        if len(lines) >= rows or max(map(len, lines)) > columns:
+            # doesn't fit, cursor positions would be off: the whole frame, the next one is whole again
+            self.previous = None
+            return "\x1b[H\x1b[2J" + "\n".join(lines) + "\n\x1b[J"
+
+        if self.previous is None or len(self.previous) != len(lines):
+            output = ["\x1b[H\x1b[2J", "\n".join(lines)]
+        else:
+            output = []
+            for row, (old, new) in enumerate(zip(self.previous, lines)):
+                if old != new:
+                    output.extend(self._changed_spans(row, old, new))
+
+        # cursor below the frame, clear old prompts and messages
+        output.append(f"\x1b[{len(lines) + 1};1H\x1b[J")
+        self.previous = lines
+
+        return "".join(output)
+
+    @staticmethod
+    def _changed_spans(row, old, new):
+        """ Escape codes rewriting changed characters of one line; spans closer than 4 characters are merged. """
+
+        output = []
+        start = None
+        end = None
+        for col in range(len(new)):
+            if col >= len(old) or old[col] != new[col]:
+                if start is None:
+                    start = col
+                elif col - end > 4:
+                    output.append(f"\x1b[{row + 1};{start + 1}H{new[start:end]}")
+                    start = col
+                end = col + 1
+
+        if start is not None:
+            output.append(f"\x1b[{row + 1};{start + 1}H{new[start:end]}")
+        if len(old) > len(new):
+            output.append(f"\x1b[{row + 1};{len(new) + 1}H\x1b[K")
+
+        return output
+
+    def draw(self, frame):
+        """ Writes the frame (text) with a single call. """
+
+        self.stream.write(self.frame_text(frame))
+        self.stream.flush()
+
+
+class Player:
+    """ Template for creating and managing player1 and player2. """
+
+    def __init__(self, name, piece, wins, engine=None):
+        """
+        :param name: Name of player we want to create.
+        :param piece: Which piece has the player (X or O).
+        :param wins: How many games the player won.
+        :param engine: Computer opponent choosing moves for this player (e.g. AlphaBetaPlayer), None for human.
+        """
+
+        self.name = name
+        self.piece = piece
+        self.wins = wins
+        self.engine = engine
+
+    def add_win(self):
+
+        self.wins += 1
+
+    def score_string(self):
+
+        return f"{self.name} ({self.piece}): {self.wins} wins"
+
+    def print_score(self):
+
+        print(self.score_string())
+
+
+def other_piece(piece):
+
+    return 'O' if piece == 'X' else 'X'
+
+
+class RandomPolicy:
+    """ Move policy for headless games: plays uniformly random empty square. """
+
+    name = 'random'
+
+    def choose_move(self, board, piece, rng):
+        """
+        :param board: Instance of the class Board (or one of its backends).
+        :param piece: Piece of the player on move.
+        :param rng: Instance of random.Random of the game.
+        :return: row, col of the move.
+        """
+
+        return board.random_move(rng)
+
+
+class GreedyPolicy:
+    """
+    Move policy for headless games: wins if it can, otherwise blocks opponent's win, otherwise plays random square
+    next to its own pieces (random square if there's none).
+
+    Winning square always neighbours one of the player's pieces, so only squares around played moves are tried.
+    """
+
+    name = 'greedy'
+
+    def choose_move(self, board, piece, rng):
+
+        opponent = other_piece(piece)
+        own_neighbours = []
+        opponent_neighbours = []
+
+        for row, col in board.moves_played:
+            neighbours = own_neighbours if board.piece_at(row, col) == piece else opponent_neighbours
+            for i in (-1, 0, 1):
+                for j in (-1, 0, 1):
+                    if board.contains(row + i, col + j) and board.is_free(row + i, col + j):
+                        neighbours.append((row + i, col + j))
+
+        for candidate_piece, candidates in ((piece, own_neighbours), (opponent, opponent_neighbours)):
+            for row, col in candidates:
+                board.make_move(row, col, candidate_piece)
+                won = board.has_ended(row, col, candidate_piece, candidate_piece)
+                board.undo_move()
+                if won:
+                    return row, col
+
+        if own_neighbours:
+            return own_neighbours[int(rng.random() * len(own_neighbours))]
+
+        return board.random_move(rng)
+
+
+class ScriptedPolicy:
+    """
+    Move policy for headless games: plays given moves in order (skipping squares which are already taken), then
+    continues randomly.
+    """
+
+    name = 'scripted'
+
+    def __init__(self, moves):
+        """
+        :param moves: List of (row, col) moves, indexed from 0.
+        """
+
+        self.moves = list(moves)
+
+    def choose_move(self, board, piece, rng):
+
+        # count own moves played so far, script continues from there
+        played = sum(1 for row, col in board.moves_played if board.piece_at(row, col) == piece)
+        for row, col in self.moves[played:]:
+            if board.contains(row, col) and board.is_free(row, col):
+                return row, col
+
+        return board.random_move(rng)
+
+
+class RandomOpeningPolicy:
+    """
+    Move policy for headless games: plays random squares for the first few moves of the game, then lets another
+    policy play. Makes games of deterministic policies (e.g. AlphaBetaPlayer) differ from each other.
+    """
+
+    def __init__(self, policy, moves=4):
+        """
+        :param policy: Move policy playing after the opening.
+        :param moves: Number of moves of both players played randomly.
+        """
+
+        self.policy = policy
+        self.moves = moves
+        self.name = policy.name
+
+    def choose_move(self, board, piece, rng):
+
+        if len(board.moves_played) < self.moves:
+            return board.random_move(rng)
+
+        return self.policy.choose_move(board, piece, rng)
+
+
+class _SearchTimeout(Exception):
+    """ Raised inside of the search when the time for a move is up. """
+
+
+class TranspositionTable:
+    """
+    Fixed size table of already searched positions, indexed by low bits of position's hash.
+
+    Replacement policy: an entry is overwritten by an entry of the same position, by an entry from a newer search
+    (generation) or by an entry searched at least as deep, otherwise the deeper entry is kept.
+    """
+
+    EXACT, LOWER, UPPER = 0, 1, 2
+
+    def __init__(self, size=1 << 16):
+        """
+        :param size: Number of entries, rounded up to power of 2.
+        """
+
+        size = 1 << max(0, size - 1).bit_length()
+        self.mask = size - 1
+        self.entries = [None] * size
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+        self.replacements = 0
+
+    def new_search(self):
+
+        self.generation += 1
+
+    def probe(self, key):
+        """ :return: (key, depth, score, flag, best move, generation) of the position or None. """
+
+        self.probes += 1
+        entry = self.entries[key & self.mask]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+
+        return None
+
+    def store(self, key, depth, score, flag, move):
+
+        slot = key & self.mask
+        entry = self.entries[slot]
+        if entry is None or entry[0] == key or entry[5] != self.generation or depth >= entry[1]:
+            if entry is not None and entry[0] != key:
+                self.replacements += 1
+            self.entries[slot] = (key, depth, score, flag, move, self.generation)
+
+    def hit_rate(self):
+
+        return self.hits / self.probes if self.probes else 0.0
+
+
+# (name of shared memory, pid) -> SharedMemory, its buffer as 64 bit words and process number, for tables attached
+# by this process (all copies of a table in one process use the same memory)
+_attached_tables = {}
+# name of shared memory -> multiprocessing.Lock guarding process numbers of the table, created by the process which
+# created the table and inherited by worker processes (see _share_table_locks)
+_table_locks = {}
+
+
+def _share_table_locks(locks):
+    """ Initializer of worker processes: takes locks of shared tables of the parent (see _table_locks). """
+
+    _table_locks.update(locks)
+
+
+def _detach_table(name, pid):
+    """ Detaches the process from the table and gives its process number back, does nothing if not attached. """
+
+    attached = _attached_tables.pop((name, pid), None)
+    if attached is None:
+        return
+
+    memory, words, process = attached
+    with _table_locks[name]:
+        words[1] &= ~(1 << process) & SharedTranspositionTable._MASK
+    words.release()
+    memory.close()
+
+
+class SharedTranspositionTable:
+    """
+    TranspositionTable in shared memory (multiprocessing.shared_memory), so worker processes searching with copies
+    of one AlphaBetaPlayer share the positions they searched. Pickled table (e.g. sent to a worker of
+    ProcessPoolExecutor together with the player) attaches to the same memory.
+
+    Entries are 3 unsigned 64 bit words, no Python objects: key XORed with the other two words, score and packed
+    depth / flag / generation / number of the writing process / best move. Writes aren't locked, an entry torn by
+    two processes writing at once doesn't pass the key check and is just a miss.
+
+    Open addressing: a position is in one of BUCKET slots following the slot given by its hash. Replacement policy:
+    the same position, otherwise an empty slot, otherwise the entry from an older search or the shallowest one; an
+    entry of a current search deeper than the new one is kept. Every process counts its own searches (generation),
+    an entry is from a current search when its generation is the current one of the process which wrote it.
+
+    Every attached process gets a number (under a lock, given back when the process detaches and reused by the next
+    one) and a row of the shared header with its statistics and generation, stats() sums the statistics. Worker
+    processes get the lock by inheritance, from fork or from the pool initializer _share_table_locks.
+    """
+
+    EXACT, LOWER, UPPER = TranspositionTable.EXACT, TranspositionTable.LOWER, TranspositionTable.UPPER
+    BUCKET = 4
+    MAX_PROCESSES = 64
+    STATS = ('probes', 'hits', 'shared_hits', 'stores', 'replacements', 'overwrites')
+    _HEADER = 8  # words: number of entries, bit mask of attached process numbers, number of process rows used
+    _ROW = len(STATS) + 1  # words of a process: statistics and generation
+    _ENTRIES = _HEADER + _ROW * MAX_PROCESSES  # first word of entries, after rows of processes
+    _USED = 1 << 63  # set in the info word of every entry
+    _MASK = (1 << 64) - 1
+
+    def __init__(self, size=1 << 20, name=None):
+        """
+        :param size: Number of entries, rounded up to power of 2 (24 bytes each).
+        :param name: Name of existing table's shared memory to attach to, None creates a new table.
+        """
+
+        self.owner = name is None
+        if self.owner:
+            size = 1 << max(0, size - 1).bit_length()
+            memory = shared_memory.SharedMemory(create=True, size=8 * (self._ENTRIES + 3 * size))  # zeroed
+            words = memory.buf.cast('Q')
+            words[0] = size
+            words[1] = 1  # this process has number 0
+            words[2] = 1
+            name = memory.name
+            _table_locks[name] = Lock()
+            _attached_tables[name, os.getpid()] = (memory, words, 0)
+
+        elif (name, os.getpid()) not in _attached_tables:
+            if name not in _table_locks:
+                raise ValueError(f"Table {name} can be shared only with worker processes of its creator")
+            memory = shared_memory.SharedMemory(name=name)
+            words = memory.buf.cast('Q')
+            with _table_locks[name]:
+                free = ~words[1] & self._MASK
+                process = (free & -free).bit_length() - 1  # lowest free number, -1 if there's none
+                if process >= 0:
+                    words[1] |= 1 << process
+                    words[2] = max(words[2], process + 1)
+            if process < 0:
+                words.release()
+                memory.close()
+                raise ValueError(f"At most {self.MAX_PROCESSES} processes can share the table at once")
+            _attached_tables[name, os.getpid()] = (memory, words, process)
+            # workers of pools exit without closing their copies, give the number back at exit
+            Finalize(None, _detach_table, args=(name, os.getpid()), exitpriority=10)
+
+            # entries of the previous process with this number are from an older search
+            at = self._HEADER + self._ROW * process + len(self.STATS)
+            words[at] = (words[at] + 1) & 255
+
+        self.name = name
+        self.memory, self.words, self.process = _attached_tables[name, os.getpid()]
+        self.size = self.words[0]
+        self.mask = self.size - 1
+        self._row = self._HEADER + self._ROW * self.process  # first word of this process's row
+
+    @property
+    def generation(self):
+        """ Number of the current search of this process (modulo 256), shared by all copies in the process. """
+
+        return self.words[self._row + len(self.STATS)]
+
+    def new_search(self):
+
+        at = self._row + len(self.STATS)
+        self.words[at] = (self.words[at] + 1) & 255
+
+    def probe(self, key):
+        """ :return: (key, depth, score, flag, best move, generation) of the position or None. """
+
+        words = self.words
+        row = self._row
+        words[row] += 1
+
+        for i in range(self.BUCKET):
+            at = self._ENTRIES + 3 * ((key + i) & self.mask)
+            score, info = words[at + 1], words[at + 2]
+            if info and words[at] ^ score ^ info == key:
+                words[row + 1] += 1
+                if (info >> 24) & 255 != self.process:
+                    words[row + 2] += 1
+                move = (info >> 32 & 0x7FFFFFFF) - 1
+                return (key, info & 255, score - (1 << 64) if score >> 63 else score, (info >> 8) & 255,
+                        None if move < 0 else move, (info >> 16) & 255)
+
+        return None
+
+    def store(self, key, depth, score, flag, move):
+
+        words = self.words
+        row = self._row
+        generation = words[row + len(self.STATS)]
+        victim = victim_priority = victim_info = None
+
+        for i in range(self.BUCKET):
+            at = self._ENTRIES + 3 * ((key + i) & self.mask)
+            info = words[at + 2]
+            if not info or words[at] ^ words[at + 1] ^ info == key:
+                victim, victim_info = at, None
+                break
+            # is the entry from the current search of the process which wrote it
+            writer_generation = words[self._HEADER + self._ROW * ((info >> 24) & 255) + len(self.STATS)]
+            priority = ((info >> 16) & 255 == writer_generation, info & 255)
+            if victim is None or priority < victim_priority:
+                victim, victim_priority, victim_info = at, priority, info
+
+        if victim_info is not None:
+            if victim_priority[0] and victim_priority[1] > depth:
+                return
+            words[row + 4] += 1
+            if (victim_info >> 24) & 255 != self.process:
+                words[row + 5] += 1
+
+        words[row + 3] += 1
+        score &= self._MASK
+        info = (self._USED | (0 if move is None else move + 1) << 32 | self.process << 24 | generation << 16
+                | flag << 8 | depth)
+        words[victim] = key ^ score ^ info
+        words[victim + 1] = score
+        words[victim + 2] = info
+
+    def hit_rate(self):
+        """ Hit rate of this process's probes. """
+
+        probes = self.words[self._row]
+        return self.words[self._row + 1] / probes if probes else 0.0
+
+    def stats(self):
+        """
+        Statistics of all processes: probes, hits, shared_hits (hits of entries written by another process),
+        stores, replacements (stores which evicted another position), overwrites (evicted entries written by
+        another process, i.e. contention between processes), processes (rows of process numbers used, reused
+        numbers share a row), hit_rate, shared_hit_rate, overwrite_rate and fill (used fraction of entries).
+        """
+
+        words = self.words
+        processes = words[2]
+        totals = {name: sum(words[self._HEADER + self._ROW * process + i] for process in range(processes))
+                  for i, name in enumerate(self.STATS)}
+
+        totals['processes'] = processes
+        totals['hit_rate'] = totals['hits'] / totals['probes'] if totals['probes'] else 0.0
+        totals['shared_hit_rate'] = totals['shared_hits'] / totals['hits'] if totals['hits'] else 0.0
+        totals['overwrite_rate'] = totals['overwrites'] / totals['stores'] if totals['stores'] else 0.0
+        end = self._ENTRIES + 3 * self.size
+        totals['fill'] = sum(1 for at in range(self._ENTRIES + 2, end, 3) if words[at]) / self.size
+
+        return totals
+
+    def close(self):
+        """
+        Detaches this process from the table (all its copies in the process), the process which created it also
+        frees the memory.
+        """
+
+        _detach_table(self.name, os.getpid())
+        if self.owner:
+            self.memory.unlink()
+            _table_locks.pop(self.name, None)
+
+    def __getstate__(self):
+
+        return self.name
+
+    def __setstate__(self, name):
+
+        self.__init__(name=name)
+
+
+class AlphaBetaPlayer:
+    """
+    Computer opponent: negamax alpha-beta search with iterative deepening, bounded by time per move.
+
+    Positions are evaluated by windows of win_needed squares (see line_windows): a window holding only one
+    player's pieces is worth more the more pieces it has, a window with pieces of both players is worth nothing.
+    Piece counts of all windows and the evaluation are updated incrementally with every searched move, which also
+    tells right away when a move wins. Only squares near to already placed pieces are searched, ordered by the
+    transposition table move first and then by how much the square adds to own and opponent's windows; on big
+    boards only the best max_branching squares are searched below the root.
+
+    Can be used both as an engine of Player and as a move policy of headless games.
+    """
+
+    name = 'alphabeta'
+    WIN_SCORE = 10 ** 9
+    SIDE_KEY = 0x9E3779B97F4A7C15  # XORed into the hash when O is on move
+
+    def __init__(self, time_limit=0.1, tt_size=1 << 16, max_depth=64, max_branching=12, radius=2, table=None):
+        """
+        :param time_limit: Seconds the search can take per move (the first depth is always finished).
+        :param tt_size: Number of entries of the transposition table.
+        :param max_depth: Maximal depth of iterative deepening.
+        :param max_branching: How many best ordered moves are searched below the root.
+        :param radius: Squares at most this far from a placed piece are searched.
+        :param table: Transposition table to use instead of a new TranspositionTable(tt_size), e.g.
+                      SharedTranspositionTable shared by copies of the player in worker processes.
+        """
+
+        self.time_limit = time_limit
+        self.table = table if table is not None else TranspositionTable(tt_size)
+        self.max_depth = max_depth
+        self.max_branching = max_branching
+        self.radius = radius
+        self.last_stats = {}
+        self.total_nodes = 0
+        self.total_seconds = 0.0
+
+    def _setup(self, board):
+        """ Builds window counts, evaluation and neighbourhood of the position on board. """
+
+        self.board = board
+        size = board.size
+        win_needed = board.win_needed
+        self._windows, self._square_windows = line_windows(size, win_needed)
+        self._counts = {'X': [0] * len(self._windows), 'O': [0] * len(self._windows)}
+        self._score = 0  # evaluation from X's point of view
+
+        # _values[a][b]: value of window with a own and b opponent's pieces
+        weights = [0] + [8 ** k for k in range(1, win_needed + 2)]
+        self._values = [[weights[a] if b == 0 else -weights[b] if a == 0 else 0 for b in range(win_needed + 2)]
+                        for a in range(win_needed + 2)]
+        # _order_values[a][b]: how much playing into the window helps the player on move and how much it stops
+        # the opponent
+        self._order_values = [[abs(self._values[a + 1][b] - self._values[a][b])
+                               + abs(self._values[a][b + 1] - self._values[a][b]) for b in range(win_needed + 1)]
+                              for a in range(win_needed + 1)]
+
+        self._near = [0] * (size * size)
+        self._neighbours = []
+        for square in range(size * size):
+            row, col = divmod(square, size)
+            self._neighbours.append([(row + i) * size + col + j
+                                     for i in range(-self.radius, self.radius + 1)
+                                     for j in range(-self.radius, self.radius + 1)
+                                     if (i or j) and 0 <= row + i < size and 0 <= col + j < size])
+
+        for row, col in board.moves_played:
+            self._apply(row * size + col, board.piece_at(row, col))
+
+    def _apply(self, square, piece):
+        """
+        Updates window counts, evaluation and neighbourhood after piece was placed on the square.
+
+        :return: True if the move won the game.
+        """
+
+        own = self._counts[piece]
+        opponent = self._counts[other_piece(piece)]
+        values = self._values
+        win_needed = self.board.win_needed
+        delta = 0
+        won = False
+
+        for window in self._square_windows[square]:
+            a = own[window]
+            b = opponent[window]
+            delta += values[a + 1][b] - values[a][b]
+            own[window] = a + 1
+            if a + 1 == win_needed:
+                won = True
+
+        self._score += delta if piece == 'X' else -delta
+        for neighbour in self._neighbours[square]:
+            self._near[neighbour] += 1
+
+        return won
+
+    def _revert(self, square, piece):
+        """ Reverts _apply. """
+
+        own = self._counts[piece]
+        opponent = self._counts[other_piece(piece)]
+        values = self._values
+        delta = 0
+
+        for window in self._square_windows[square]:
+            a = own[window] - 1
+            b = opponent[window]
+            delta += values[a + 1][b] - values[a][b]
+            own[window] = a
+
+        self._score -= delta if piece == 'X' else -delta
+        for neighbour in self._neighbours[square]:
+            self._near[neighbour] -= 1
+
+    def _ordered_moves(self, piece, best_move, limit):
+        """ Candidate squares, best first (see class description). """
+
+        board = self.board
+        if not board.moves_played:
+            center = (board.size // 2) * board.size + board.size // 2
+            return [center]
+
+        near = self._near
+        size = board.size
+        candidates = ([square for square, count in enumerate(near) if count and board.is_free(*divmod(square, size))]
+                      or [row * size + col for row, col in board.legal_moves()])
+
+        own = self._counts[piece]
+        opponent = self._counts[other_piece(piece)]
+        order_values = self._order_values
+        square_windows = self._square_windows
+        scored = []
+        for square in candidates:
+            priority = 0
+            for window in square_windows[square]:
+                priority += order_values[own[window]][opponent[window]]
+            scored.append((priority, square))
+        scored.sort(reverse=True)
+
+        moves = [square for _, square in scored]
+        if best_move is not None and best_move in candidates:
+            moves.remove(best_move)
+            moves.insert(0, best_move)
+
+        if limit and len(moves) > limit:
+            moves = moves[:limit]
+
+        return moves
+
+    def _negamax(self, depth, alpha, beta, piece, ply):
+        """
+        :return: Score of the position from the point of view of the player on move (piece).
+        """
+
+        self.nodes += 1
+        if not self.nodes & 511 and time.perf_counter() > self.deadline:
+            raise _SearchTimeout
+
+        board = self.board
+        if not board.empty_count() or board.is_forced_draw():
+            return 0  # draw
+
+        if depth == 0:
+            return self._score if piece == 'X' else -self._score
+
+        key = board.hash ^ self.SIDE_KEY if piece == 'O' else board.hash
+        entry = self.table.probe(key)
+        best_move = None
+        if entry is not None:
+            best_move = entry[4]
+            if entry[1] >= depth:
+                score = self._score_from_table(entry[2], ply)
+                if entry[3] == TranspositionTable.EXACT:
+                    return score
+                if entry[3] == TranspositionTable.LOWER and score >= beta:
+                    return score
+                if entry[3] == TranspositionTable.UPPER and score <= alpha:
+                    return score
+
+        original_alpha = alpha
+        opponent = other_piece(piece)
+        size = board.size
+        best_score = -self.WIN_SCORE - 1
+
+        for square in self._ordered_moves(piece, best_move, self.max_branching):
+            row, col = divmod(square, size)
+            board.make_move(row, col, piece)
+            if self._apply(square, piece):
+                score = self.WIN_SCORE - ply - 1
+            else:
+                score = -self._negamax(depth - 1, -beta, -alpha, opponent, ply + 1)
+            self._revert(square, piece)
+            board.undo_move()
+
+            if score > best_score:
+                best_score = score
+                best_move = square
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                break
+
+        if best_score <= original_alpha:
+            flag = TranspositionTable.UPPER
+        elif best_score >= beta:
+            flag = TranspositionTable.LOWER
+        else:
+            flag = TranspositionTable.EXACT
+        self.table.store(key, depth, self._score_to_table(best_score, ply), flag, best_move)
+
+        return best_score
+
+    def _score_to_table(self, score, ply):
+        """ Win scores are stored as distance from the stored position, not from the root. """
+
+        if score > self.WIN_SCORE - 1000:
+            return score + ply
+        if score < -self.WIN_SCORE + 1000:
+            return score - ply
+        return score
+
+    def _score_from_table(self, score, ply):
+
+        if score > self.WIN_SCORE - 1000:
+            return score - ply
+        if score < -self.WIN_SCORE + 1000:
+            return score + ply
+        return score
+
+    def _search_root(self, depth, moves, piece):
+        """ :return: score, best square of the position searched to depth. """
+
+        board = self.board
+        opponent = other_piece(piece)
+        alpha = -self.WIN_SCORE - 1
+        best_move = moves[0]
+
+        for square in moves:
+            row, col = divmod(square, board.size)
+            board.make_move(row, col, piece)
+            if self._apply(square, piece):
+                score = self.WIN_SCORE - 1
+            else:
+                score = -self._negamax(depth - 1, -self.WIN_SCORE - 1, -alpha, opponent, 1)
+            self._revert(square, piece)
+            board.undo_move()
+
+            if score > alpha:
+                alpha = score
+                best_move = square
+
+        return alpha, best_move
+
+    def choose_move(self, board, piece, rng=None):
+        """
+        Searches the position for the best move of the player with piece, deepening until time_limit is up.
+
+        :param board: Instance of the class Board (or one of its backends), it's the same after the search.
+        :param piece: Piece of the player on move.
+        :param rng: Not used, here to match the move policies interface.
+        :return: row, col of the best move found.
+        """
+
+        start = time.perf_counter()
+        self.deadline = float('inf')  # the first depth has to be always finished
+        self.nodes = 0
+        self.table.new_search()
+        self._setup(board)
+        moves_before = len(board.moves_played)
+
+        moves = self._ordered_moves(piece, None, None)
+        best_move = moves[0]
+        score = 0
+        depth_reached = 0
+
+        for depth in range(1, min(self.max_depth, board.empty_count()) + 1):
+            try:
+                score, best_move = self._search_root(depth, moves, piece)
+            except _SearchTimeout:
+                # take back the moves of the interrupted search
+                while len(board.moves_played) > moves_before:
+                    row, col = board.moves_played[-1]
+                    self._revert(row * board.size + col, board.piece_at(row, col))
+                    board.undo_move()
+                break
+
+            depth_reached = depth
+            moves.remove(best_move)
+            moves.insert(0, best_move)
+            if abs(score) > self.WIN_SCORE - 1000:  # the game is decided
+                break
+            self.deadline = start + self.time_limit
+            if time.perf_counter() > self.deadline:
+                break
+
+        seconds = time.perf_counter() - start
+        self.total_nodes += self.nodes
+        self.total_seconds += seconds
+        self.last_stats = {'nodes': self.nodes, 'depth': depth_reached, 'seconds': seconds,
+                           'nodes_per_second': self.nodes / seconds if seconds else 0.0, 'score': score,
+                           'tt_hit_rate': self.table.hit_rate()}
+
+        return divmod(best_move, board.size)
+
+    def report(self):
+        """ :return: Statistics of the last search as one line of text. """
+
+        stats = self.last_stats
+        return (f"Searched {stats['nodes']} nodes to depth {stats['depth']} in {stats['seconds'] * 1000:.0f} ms "
+                f"({stats['nodes_per_second']:.0f} nodes/s, TT hit rate {stats['tt_hit_rate']:.0%})")
+
+
+PIECE_CODES = {'X': 1, 'O': 2}
+
+
+def compact_cells(board):
+    """
+    Compact copy of the position: one byte per square (row * size + col), 0 empty, 1 X, 2 O. Cheap to copy and
+    to send to worker processes.
+    """
+
+    cells = bytearray(board.size * board.size)
+    for row, col in board.moves_played:
+        cells[row * board.size + col] = PIECE_CODES[board.piece_at(row, col)]
+
+    return cells
+
+
+def _wins_at(cells, size, win_needed, square, code):
+    """ Checks on compact cells if the piece (code) on the square has win_needed pieces in order. """
+
+    row, col = divmod(square, size)
+    for row_step, col_step in ((0, 1), (1, 0), (1, 1), (1, -1)):
+        count = 1
+        for direction in (1, -1):
+            r = row + row_step * direction
+            c = col + col_step * direction
+            while 0 <= r < size and 0 <= c < size and cells[r * size + c] == code:
+                count += 1
+                r += row_step * direction
+                c += col_step * direction
+        if count >= win_needed:
+            return True
+
+    return False
+
+
+def _search_tree(cells, size, win_needed, code, time_limit, settings, seed):
+    """
+    Independent search of one MCTSPlayer worker process (root parallelism).
+
+    :param cells: Compact cells of the position (see compact_cells).
+    :param code: Code of the piece which played the last move (the root's code).
+    :param settings: Keyword arguments of MCTSPlayer (playouts_per_leaf, exploration, radius).
+    :return: moves, playouts: List of (square, visits, wins) of the root's moves and number of random games played.
+    """
+
+    start = time.perf_counter()
+    player = MCTSPlayer(time_limit, workers=1, seed=seed, **settings)
+    root = _Node(None, code, None)
+    playouts = player._search(root, bytearray(cells), size, win_needed, start + time_limit)
+
+    return [(child.move, child.visits, child.wins) for child in root.children], playouts
+
+
+def _run_playouts(cells, size, win_needed, code_on_move, playouts, seed):
+    """
+    Plays random games from the position (of a leaf of MCTSPlayer's tree).
+
+    :param cells: Compact cells of the position (see compact_cells).
+    :param code_on_move: Code of the piece on move (1 X, 2 O).
+    :return: Number of games won by X, won by O and drawn.
+    """
+
+    rng = Random(seed)
+    empty = [square for square, code in enumerate(cells) if not code]
+    results = [0, 0, 0]  # draws, X wins, O wins
+
+    for _ in range(playouts):
+        board = bytearray(cells)
+        rng.shuffle(empty)
+        code = code_on_move
+        winner = 0
+        for square in empty:
+            board[square] = code
+            if _wins_at(board, size, win_needed, square, code):
+                winner = code
+                break
+            code = 3 - code
+        results[winner] += 1
+
+    return results[1], results[2], results[0]
+
+
+LINE_DIRECTIONS = ('row', 'column', 'diagonal', 'anti-diagonal')
+
+
+def boards_to_array(boards):
+    """
+    Stacks boards of the same size into one numpy array of shape (batch, size, size), dtype int8, with the
+    values of compact_cells (0 empty, 1 X, 2 O).
+    """
+
+    size = boards[0].size
+    return np.stack([np.frombuffer(bytes(compact_cells(board)), dtype=np.int8).reshape(size, size)
+                     for board in boards])
+
+
+def batch_lines(boards, win_needed):
+    """
+    Finds win_needed pieces in order on a whole batch of boards at once.
+
+    Window sums of each side's pieces are computed for all boards with numpy: with cumulative sums along rows and
+    columns and with win_needed shifted slices along diagonals. Windows never go over the edge of the board,
+    exactly like in Board.has_ended.
+
+    :param boards: Array of shape (batch, size, size) with values 0 empty, 1 X, 2 O (see boards_to_array).
+    :param win_needed: How many pieces in order are needed to win.
+    :return: Bool array of shape (batch, 2, 4): [board, side (X, O), direction (see LINE_DIRECTIONS)].
+    """
+
+    if np is None:
+        raise RuntimeError("batch win detection needs numpy (pip install numpy)")
+
+    boards = np.asarray(boards)
+    batch, size = boards.shape[0], boards.shape[1]
+    lines = np.zeros((batch, 2, 4), dtype=bool)
+    if win_needed > size:
+        return lines
+
+    span = size - win_needed + 1
+    for side, code in enumerate((PIECE_CODES['X'], PIECE_CODES['O'])):
+        pieces = (boards == code).astype(np.int16)
+
+        # rows and columns: difference of cumulative sums gives sums of all windows
+        for direction, axis in ((0, 2), (1, 1)):
+            sums = np.cumsum(pieces, axis=axis)
+            sums = np.concatenate((np.zeros_like(sums.take([0], axis=axis)), sums), axis=axis)
+            windows = sums.take(range(win_needed, size + 1), axis=axis) - sums.take(range(span), axis=axis)
+            lines[:, side, direction] = (windows == win_needed).any(axis=(1, 2))
+
+        # diagonals: window starting at [r, c] is the sum of win_needed slices shifted by one square
+        diagonal = np.zeros((batch, span, span), dtype=np.int16)
+        anti_diagonal = np.zeros((batch, span, span), dtype=np.int16)
+        for k in range(win_needed):
+            diagonal += pieces[:, k:k + span, k:k + span]
+            anti_diagonal += pieces[:, k:k + span, win_needed - 1 - k:win_needed - 1 - k + span]
+        lines[:, side, 2] = (diagonal == win_needed).any(axis=(1, 2))
+        lines[:, side, 3] = (anti_diagonal == win_needed).any(axis=(1, 2))
+
+    return lines
+
+
+def batch_winners(boards, win_needed):
+    """
+    Which side has win_needed pieces in order on each of the boards, and in which direction.
+
+    :param boards: Array of shape (batch, size, size) with values 0 empty, 1 X, 2 O (see boards_to_array).
+    :param win_needed: How many pieces in order are needed to win.
+    :return: winners, directions: Int8 arrays of shape (batch,). Winner is the code of the side (1 X, 2 O, 0 no
+             one), direction is an index to LINE_DIRECTIONS (-1 no line). If both sides have a line (can't happen
+             in a played game), X is reported; if a side has more lines, the first direction is reported.
+    """
+
+    lines = batch_lines(boards, win_needed)
+    has_line = lines.any(axis=2)
+
+    winners = np.where(has_line[:, 0], PIECE_CODES['X'], np.where(has_line[:, 1], PIECE_CODES['O'], 0))
+    winner_lines = np.where(has_line[:, :1], lines[:, 0], lines[:, 1])
+    directions = np.where(winners > 0, winner_lines.argmax(axis=1), -1)
+
+    return winners.astype(np.int8), directions.astype(np.int8)
+
+
+class _Node:
+    """ Node of the MCTS tree, move is the square played by piece (code) to get to the node. """
+
+    __slots__ = ('move', 'code', 'parent', 'children', 'untried', 'wins', 'visits', 'winner')
+
+    def __init__(self, move, code, parent):
+
+        self.move = move
+        self.code = code
+        self.parent = parent
+        self.children = []
+        self.untried = None  # squares not expanded yet, filled when the node is first selected
+        self.wins = 0.0      # wins of the player who played move (draw counts as half)
+        self.visits = 0
+        self.winner = 0      # code of the player who won by the move, 0 if the game goes on
+
+
+class MCTSPlayer:
+    """
+    Computer opponent for big boards: Monte Carlo tree search (UCT) with root parallelism.
+
+    Every worker process grows its own tree from the position for the whole time limit and sends back only visits
+    and wins of the root's moves, which are summed with the ones of this process's tree; the most visited move is
+    played. Workers get only compact copies of the board (see compact_cells), so there's one message per worker
+    and move and the playouts scale with the number of cores. Only squares near already placed pieces are
+    expanded. The tree of this process is kept between moves: the next search starts from the subtree of the
+    moves played since.
+
+    Can be used both as an engine of Player and as a move policy of headless games (with workers=1).
+    """
+
+    name = 'mcts'
+
+    def __init__(self, time_limit=1.0, workers=None, playouts_per_leaf=4, exploration=1.4, radius=2, seed=None):
+        """
+        :param time_limit: Seconds the search can take per move.
+        :param workers: Number of searching processes including this one (number of CPUs by default), 1 searches
+                        only in this process.
+        :param playouts_per_leaf: How many random games are played from each selected leaf.
+        :param exploration: Exploration constant of UCT.
+        :param radius: Squares at most this far from a placed piece are expanded.
+        :param seed: Seed of random games.
+        """
+
+        self.time_limit = time_limit
+        self.workers = workers or os.cpu_count() or 1
+        self.playouts_per_leaf = playouts_per_leaf
+        self.exploration = exploration
+        self.radius = radius
+        self.rng = Random(seed)
+        self.executor = None
+        self._root = None
+        self._root_moves = []
+        self.last_stats = {}
+
+    def close(self):
+        """ Shuts down the worker processes. """
+
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def __getstate__(self):
+
+        state = self.__dict__.copy()
+        state['executor'] = None
+        return state
+
+    def _reuse_tree(self, board):
+        """ Moves the root to the subtree of the current position if the tree is from the same game. """
+
+        played = board.moves_played
+        if self._root is None or played[:len(self._root_moves)] != self._root_moves:
+            return None
+
+        root = self._root
+        for row, col in played[len(self._root_moves):]:
+            square = row * board.size + col
+            root = next((child for child in root.children if child.move == square), None)
+            if root is None:
+                return None
+
+        root.parent = None
+        return root
+
+    def _candidates(self, cells, size):
+        """ Empty squares near to placed pieces (center of the board if there's none). """
+
+        radius = self.radius
+        candidates = set()
+        for square, code in enumerate(cells):
+            if code:
+                row, col = divmod(square, size)
+                for r in range(max(0, row - radius), min(size, row + radius + 1)):
+                    for c in range(max(0, col - radius), min(size, col + radius + 1)):
+                        if not cells[r * size + c]:
+                            candidates.add(r * size + c)
+
+        if not candidates and not any(cells):
+            return [(size // 2) * size + size // 2]
+
+        return list(candidates)
+
+    def _select(self, root, cells, size, win_needed):
+        """
+        Walks from the root to a leaf by UCT, expands one of leaf's untried squares and adds a virtual loss to the
+        path. Moves on the path are applied to cells.
+
+        :return: The new (or terminal) node.
+        """
+
+        node = root
+        log_visits = {}
+        playouts = self.playouts_per_leaf
+
+        while True:
+            if node.untried is None and not node.winner:
+                node.untried = self._candidates(cells, size)
+                self.rng.shuffle(node.untried)
+
+            if node.winner or (not node.untried and not node.children):
+                break  # game over in this node
+
+            if node.untried:
+                square = node.untried.pop()
+                code = 3 - node.code
+                cells[square] = code
+                child = _Node(square, code, node)
+                if _wins_at(cells, size, win_needed, square, code):
+                    child.winner = code
+                node.children.append(child)
+                node = child
+                break
+
+            parent_visits = node.visits
+            if parent_visits not in log_visits:
+                log_visits[parent_visits] = math.log(parent_visits or 1)
+            c = self.exploration * math.sqrt(log_visits[parent_visits])
+            node = max(node.children, key=lambda child: child.wins / (child.visits or 1)
+                       + c / math.sqrt(child.visits or 1e-9))
+            cells[node.move] = node.code
+
+        # virtual loss: visits are added now, wins when the games are played
+        walked = node
+        while walked is not None:
+            walked.visits += playouts
+            walked = walked.parent
+
+        return node
+
+    @staticmethod
+    def _backpropagate(node, x_wins, o_wins, draws):
+
+        while node is not None:
+            node.wins += (x_wins if node.code == 1 else o_wins) + draws / 2
+            node = node.parent
+
+    def _search(self, root, root_cells, size, win_needed, deadline):
+        """
+        Grows the tree from the root until the deadline (time.perf_counter), one leaf and playouts_per_leaf random
+        games per iteration.
+
+        :return: Number of random games played.
+        """
+
+        playouts = self.playouts_per_leaf
+        played = 0
+        while True:
+            cells = bytearray(root_cells)
+            leaf = self._select(root, cells, size, win_needed)
+            if leaf.winner:  # the move won, no need to play
+                result = (playouts, 0, 0) if leaf.winner == 1 else (0, playouts, 0)
+            else:  # a full board is a draw
+                result = _run_playouts(cells, size, win_needed, 3 - leaf.code, playouts, self.rng.getrandbits(64))
+            self._backpropagate(leaf, *result)
+            played += playouts
+
+            if time.perf_counter() > deadline:
+                return played
+
+    def choose_move(self, board, piece, rng=None):
+        """
+        Searches the position for time_limit seconds.
+
+        :param board: Instance of the class Board (or one of its backends), it's not changed.
+        :param piece: Piece of the player on move.
+        :param rng: Not used, here to match the move policies interface.
+        :return: row, col of the most visited move.
+        """
+
+        start = time.perf_counter()
+        size = board.size
+        win_needed = board.win_needed
+        root_cells = compact_cells(board)
+
+        root = self._reuse_tree(board)
+        reused = root is not None
+        if root is None:
+            root = _Node(None, 3 - PIECE_CODES[piece], None)
+
+        futures = []
+        if self.workers > 1:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(max_workers=self.workers - 1)
+            settings = {'playouts_per_leaf': self.playouts_per_leaf, 'exploration': self.exploration,
+                        'radius': self.radius}
+            futures = [self.executor.submit(_search_tree, bytes(root_cells), size, win_needed, root.code,
+                                            self.time_limit, settings, self.rng.getrandbits(64))
+                       for _ in range(self.workers - 1)]
+
+        playouts = self._search(root, root_cells, size, win_needed, start + self.time_limit)
+
+        # sum the root's moves of all trees
+        visits = {child.move: child.visits for child in root.children}
+        wins = {child.move: child.wins for child in root.children}
+        for future in futures:
+            moves, worker_playouts = future.result()
+            playouts += worker_playouts
+            for move, move_visits, move_wins in moves:
+                visits[move] = visits.get(move, 0) + move_visits
+                wins[move] = wins.get(move, 0.0) + move_wins
+
+        move = max(visits, key=visits.get)
+        seconds = time.perf_counter() - start
+
+        # keep the subtree of the chosen move for the next search (None if only workers tried the move)
+        best = next((child for child in root.children if child.move == move), None)
+        self._root = best
+        self._root_moves = board.moves_played + [list(divmod(move, size))]
+
+        nodes, memory = self.tree_size(best) if best is not None else (0, 0)
+        self.last_stats = {'playouts': playouts, 'seconds': seconds, 'playouts_per_second': playouts / seconds,
+                           'reused_tree': reused, 'tree_nodes': nodes, 'tree_bytes': memory,
+                           'win_rate': wins[move] / max(visits[move], 1)}
+
+        return divmod(move, size)
+
+    @staticmethod
+    def tree_size(root):
+        """ :return: Number of nodes of the (sub)tree and approximate memory it takes in bytes. """
+
+        nodes = 0
+        memory = 0
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            nodes += 1
+            memory += sys.getsizeof(node) + sys.getsizeof(node.children)
+            if node.untried is not None:
+                memory += sys.getsizeof(node.untried)
+            stack.extend(node.children)
+
+        return nodes, memory
+
+    def report(self):
+        """ :return: Statistics of the last search as one line of text. """
+
+        stats = self.last_stats
+        return (f"Played {stats['playouts']} games in {stats['seconds'] * 1000:.0f} ms "
+                f"({stats['playouts_per_second']:.0f} playouts/s, {self.workers} workers, "
+                f"win rate {stats['win_rate']:.0%}), tree kept: {stats['tree_nodes']} nodes, "
+                f"{stats['tree_bytes'] / 1024:.0f} KiB")
+
+
+def make_policy(description):
+    """
+    Creates a move policy from its command line description: 'random', 'greedy', 'alphabeta:seconds per move',
+    'mcts:seconds per move', 'book:path to opening book' or 'scripted:row col,row col,...' (rows and columns start
+    at 1, as in the interactive game).
+    """
+
+    if description == 'random':
+        return RandomPolicy()
+    if description == 'greedy':
+        return GreedyPolicy()
+    if description == 'alphabeta' or description.startswith('alphabeta:'):
+        time_limit = float(description.partition(':')[2] or 0.01)
+        return AlphaBetaPlayer(time_limit=time_limit)
+    if description == 'mcts' or description.startswith('mcts:'):
+        time_limit = float(description.partition(':')[2] or 0.05)
+        return MCTSPlayer(time_limit=time_limit, workers=1)
+    if description.startswith('book:'):
+        return OpeningBook(description[len('book:'):])
+    if description.startswith('scripted:'):
+        moves = []
+        for move in description[len('scripted:'):].split(','):
+            row, col = map(int, move.split())
+            moves.append((row - 1, col - 1))
+        return ScriptedPolicy(moves)
+
+    raise ValueError(f"Unknown policy {description!r}, expected random, greedy, alphabeta[:seconds], "
+                     "mcts[:seconds], book:path or scripted:row col,...")
+
+
+def assign_pieces(name1):
+    """
+    Assigns to player1 and player2 pieces according to the choice of player1.
+
+    :param name1: Name of player1.
+    :return: piece1, piece2: assigned pieces.
+    """
+
+    while True:
+        piece1 = input(f"{name1} (player1), Do you want to be X or O?:\n").upper()
+
+        if piece1 != 'X' and piece1 != 'O':
+            print("Wrong format.\n")
+            continue
+
+        break
+
+    if piece1 == 'X':
+        piece2 = 'O'
+    else:
+        piece2 = 'X'
+
+    return piece1, piece2
+
+
+def get_board_size(max_size=None):
+    """
+    Asks player to choose the size of board until it's in correct form.
+
+    :param max_size: Biggest size allowed (computer opponents keep arrays of all squares), None for no limit.
+    :return: Size of board.
+    """
+
+    while True:
+        try:
+            size_board = int(input("Choose size of the board (3+):\n"))
+        except ValueError:
+            print("Wrong input / not integer\n")
+            continue
+        if size_board <= 2:
+            print("Too small... Please select board of size 3 and more\n")
+            continue
+        if max_size is not None and size_board > max_size:
+            print(f"Computer can play only on boards up to {max_size}, please select a smaller one\n")
+            continue
+        break
+
+    return size_board
+
+
+def choose_opponent():
+    """
+    Asks player1 whether to play against another player or against computer. Computer can either search
+    (alpha-beta, good up to ~15 x 15 boards) or play random games (Monte Carlo tree search, for bigger boards).
+
+    :return: Instance of AlphaBetaPlayer or MCTSPlayer if player1 chose computer, None otherwise.
+    """
+
+    while True:
+        opponent = input("Do you want to play against another player or computer? (player / computer / mcts):\n")
+        opponent = opponent.lower()
+        if opponent == 'player' or opponent == 'p':
+            return None
+        if opponent == 'computer' or opponent == 'c' or opponent == 'mcts':
+            break
+        print("Wrong input, expected player / computer / mcts\n")
+
+    engine_class = MCTSPlayer if opponent == 'mcts' else AlphaBetaPlayer
+
+    while True:
+        think_time = input("How many seconds can computer think about a move? (default 1):\n").strip()
+        if not think_time:
+            return engine_class(time_limit=1.0)
+        try:
+            think_time = float(think_time)
+        except ValueError:
+            print("Wrong input / not a number\n")
+            continue
+        if think_time <= 0:
+            print("Time has to be positive\n")
+            continue
+        return engine_class(time_limit=think_time)
+
+
+def get_player_move(piece_on_move, name_on_move, size_board, is_free, print_board):
+    """
+    Asks for player to make a move. Next it checks if the move is playable
+
+    :param piece_on_move: Piece of the player on move (X or O).
+    :param name_on_move: Name of player on move.
+    :param size_board: Size of board.
+    :param is_free: Function of class Board, which checks if there's no piece on a square yet (to avoid
+                    rewriting a piece).
+    :param print_board: Function which draws the board after execution.
+
+    :return: row and column of correct / playable move made by player.
+    """
+
+    while True:
+        print("To make a move, you have to provide row and column separated\n"
+              "by space [row col], rows and columns starts at 1.\n\n"
+              f"{name_on_move}, please make a move (player with {piece_on_move} pieces):\n", end='')
+        try:
+            row, col = map(int, input().rstrip().split())
+        except ValueError:
+            print_board()
+            print("Incorrect form of move, please make sure it's in form -> row column separated by space.\n")
+            continue
+
+        # to index arrays
+        row -= 1
+        col -= 1
+
+        print_board()
+
+        if (row < 0 or row >= size_board) or (col < 0 or col >= size_board):
+            print("Square doesn't exist / out of borders.\n")
+            continue
+
+        if not is_free(row, col):
+            print("There's already piece on the square.\n")
+            continue
+
+        break
+
+    return row, col
+
+
+def start_again():
+    """
+    Asks player to start a game again.
+
+    :return True if player chooses to play game again.
+            False if player wants to stop playing.
+    """
+
+    while True:
+        again = input("Start again? (y/n):\n").lower()
+        if again == 'y' or again == 'yes' or again == 'n' or again == 'no':
+            break
+        else:
+            print("Wrong input, expected y/n\n")
+
+    if again == 'n' or again == 'no':
+        return False
+
+    return True
+
+
+def play_game(player1, player2,  size_board, recorder=None):
+    """
+    Handles whole playing logic with help of various functions.
+
+    Randomly decides which player should start first. Then prints a board, plays a move and checks if the game
+    has ended in loop. Loops until all moves have been played, in that case declares draw. Updates wins in player1
+    and player2 if the game wasn't drawn.
+
+    :param player1: Instance of the class Player. Player1 doesn't mean he has to start first.
+    :param player2: Another instance of class Player.
+    :param recorder: Instance of GameRecordWriter which saves the game when it ends, None to not save it.
+    :return: Nothing.
+    """
+
+    if size_board < SPARSE_BOARD_FROM:
+        board = Board(size_board)
+    elif player1.engine or player2.engine:
+        raise ValueError(f"computer opponents play only on boards smaller than {SPARSE_BOARD_FROM}")
+    else:
+        board = SparseBoard(size_board)  # don't allocate all squares of huge boards
+
+    # randomly assign who starts first
+    starts_first = randint(1, 2)
+    first_player = player1 if starts_first == 1 else player2
+    first_piece = first_player.piece
+
+    renderer = TerminalRenderer()
+
+    def draw():
+        """ Draws score and board as one frame. """
+
+        renderer.draw(f"Current score is:\n{player1.score_string()}\n{player2.score_string()}\n\n"
+                      + board.board_string())
+
+    # printed under the board after it's drawn (the first frame clears the screen on ANSI terminals)
+    note = (f"Randomly assigning who starts first...\n"
+            f"{first_player.name} with pieces {first_player.piece} starts first.\n\n")
+
+    for i in range(size_board ** 2):
+
+        draw()
+        print(note, end='')
+
+        if (i % 2 == 0 and starts_first == 1) or (i % 2 == 1 and starts_first == 2):  # player1 on move
+            player_on_move = player1
+        else:  # player2 on move
+            player_on_move = player2
+        piece_on_move = player_on_move.piece
+        name_on_move = player_on_move.name
+
+        if i == 0:
+            print(f"Having {board.win_needed} pieces in order wins")
+            print()
+
+        # gets row and column of lastly played move
+        if player_on_move.engine:
+            row, col = player_on_move.engine.choose_move(board, piece_on_move)
+        else:
+            row, col = get_player_move(piece_on_move, name_on_move, size_board, board.is_free, draw)
+
+        note = ''
+        if player_on_move.engine:
+            note = f"{name_on_move} played {row + 1} {col + 1}. {player_on_move.engine.report()}\n\n"
+
+        board.make_move(row, col, piece_on_move)
+
+        message = board.has_ended(row, col, piece_on_move, name_on_move, draws=True)
+
+        if message:  # we have a winner (or nobody can win anymore)
+
+            draw()
+            print(note + message + '\n')
+
+            if recorder:
+                recorder.write_game(board.size, board.win_needed, first_piece, board.winner, board.moves_played)
+
+            # add a win
+            if board.winner == player1.piece:
+                player1.add_win()
+            elif board.winner == player2.piece:
+                player2.add_win()
+
+            return
+
+    draw()
+    print("Looks like the game ended in draw (booring).\n")
+
+    if recorder:
+        recorder.write_game(board.size, board.win_needed, first_piece, None, board.moves_played)
+
+
+def play_headless(board, policies, first_piece, rng, max_moves=10000):
+    """
+    Plays one game without any input / output.
+
+    :param board: Empty instance of the class Board (or one of its backends).
+    :param policies: Dictionary piece -> move policy.
+    :param first_piece: Piece which starts.
+    :param rng: Instance of random.Random used by policies.
+    :param max_moves: After how many moves the game is a draw on unbounded SparseBoard.
+    :return: winner, moves: Piece of the winner (None if draw) and number of moves played. The game stops as soon
+             as it's a forced draw (see Board.is_forced_draw).
+    """
+
+    piece = first_piece
+    moves = board.size ** 2 if board.size else max_moves
+    for i in range(moves):
+        row, col = policies[piece].choose_move(board, piece, rng)
+        board.make_move(row, col, piece)
+
+        if board.has_ended(row, col, piece, piece, draws=True):  # a win or nobody can win anymore
+            return board.winner, i + 1
+
+        piece = other_piece(piece)
+
+    return None, moves
+
+
+class SimulationStats:
+    """
+    Streaming aggregate of headless games: counters and a histogram of game lengths, its size doesn't depend on
+    number of games played.
+    """
+
+    def __init__(self, size):
+
+        self.games = 0
+        self.wins = {'X': 0, 'O': 0}
+        self.first_player_wins = 0
+        self.draws = 0
+        self.lengths = [0] * (size * size + 1)  # lengths[moves] = number of games which took moves
+        self.seconds = 0.0
+
+    def add_game(self, winner, moves, first_piece):
+
+        self.games += 1
+        self.lengths[moves] += 1
+        if winner is None:
+            self.draws += 1
+        else:
+            self.wins[winner] += 1
+            if winner == first_piece:
+                self.first_player_wins += 1
+
+    def merge(self, other):
+
+        self.games += other.games
+        self.draws += other.draws
+        self.first_player_wins += other.first_player_wins
+        for piece in self.wins:
+            self.wins[piece] += other.wins[piece]
+        for moves, count in enumerate(other.lengths):
+            self.lengths[moves] += count
+
+    def print_report(self, buckets=10):
+        """ Prints win / draw rates, games per second and histogram of game lengths. """
+
+        games = max(self.games, 1)
+        print(f"Games: {self.games} in {self.seconds:.2f} s ({self.games / max(self.seconds, 1e-9):.0f} games/s)")
+        print(f"X wins: {self.wins['X'] / games:.2%}   O wins: {self.wins['O'] / games:.2%}   "
+              f"draws: {self.draws / games:.2%}   first player wins: {self.first_player_wins / games:.2%}")
+
+        played = [moves for moves, count in enumerate(self.lengths) if count]
+        if not played:
+            return
+
+        print("Game length histogram (moves):")
+        low, high = played[0], played[-1]
+        width = max(1, -(-(high - low + 1) // buckets))
+        largest = max(sum(self.lengths[start:start + width]) for start in range(low, high + 1, width))
+        for start in range(low, high + 1, width):
+            count = sum(self.lengths[start:start + width])
+            label = f"{start}" if width == 1 else f"{start}-{min(start + width - 1, high)}"
+            print(f"{label:>9} | {'#' * round(40 * count / largest):<40} {count}")
+
+
+def _simulate_chunk(chunk, games, seed, size, win_needed, policies, board_class):
+    """
+    Plays one chunk of headless games, runs in a worker process.
+
+    Every chunk has its own random stream seeded by (seed, chunk), so results don't depend on number of workers
+    or on which worker played the chunk.
+    """
+
+    rng = Random(f"{seed}-{chunk}")
+    stats = SimulationStats(size)
+
+    for _ in range(games):
+        first_piece = 'X' if rng.random() < 0.5 else 'O'
+        winner, moves = play_headless(board_class(size, win_needed), policies, first_piece, rng)
+        stats.add_game(winner, moves, first_piece)
+
+    return stats
+
+
+def simulate_games(games, size, win_needed=None, policy_x=None, policy_o=None, workers=1, chunk_size=1000,
+                   seed=0, board_class=Board):
+    """
+    Plays many headless games between two move policies, spread in chunks across a process pool.
+
+    Only a few chunks per worker are submitted at once and their results are merged into one SimulationStats
+    as they come, so memory use doesn't grow with number of games.
+
+    :param games: Number of games to play.
+    :param size: Size of the board.
+    :param win_needed: How many pieces in order are needed to win (default depends on size, see Board).
+    :param policy_x: Move policy of player X (RandomPolicy by default).
+    :param policy_o: Move policy of player O (RandomPolicy by default).
+    :param workers: Number of worker processes, 1 plays in this process.
+    :param chunk_size: Number of games played by a worker at once (1+).
+    :param seed: Seed of the whole simulation, same seed gives same results.
+    :param board_class: Board backend to play on.
+    :return: Instance of SimulationStats.
+    """
+
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size has to be at least 1, got {chunk_size}")
+
+    policies = {'X': policy_x or RandomPolicy(), 'O': policy_o or RandomPolicy()}
+    chunks = ((chunk, min(chunk_size, games - chunk * chunk_size)) for chunk in range(-(-games // chunk_size)))
+    stats = SimulationStats(size)
+    start = time.perf_counter()
+
+    if workers <= 1:
+        for chunk, chunk_games in chunks:
+            stats.merge(_simulate_chunk(chunk, chunk_games, seed, size, win_needed, policies, board_class))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_share_table_locks,
+                                 initargs=(dict(_table_locks),)) as executor:
+            pending = deque()
+            for chunk, chunk_games in chunks:
+                if len(pending) >= 2 * workers:
+                    stats.merge(pending.popleft().result())
+                pending.append(executor.submit(_simulate_chunk, chunk, chunk_games, seed, size, win_needed,
+                                               policies, board_class))
+            while pending:
+                stats.merge(pending.popleft().result())
+
+    stats.seconds = time.perf_counter() - start
+
+    return stats
+
+
+RECORDS_MAGIC = b"NTTR\x01"  # file type and version of game records
+RESULT_CODES = {None: 0, 'X': 1, 'O': 2}
+
+GameRecord = namedtuple('GameRecord', 'size win_needed first_piece winner moves')
+GameRecord.__doc__ = """ One saved game, moves are (row, col) tuples, winner is None for a draw. """
+
+
+def _write_varint(output, value):
+    """ Appends value to the bytearray in 7 bits per byte, the highest bit tells there's another byte. """
+
+    while value > 0x7F:
+        output.append(value & 0x7F | 0x80)
+        value >>= 7
+    output.append(value)
+
+
+def _read_varint(data, offset):
+    """ :return: value, offset of the next byte. """
+
+    value = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+class GameRecordWriter:
+    """
+    Appends games to a binary archive.
+
+    The archive starts with RECORDS_MAGIC, then records follow. A record is its length in bytes (varint) and
+    the body: size and win_needed (varints), starting player and winner (one byte each, see RESULT_CODES), number
+    of moves and the moves as square indexes row * size + col (varints). Small boards take one byte per move.
+    """
+
+    def __init__(self, path):
+
+        self.file = open(path, 'ab')
+        if self.file.tell() == 0:
+            self.file.write(RECORDS_MAGIC)
+        self.games = 0
+
+    def write_game(self, size, win_needed, first_piece, winner, moves):
+        """
+        :param size: Size of the board.
+        :param win_needed: How many pieces in order were needed to win.
+        :param first_piece: Piece which started.
+        :param winner: Piece which won, None for a draw.
+        :param moves: Played moves as [row, col] (like Board.moves_played).
+        """
+
+        body = bytearray()
+        _write_varint(body, size)
+        _write_varint(body, win_needed)
+        body.append(RESULT_CODES[first_piece])
+        body.append(RESULT_CODES[winner])
+        _write_varint(body, len(moves))
+        for row, col in moves:
+            _write_varint(body, row * size + col)
+
+        record = bytearray()
+        _write_varint(record, len(body))
+        self.file.write(record + body)
+        self.games += 1
+
+    def flush(self):
+
+        self.file.flush()
+
+    def close(self):
+
+        self.file.close()
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, *exc_info):
+
+        self.close()
+
+
+class GameRecordReader:
+    """
+    Reads an archive written by GameRecordWriter. The file is memory-mapped and games are decoded only when
+    they're iterated over or asked for, so the archive is never loaded whole. Random access (reader[i]) uses an
+    index of record offsets, built by skipping over record lengths the first time it's needed.
+    """
+
+    def __init__(self, path):
+
+        self.file = open(path, 'rb')
+        if os.fstat(self.file.fileno()).st_size < len(RECORDS_MAGIC):
+            self.file.close()
+            raise ValueError(f"{path} is not an archive of games")
+
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.data[:len(RECORDS_MAGIC)] != RECORDS_MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not an archive of games")
+
+        self._offsets = None
+
+    def _offsets_from(self, offset):
+        """
+        Yields offsets of records from the given one to the end of the archive. A record cut short at the end (by
+        an interrupted append) isn't yielded, the archive ends with the last complete record.
+        """
+
+        data = self.data
+        while offset < len(data):
+            try:
+                length, start = _read_varint(data, offset)
+            except IndexError:  # even the length is cut short
+                return
+            if start + length > len(data):
+                return
+            yield offset
+            offset = start + length
+
+    def record_at(self, offset):
+        """ Decodes the record starting at offset. """
+
+        data = self.data
+        _, offset = _read_varint(data, offset)
+        size, offset = _read_varint(data, offset)
+        win_needed, offset = _read_varint(data, offset)
+        pieces = {code: piece for piece, code in RESULT_CODES.items()}
+        first_piece = pieces[data[offset]]
+        winner = pieces[data[offset + 1]]
+        count, offset = _read_varint(data, offset + 2)
+
+        moves = []
+        for _ in range(count):
+            square, offset = _read_varint(data, offset)
+            moves.append(divmod(square, size))
+
+        return GameRecord(size, win_needed, first_piece, winner, tuple(moves))
+
+    def __iter__(self):
+
+        for offset in self._offsets_from(len(RECORDS_MAGIC)):
+            yield self.record_at(offset)
+
+    def offsets(self):
+        """ Index of offsets of all records (array of unsigned 64 bit ints), built the first time. """
+
+        if self._offsets is None:
+            self._offsets = array('Q', self._offsets_from(len(RECORDS_MAGIC)))
+
+        return self._offsets
+
+    def __len__(self):
+
+        return len(self.offsets())
+
+    def __getitem__(self, i):
+
+        return self.record_at(self.offsets()[i])
+
+    def close(self):
+
+        self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, *exc_info):
+
+        self.close()
+
+
+def replay(record, board_class=Board):
+    """
+    Rebuilds the game from its record.
+
+    :param record: Instance of GameRecord.
+    :param board_class: Board backend to replay on.
+    :return: Yields board, row, col, piece after every move (always the same board, with one more move).
+    """
+
+    board = board_class(record.size, record.win_needed)
+    piece = record.first_piece
+    for row, col in record.moves:
+        board.make_move(row, col, piece)
+        yield board, row, col, piece
+        piece = other_piece(piece)
+
+
+def print_replay(record):
+    """ Prints all positions of the recorded game and its result. """
+
+    print(f"Board {record.size} x {record.size}, {record.win_needed} pieces in order win, "
+          f"{record.first_piece} starts.\n")
+    for i, (board, row, col, piece) in enumerate(replay(record)):
+        print(f"Move {i + 1}: {piece} on {row + 1} {col + 1}")
+        board.print_board()
+
+    if record.winner is None:
+        print("The game ended in draw.")
+    else:
+        print(f"{record.winner} won the game.")
+
+
+BOOK_MAGIC = b"NTTB\x01"  # file type and version of opening books
+BOOK_HEADER = struct.Struct('<5sBBI5x')  # magic, size, win_needed, number of positions, padding to 16 bytes
+
+
+@lru_cache(maxsize=None)
+def board_symmetries(size):
+    """
+    The 8 symmetries of the square board (rotations and reflections).
+
+    :return: symmetries, inverses: For every symmetry a tuple mapping squares of the transformed board to squares
+             of the original board, and the inverse mapping.
+    """
+
+    symmetries = []
+    for transpose in (False, True):
+        for flip_rows in (False, True):
+            for flip_cols in (False, True):
+                symmetry = []
+                for row in range(size):
+                    for col in range(size):
+                        old_row, old_col = (col, row) if transpose else (row, col)
+                        if flip_rows:
+                            old_row = size - 1 - old_row
+                        if flip_cols:
+                            old_col = size - 1 - old_col
+                        symmetry.append(old_row * size + old_col)
+                symmetries.append(tuple(symmetry))
+
+    inverses = []
+    for symmetry in symmetries:
+        inverse = [0] * (size * size)
+        for square, old_square in enumerate(symmetry):
+            inverse[old_square] = square
+        inverses.append(tuple(inverse))
+
+    return tuple(symmetries), tuple(inverses)
+
+
+@lru_cache(maxsize=None)
+def _digit_values(size):
+    """ For every square, value of piece coded 1 on the square in position numbers of all 8 symmetries. """
+
+    _, inverses = board_symmetries(size)
+    return tuple(tuple(3 ** inverse[square] for inverse in inverses) for square in range(size * size))
+
+
+def solve_positions(size, win_needed=3):
+    """
+    Solves the board completely: negamax over every position reachable from the empty board, each position solved
+    only once thanks to a table of solved canonical positions.
+
+    Position is written as a base 3 number (square i is digit i, 1 for the player on move, 2 for the opponent), so
+    it doesn't matter which piece started. Canonical position is the smallest of the numbers of its 8 symmetric
+    versions (see board_symmetries). All 8 numbers are updated by adding value of the placed piece on every move;
+    the codes of players swap after every move, so both codings are kept and swapped.
+
+    :return: table, positions: Dictionary canonical position -> (score, best square in the canonical position) and
+             number of positions it stands for before reducing symmetries. Score is from the point of view of the
+             player on move: 0 draw, otherwise +-(empty squares before the winning move), so faster wins and slower
+             losses are better. Finished positions aren't included.
+    """
+
+    squares = size * size
+    if 3 ** squares >= 1 << 32:
+        raise ValueError("Only boards up to 4 x 4 can be solved")
+
+    _, inverses = board_symmetries(size)
+    digit_values = _digit_values(size)
+    windows, square_windows = line_windows(size, win_needed)
+    cells = [0] * squares
+    table = {}
+    positions = 0
+
+    def solve(mine, theirs, player, empty):
+        """
+        :param mine: The 8 position numbers with player on move coded 1.
+        :param theirs: The 8 position numbers with player on move coded 2.
+        :param player: Which cells belong to player on move (1 or 2).
+        :param empty: Number of empty squares.
+        :return: Score of the position.
+        """
+
+        nonlocal positions
+        best_score = -squares - 1
+        best_square = None
+
+        for square in range(squares):
+            if cells[square]:
+                continue
+
+            cells[square] = player
+            if any(all(cells[s] == player for s in windows[i]) for i in square_windows[square]):
+                score = empty
+            elif empty == 1:
+                score = 0
+            else:
+                values = digit_values[square]
+                child_mine = [number + 2 * value for number, value in zip(theirs, values)]
+                solved = table.get(min(child_mine))
+                if solved is not None:
+                    score = -solved[0]
+                else:
+                    child_theirs = [number + value for number, value in zip(mine, values)]
+                    score = -solve(child_mine, child_theirs, 3 - player, empty - 1)
+            cells[square] = 0
+
+            if score > best_score:
+                best_score, best_square = score, square
+
+        key = min(mine)
+        table[key] = (best_score, inverses[mine.index(key)][best_square])
+        positions += len(set(mine))
+        return best_score
+
+    solve([0] * 8, [0] * 8, 1, squares)
+    return table, positions
+
+
+def build_book(path, size, win_needed=3):
+    """
+    Solves the board (see solve_positions) and writes the opening book read by OpeningBook: header, sorted
+    canonical positions (unsigned 32 bit ints in native byte order), then scores and best squares (a byte each)
+    in the same order.
+
+    :return: Dictionary with positions (in the book), symmetric_positions (positions before reducing symmetries),
+             bytes (size of the file) and seconds.
+    """
+
+    start = time.perf_counter()
+    table, symmetric_positions = solve_positions(size, win_needed)
+
+    keys = array('I', sorted(table))
+    with open(path, 'wb') as output:
+        output.write(BOOK_HEADER.pack(BOOK_MAGIC, size, win_needed, len(keys)))
+        keys.tofile(output)
+        array('b', (table[key][0] for key in keys)).tofile(output)
+        array('B', (table[key][1] for key in keys)).tofile(output)
+
+    return {'positions': len(keys), 'symmetric_positions': symmetric_positions, 'bytes': os.path.getsize(path),
+            'seconds': time.perf_counter() - start}
+
+
+class OpeningBook:
+    """
+    Computer opponent for small boards solved by build_book: finds the best move in the memory-mapped book with
+    binary search (no search of the game at all). The file isn't loaded into memory, sorted positions are read
+    straight from the map.
+
+    Positions not in the book (other board size, or the book doesn't exist for it) are left to fallback.
+    Can be used both as an engine of Player and as a move policy of headless games.
+    """
+
+    name = 'book'
+
+    def __init__(self, path, fallback=None):
+        """
+        :param path: File written by build_book.
+        :param fallback: Engine for positions which aren't in the book, AlphaBetaPlayer by default.
+        """
+
+        self.path = path
+        self.file = open(path, 'rb')
+        if os.fstat(self.file.fileno()).st_size < BOOK_HEADER.size:
+            self.file.close()
+            raise ValueError(f"{path} is not an opening book")
+
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.size, self.win_needed, count = BOOK_HEADER.unpack_from(self.data)
+        if magic != BOOK_MAGIC or len(self.data) != BOOK_HEADER.size + 6 * count:
+            self.data.close()
+            self.file.close()
+            raise ValueError(f"{path} is not an opening book")
+
+        view = memoryview(self.data)
+        start = BOOK_HEADER.size
+        self.keys = view[start:start + 4 * count].cast('I')
+        self.scores = view[start + 4 * count:start + 5 * count].cast('b')
+        self.moves = view[start + 5 * count:]
+
+        self.fallback = fallback
+        self.lookups = 0
+        self.lookup_seconds = 0.0
+        self.last_stats = {}
+
+    def __len__(self):
+
+        return len(self.keys)
+
+    def lookup(self, board, piece):
+        """
+        :param board: Instance of the class Board (or one of its backends).
+        :param piece: Piece of the player on move.
+        :return: score, (row, col): Score of the position (see solve_positions) and the best move, None if the
+                 position isn't in the book.
+        """
+
+        if board.size != self.size or board.win_needed != self.win_needed:
+            return None
+
+        start = time.perf_counter()
+        size = self.size
+        digit_values = _digit_values(size)
+        numbers = [0] * 8
+        for row, col in board.moves_played:
+            code = 1 if board.piece_at(row, col) == piece else 2
+            for i, value in enumerate(digit_values[row * size + col]):
+                numbers[i] += code * value
+
+        key = min(numbers)
+        i = bisect_left(self.keys, key)
+        found = None
+        if i < len(self.keys) and self.keys[i] == key:
+            symmetries, _ = board_symmetries(size)
+            found = self.scores[i], divmod(symmetries[numbers.index(key)][self.moves[i]], size)
+
+        self.lookups += 1
+        self.lookup_seconds += time.perf_counter() - start
+        return found
+
+    def choose_move(self, board, piece, rng=None):
+        """
+        :param board: Instance of the class Board (or one of its backends).
+        :param piece: Piece of the player on move.
+        :param rng: Instance of random.Random, passed to fallback.
+        :return: row, col of the best move.
+        """
+
+        start = time.perf_counter()
+        found = self.lookup(board, piece)
+        if found is None:
+            if self.fallback is None:
+                self.fallback = AlphaBetaPlayer()
+            self.last_stats = {'found': False}
+            return self.fallback.choose_move(board, piece, rng)
+
+        score, move = found
+        self.last_stats = {'found': True, 'score': score, 'empty': board.empty_count(),
+                           'seconds': time.perf_counter() - start}
+        return move
+
+    def report(self):
+        """ :return: Result of the last move as one line of text. """
+
+        stats = self.last_stats
+        if not stats['found']:
+            return f"Position isn't in the book. {self.fallback.report()}"
+
+        if stats['score'] == 0:
+            result = "draw"
+        else:
+            moves = stats['empty'] - abs(stats['score']) + 1
+            result = f"{'win' if stats['score'] > 0 else 'loss'} in {moves} move{'s' if moves > 1 else ''}"
+        return f"Book: {result} with perfect play (looked up in {stats['seconds'] * 1e6:.0f} us)"
+
+    def close(self):
+
+        for view in (self.keys, self.scores, self.moves):
+            view.release()
+        self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, *exc_info):
+
+        self.close()
+
+    def __getstate__(self):
+        # memory map can't be sent to worker processes, workers open the book again
+        return self.path, self.fallback
+
+    def __setstate__(self, state):
+
+        self.__init__(*state)
+
+
+def benchmark_book(book, lookups=100000, seed=0):
+    """
+    Measures lookups in the opening book on positions from random games.
+
+    :return: Microseconds per lookup.
+    """
+
+    rng = Random(seed)
+    positions = []
+    while len(positions) < 1000:
+        board = Board(book.size, book.win_needed)
+        piece = 'X'
+        for _ in range(rng.randrange(book.size * book.size)):
+            row, col = board.random_move(rng)
+            board.make_move(row, col, piece)
+            if board.has_ended(row, col, piece, piece):
+                break
+            piece = other_piece(piece)
+        else:
+            positions.append((board, piece))
+
+    start = time.perf_counter()
+    for i in range(lookups):
+        board, piece = positions[i % len(positions)]
+        book.lookup(board, piece)
+
+    return (time.perf_counter() - start) / lookups * 1e6
+
+
+class _Session:
+    """ One connected client of GameServer. """
+
+    __slots__ = ('name', 'writer', 'match', 'piece', 'waiting')
+
+    def __init__(self, writer):
+
+        self.name = None
+        self.writer = writer
+        self.match = None
+        self.piece = None
+        self.waiting = None  # size of the board the session waits for an opponent at
+
+
+class _Match:
+    """ One game played on GameServer. """
+
+    __slots__ = ('board', 'players', 'on_move')
+
+    def __init__(self, board, players, on_move):
+
+        self.board = board
+        self.players = players  # piece -> _Session
+        self.on_move = on_move
+
+
+class GameServer:
+    """
+    asyncio TCP server hosting many independent games in one process.
+
+    Line based protocol (rows and columns start at 1), server answers start with OK, ERR or an event:
+        JOIN name [size]  -> OK WAITING, then START piece size win_needed first_piece opponent_name (size 3 to
+                             max_size, STATE sends all squares)
+        MOVE row col      -> MOVED piece row col (to both players), then WIN piece / DRAW when the game ended
+        STATE             -> STATE size win_needed piece_on_move cells (row by row, '.' empty square)
+        QUIT              -> closes the connection, the opponent gets WIN piece
+    Players waiting for an opponent are paired by board size (a player waits for one size at a time); after a
+    game ends they can JOIN again. A client
+    which doesn't read the opponent's moves and has more than max_buffer bytes unsent is disconnected (and loses
+    the game), so it can't grow memory of the server.
+    """
+
+    def __init__(self, max_buffer=1 << 16, max_size=SPARSE_BOARD_FROM - 1):
+
+        self.waiting = {}  # size -> session waiting for an opponent
+        self.max_buffer = max_buffer
+        self.max_size = max_size
+        self.sessions = 0
+        self.games_started = 0
+        self.moves = 0
+        self.dropped = 0  # clients disconnected for not reading
+
+    async def serve(self, host='127.0.0.1', port=8765):
+        """ Runs the server until it's cancelled. """
+
+        server = await asyncio.start_server(self.handle_client, host, port, limit=1024)
+        async with server:
+            await server.serve_forever()
+
+    async def handle_client(self, reader, writer):
+
+        session = _Session(writer)
+        self.sessions += 1
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ConnectionError, ValueError):
+                    break
+                if not line:
+                    break
+                words = line.decode(errors='replace').split()
+                if not words:
+                    continue
+
+                command = words[0].upper()
+                if command == 'QUIT':
+                    break
+                elif command == 'JOIN':
+                    self._join(session, words[1:])
+                elif command == 'MOVE':
+                    self._move(session, words[1:])
+                elif command == 'STATE':
+                    self._state(session)
+                else:
+                    self._send(session, "ERR unknown command, expected JOIN, MOVE, STATE or QUIT")
+                try:
+                    await writer.drain()
+                except ConnectionError:
+                    break
+        finally:
+            self._leave(session)
+            self.sessions -= 1
+            writer.close()
+
+    def _send(self, session, line):
+
+        if session.writer.is_closing():
+            return
+        session.writer.write(line.encode() + b"\n")
+        if session.writer.transport.get_write_buffer_size() > self.max_buffer:
+            self.dropped += 1
+            session.writer.close()  # its handle_client ends and the opponent wins
+
+    def _join(self, session, args):
+
+        if session.match is not None:
+            self._send(session, "ERR already in a game")
+            return
+        if session.waiting is not None:
+            self._send(session, "ERR already waiting for an opponent")
+            return
+        try:
+            size = int(args[1]) if len(args) > 1 else 3
+        except ValueError:
+            size = 0
+        if not args or not 3 <= size <= self.max_size:
+            self._send(session, f"ERR usage: JOIN name [size 3 - {self.max_size}]")
+            return
+
+        session.name = args[0]
+        opponent = self.waiting.pop(size, None)
+        if opponent is None:
+            self.waiting[size] = session
+            session.waiting = size
+            self._send(session, "OK WAITING")
+            return
+        opponent.waiting = None
+
+        board = SparseBoard(size) if size >= SPARSE_BOARD_FROM else Board(size)
+        first_piece = 'X' if randint(1, 2) == 1 else 'O'
+        opponent.piece, session.piece = 'X', 'O'
+        match = _Match(board, {'X': opponent, 'O': session}, first_piece)
+        opponent.match = session.match = match
+        self.games_started += 1
+
+        for piece, player in match.players.items():
+            other = match.players[other_piece(piece)]
+            self._send(player, f"START {piece} {size} {board.win_needed} {first_piece} {other.name}")
+
+    def _move(self, session, args):
+
+        match = session.match
+        if match is None:
+            self._send(session, "ERR not in a game")
+            return
+        if match.on_move != session.piece:
+            self._send(session, "ERR not your turn")
+            return
+        try:
+            row, col = int(args[0]) - 1, int(args[1]) - 1
+        except (ValueError, IndexError):
+            self._send(session, "ERR usage: MOVE row col")
+            return
+
+        board = match.board
+        if not board.contains(row, col):
+            self._send(session, "ERR square doesn't exist")
+            return
+        if not board.is_free(row, col):
+            self._send(session, "ERR there's already piece on the square")
+            return
+
+        board.make_move(row, col, session.piece)
+        self.moves += 1
+        for player in match.players.values():
+            self._send(player, f"MOVED {session.piece} {row + 1} {col + 1}")
+
+        if board.has_ended(row, col, session.piece, session.name, draws=True):
+            self._end(match, f"WIN {board.winner}" if board.winner else "DRAW")
+        elif len(board.moves_played) == board.size ** 2:
+            self._end(match, "DRAW")
+        else:
+            match.on_move = other_piece(session.piece)
+
+    def _state(self, session):
+
+        match = session.match
+        if match is None:
+            self._send(session, "ERR not in a game")
+            return
+
+        board = match.board
+        cells = "".join(str(board.piece_at(row, col) or '.') for row in range(board.size) for col in range(board.size))
+        self._send(session, f"STATE {board.size} {board.win_needed} {match.on_move} {cells}")
+
+    def _end(self, match, result):
+
+        for player in match.players.values():
+            self._send(player, result)
+            player.match = None
+            player.piece = None
+
+    def _leave(self, session):
+        """ Session disconnected: stop waiting, the opponent wins the game. """
+
+        if session.waiting is not None:
+            del self.waiting[session.waiting]
+            session.waiting = None
+
+        match = session.match
+        if match is not None:
+            opponent = match.players[other_piece(session.piece)]
+            self._end(match, f"WIN {opponent.piece}")
+
+
+async def _load_client(host, port, name, games, size, latencies, rng):
+    """ Bot client of run_load: plays games with random moves, appends seconds from MOVE to MOVED. """
+
+    reader, writer = await asyncio.open_connection(host, port)
+    moves = 0
+    closed = False  # by the server
+
+    for _ in range(games):
+        writer.write(f"JOIN {name} {size}\n".encode())
+        while True:
+            words = (await reader.readline()).decode().split()
+            closed = not words
+            if closed or words[0] in ('START', 'ERR'):
+                break
+        if closed or words[0] == 'ERR':  # server closed the connection or refused to join
+            break
+
+        piece, first_piece = words[1], words[4]
+        free = [(row, col) for row in range(size) for col in range(size)]
+        free_index = {square: i for i, square in enumerate(free)}
+        on_move = first_piece
+        sent = None
+
+        while True:
+            if on_move == piece and sent is None and free:
+                row, col = free[int(rng.random() * len(free))]
+                writer.write(f"MOVE {row + 1} {col + 1}\n".encode())
+                sent = time.perf_counter()
+
+            words = (await reader.readline()).decode().split()
+            closed = not words
+            if closed:
+                break
+            if words[0] == 'MOVED':
+                if words[1] == piece:
+                    latencies.append(time.perf_counter() - sent)
+                    sent = None
+                    moves += 1
+                # remove the square from free squares (swap with the last one)
+                square = (int(words[2]) - 1, int(words[3]) - 1)
+                i = free_index.pop(square)
+                last = free.pop()
+                if last != square:
+                    free[i] = last
+                    free_index[last] = i
+                on_move = other_piece(words[1])
+            elif words[0] in ('WIN', 'DRAW'):
+                break
+        if closed:
+            break
+
+    if not closed:
+        writer.write(b"QUIT\n")
+        await writer.drain()
+    writer.close()
+
+    return moves
+
+
+async def run_load(host=None, port=8765, connections=1000, games=5, size=3, seed=0):
+    """
+    Load generator: opens connections to GameServer, each bot plays games with random moves.
+
+    :param host: Host of the server, None starts a server in this process (on a free port).
+    :param port: Port of the server.
+    :param connections: Number of simultaneous connections (even number, bots play each other).
+    :param games: Games played by every connection.
+    :param size: Size of the board.
+    :param seed: Seed of random moves.
+    :return: Dictionary with moves, seconds, moves_per_second and latency percentiles (milliseconds).
+    """
+
+    server = None
+    if host is None:
+        game_server = GameServer()
+        server = await asyncio.start_server(game_server.handle_client, '127.0.0.1', 0, limit=1024)
+        host, port = server.sockets[0].getsockname()[:2]
+
+    rng = Random(seed)
+    latencies = []
+    start = time.perf_counter()
+    try:
+        moves = await asyncio.gather(*(_load_client(host, port, f"bot{i}", games, size, latencies,
+                                                    Random(rng.getrandbits(64)))
+                                       for i in range(connections)))
+    finally:
+        if server is not None:
+            server.close()
+            await server.wait_closed()
+    seconds = time.perf_counter() - start
+
+    latencies.sort()
+    percentiles = {f"p{p}_ms": latencies[min(len(latencies) - 1, len(latencies) * p // 100)] * 1000
+                   for p in (50, 90, 99)} if latencies else {}
+
+    return {'moves': sum(moves), 'seconds': seconds, 'moves_per_second': sum(moves) / seconds, **percentiles}
+
+
+def benchmark_boards(sizes=range(3, 51), games=20, seed=0):
+    """
+    Compares board backends (see BOARD_BACKENDS) on the same random games.
+
+    Every game is a random order of all squares played until someone wins; all backends replay exactly the same
+    moves and we time make_move + has_ended of every move.
+
+    :param sizes: Sizes of board to benchmark.
+    :param games: How many games are played per size.
+    :param seed: Seed of the random move orders.
+    :return: List of (size, dictionary backend name -> microseconds per move).
+    """
+
+    rng = Random(seed)
+    results = []
+
+    for size in sizes:
+        squares = [(row, col) for row in range(size) for col in range(size)]
+        games_moves = []
+        for _ in range(games):
+            rng.shuffle(squares)
+            games_moves.append(list(squares))
+
+        timings = {}
+        for name, board_class in BOARD_BACKENDS.items():
+            moves_count = 0
+            start = time.perf_counter()
+            for moves in games_moves:
+                board = board_class(size)
+                for i, (row, col) in enumerate(moves):
+                    piece = 'X' if i % 2 == 0 else 'O'
+                    board.make_move(row, col, piece)
+                    moves_count += 1
+                    if board.has_ended(row, col, piece, piece):
+                        break
+            timings[name] = (time.perf_counter() - start) / moves_count * 1e6
+
+        results.append((size, timings))
+
+    return results
+
+
+def benchmark_render(sizes=(3, 10, 25, 50, 100), frames=20, seed=0):
+    """
+    Measures how long it takes to build and write one frame of the board (to memory, not to a real terminal).
+
+    For every size a random game is played, and after every move the frame is drawn: as the whole frame (dumb
+    terminal) and as ANSI differences to the previous frame.
+
+    :param sizes: Sizes of board to benchmark.
+    :param frames: Number of frames (moves) per size.
+    :param seed: Seed of the random moves.
+    :return: List of (size, full frame microseconds, full frame bytes, ANSI diff microseconds, ANSI diff bytes).
+    """
+
+    rng = Random(seed)
+    results = []
+
+    for size in sizes:
+        board = Board(size)
+        moves = []
+        for i in range(min(frames, size * size)):
+            moves.append(board.random_move(rng))
+            board.make_move(*moves[-1], 'X' if i % 2 == 0 else 'O')
+
+        row = [size]
+        for ansi in (False, True):
+            board = Board(size)
+            stream = io.StringIO()
+            renderer = TerminalRenderer(stream, ansi=ansi, terminal_size=(10 ** 6, 10 ** 6))  # frames fit
+            renderer.draw(board.board_string())
+            written = stream.tell()
+
+            start = time.perf_counter()
+            for i, (move_row, move_col) in enumerate(moves):
+                board.make_move(move_row, move_col, 'X' if i % 2 == 0 else 'O')
+                renderer.draw(board.board_string())
+            row.append((time.perf_counter() - start) / len(moves) * 1e6)
+            row.append((stream.tell() - written) / len(moves))
+
+        results.append(tuple(row))
+
+    return results
+
+
+def benchmark_search(size, moves=10, time_limit=0.1, seed=0):
+    """
+    Lets AlphaBetaPlayer play against itself from an empty board and reports speed of every search, so changes
+    of search speed (nodes per second) can be tracked.
+
+    :param size: Size of the board.
+    :param moves: How many moves are played (less if the game ends sooner).
+    :param time_limit: Seconds per move.
+    :param seed: Seed of the first (random) move.
+    :return: Instance of AlphaBetaPlayer with total statistics.
+    """
+
+    board = Board(size)
+    engine = AlphaBetaPlayer(time_limit=time_limit)
+    piece = 'X'
+    row, col = board.random_move(Random(seed))
+
+    for i in range(min(moves, size * size)):
+        if i:
+            row, col = engine.choose_move(board, piece)
+            print(f"move {i + 1:>3} ({row + 1} {col + 1}): {engine.report()}")
+        board.make_move(row, col, piece)
+        if board.has_ended(row, col, piece, piece):
+            break
+        piece = other_piece(piece)
+
+    return engine
+
+
+def benchmark_mcts(size, workers_counts, time_limit=2.0, opening_moves=6, seed=0):
+    """
+    Measures MCTSPlayer playouts per second and tree memory for different numbers of workers, to choose the
+    worker count for a machine.
+
+    :param size: Size of the board.
+    :param workers_counts: Numbers of workers to try.
+    :param time_limit: Seconds of search per number of workers.
+    :param opening_moves: Random moves played before the search.
+    :param seed: Seed of the opening and playouts.
+    :return: List of (workers, last_stats of the search).
+    """
+
+    board = Board(size)
+    rng = Random(seed)
+    for i in range(opening_moves):
+        row, col = board.random_move(rng)
+        board.make_move(row, col, 'X' if i % 2 == 0 else 'O')
+
+    results = []
+    for workers in workers_counts:
+        engine = MCTSPlayer(time_limit=time_limit, workers=workers, seed=seed)
+        try:
+            engine.choose_move(board, 'X' if opening_moves % 2 == 0 else 'O')
+        finally:
+            engine.close()
+        results.append((workers, engine.last_stats))
+
+    return results
+
+
+def benchmark_shared_table(size, table_sizes, workers, games=40, depth=3, seed=0, opening_moves=4):
+    """
+    Plays games between two AlphaBetaPlayers searching to fixed depth in worker processes, first with a private
+    transposition table in every process, then sharing one SharedTranspositionTable of each size. The search
+    doesn't use randomness, so every game starts with seeded random opening moves (see RandomOpeningPolicy),
+    otherwise all games would be the same.
+
+    :return: List of (table size, None for private tables, SimulationStats, stats of the shared table or None).
+    """
+
+    results = []
+    for table_size in [None] + list(table_sizes):
+        table = SharedTranspositionTable(table_size) if table_size else None
+        try:
+            players = [RandomOpeningPolicy(AlphaBetaPlayer(time_limit=float('inf'), max_depth=depth, table=table),
+                                           opening_moves) for _ in range(2)]
+            stats = simulate_games(games, size, None, *players, workers=workers,
+                                   chunk_size=max(1, games // (4 * workers)), seed=seed)
+            results.append((table_size, stats, table.stats() if table else None))
+        finally:
+            if table:
+                table.close()
+
+    return results
+
+
+def positive_int(text):
+    """ Type of command line arguments which have to be integers 1+. """
+
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected an integer, got {text!r}")
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"has to be at least 1, got {value}")
+
+    return value
+
+
+POLICIES_HELP = ("random, greedy, alphabeta[:seconds per move], mcts[:seconds per move], book:path or "
+                 "scripted:row col,...")
+
+
+def run_command(argv):
+    """
+    Runs the game in command line mode (anything else than the interactive two player game).
+
+    :param argv: Command line arguments without the name of the program.
+    """
+
+    parser = argparse.ArgumentParser(prog="n-tic-tac-toe.py")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    play = commands.add_parser("play", help="play the interactive game and save games to an archive")
+    play.add_argument("--record", required=True, help="archive the games are appended to")
+
+    replay_parser = commands.add_parser("replay", help="replay a game from an archive")
+    replay_parser.add_argument("archive")
+    replay_parser.add_argument("--game", type=int, default=None, help="number of the game (from 1)")
+
+    serve = commands.add_parser("serve", help="run the game server (see GameServer)")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+
+    load = commands.add_parser("loadgen", help="load test the game server with bot clients")
+    load.add_argument("--host", default=None, help="server host, runs a local server if not given")
+    load.add_argument("--port", type=int, default=8765)
+    load.add_argument("--connections", type=int, default=1000)
+    load.add_argument("--games", type=int, default=5, help="games per connection")
+    load.add_argument("--size", type=int, default=3)
+    load.add_argument("--seed", type=int, default=0)
+
+    book = commands.add_parser("book", help="build opening book of a small board or measure lookups in it")
+    book.add_argument("action", choices=("build", "stats"))
+    book.add_argument("path", nargs="?", help="book file, book-<size>x<size>.bin by default")
+    book.add_argument("--size", type=int, default=3, help="size of the board (3 or 4)")
+    book.add_argument("--win-needed", type=int, default=3)
+    book.add_argument("--lookups", type=int, default=100000)
+
+    bench = commands.add_parser("benchmark", help="compare board backends")
+    bench.add_argument("--min-size", type=int, default=3)
+    bench.add_argument("--max-size", type=int, default=50)
+    bench.add_argument("--games", type=int, default=20)
+
+    simulate = commands.add_parser("simulate", help="play headless games between move policies")
+    simulate.add_argument("--games", type=int, default=10000)
+    simulate.add_argument("--size", type=int, default=3)
+    simulate.add_argument("--win-needed", type=int, default=None)
+    simulate.add_argument("--x", default="random", help=POLICIES_HELP)
+    simulate.add_argument("--o", default="random", help=POLICIES_HELP)
+    simulate.add_argument("--workers", type=int, default=1)
+    simulate.add_argument("--chunk-size", type=positive_int, default=1000)
+    simulate.add_argument("--seed", type=int, default=0)
+    simulate.add_argument("--board", choices=BOARD_BACKENDS, default="list", help="board backend")
+
+    render = commands.add_parser("render", help="measure frame time of the terminal renderer")
+    render.add_argument("--sizes", default="3,10,25,50,100", help="comma separated sizes of board")
+    render.add_argument("--frames", type=int, default=20)
+
+    search = commands.add_parser("search", help="measure speed of the alpha-beta computer opponent")
+    search.add_argument("--size", type=int, default=9)
+    search.add_argument("--moves", type=int, default=10)
+    search.add_argument("--time", type=float, default=0.1, help="seconds per move")
+    search.add_argument("--seed", type=int, default=0)
+
+    mcts = commands.add_parser("mcts", help="measure speed of the Monte Carlo tree search computer opponent")
+    mcts.add_argument("--size", type=int, default=15)
+    mcts.add_argument("--workers", default=",".join(str(2 ** k) for k in range((os.cpu_count() or 1).bit_length())),
+                      help="comma separated numbers of workers to try")
+    mcts.add_argument("--time", type=float, default=2.0, help="seconds of search per number of workers")
+    mcts.add_argument("--seed", type=int, default=0)
+
+    shared = commands.add_parser("tt", help="compare private and shared transposition tables of worker processes")
+    shared.add_argument("--size", type=int, default=7, help="size of the board")
+    shared.add_argument("--sizes", default="4096,65536,1048576", help="comma separated numbers of table entries")
+    shared.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    shared.add_argument("--games", type=int, default=40)
+    shared.add_argument("--depth", type=int, default=3, help="search depth of the players")
+    shared.add_argument("--opening", type=int, default=4, help="random moves at the start of every game")
+    shared.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "play":
+        with GameRecordWriter(args.record) as recorder:
+            play_interactive(recorder)
+
+    elif args.command == "replay":
+        try:
+            reader = GameRecordReader(args.archive)
+        except (OSError, ValueError) as error:
+            parser.error(str(error))
+
+        with reader:
+            if args.game is None:  # list the games
+                for i, record in enumerate(reader):
+                    result = "draw" if record.winner is None else f"{record.winner} won"
+                    print(f"{i + 1:>6}: {record.size} x {record.size}, {len(record.moves)} moves, {result}")
+            elif 1 <= args.game <= len(reader):
+                print_replay(reader[args.game - 1])
+            else:
+                parser.error(f"there are only {len(reader)} games in the archive")
+
+    elif args.command == "serve":
+        print(f"Serving n-tic-tac-toe on {args.host}:{args.port}")
+        try:
+            asyncio.run(GameServer().serve(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+
+    elif args.command == "loadgen":
+        if args.connections % 2:
+            parser.error("number of connections has to be even (bots play each other)")
+        stats = asyncio.run(run_load(args.host, args.port, args.connections, args.games, args.size, args.seed))
+        print(f"{stats['moves']} moves in {stats['seconds']:.2f} s ({stats['moves_per_second']:.0f} moves/s), "
+              f"move latency p50 {stats.get('p50_ms', 0):.1f} ms, p90 {stats.get('p90_ms', 0):.1f} ms, "
+              f"p99 {stats.get('p99_ms', 0):.1f} ms")
+
+    elif args.command == "book":
+        path = args.path or f"book-{args.size}x{args.size}.bin"
+        if args.action == "build":
+            try:
+                stats = build_book(path, args.size, args.win_needed)
+            except ValueError as error:
+                parser.error(str(error))
+            print(f"Solved {stats['symmetric_positions']} positions in {stats['seconds']:.1f} s, "
+                  f"{stats['positions']} after reducing symmetries, written to {path}")
+
+        try:
+            opening_book = OpeningBook(path)
+        except (OSError, ValueError) as error:
+            parser.error(str(error))
+
+        with opening_book:
+            print(f"Book of {opening_book.size} x {opening_book.size} board ({opening_book.win_needed} in order win): "
+                  f"{len(opening_book)} positions, {os.path.getsize(path)} bytes "
+                  f"({os.path.getsize(path) / max(len(opening_book), 1):.1f} bytes per position)")
+            lookup_us = benchmark_book(opening_book, args.lookups)
+            print(f"Lookup: {lookup_us:.2f} us ({1e6 / lookup_us:.0f} lookups/s)")
+
+    elif args.command == "benchmark":
+        print(f"{'size':>5}" + "".join(f" {name + ' us/move':>17}" for name in BOARD_BACKENDS))
+        for size, timings in benchmark_boards(range(args.min_size, args.max_size + 1), args.games):
+            print(f"{size:>5}" + "".join(f" {timings[name]:>17.2f}" for name in BOARD_BACKENDS))
+
+    elif args.command == "simulate":
+        try:
+            policy_x, policy_o = make_policy(args.x), make_policy(args.o)
+        except ValueError as error:
+            parser.error(str(error))
+
+        stats = simulate_games(args.games, args.size, args.win_needed, policy_x, policy_o, args.workers,
+                               args.chunk_size, args.seed, BOARD_BACKENDS[args.board])
+        stats.print_report()
+
+    elif args.command == "render":
+        print(f"{'size':>5} {'full us/frame':>14} {'full bytes':>11} {'diff us/frame':>14} {'diff bytes':>11}")
+        for size, full_us, full_bytes, diff_us, diff_bytes in benchmark_render(
+                [int(size) for size in args.sizes.split(',')], args.frames):
+            print(f"{size:>5} {full_us:>14.0f} {full_bytes:>11.0f} {diff_us:>14.0f} {diff_bytes:>11.0f}")
+
+    elif args.command == "search":
+        engine = benchmark_search(args.size, args.moves, args.time, args.seed)
+        print(f"Total: {engine.total_nodes} nodes in {engine.total_seconds:.2f} s "
+              f"({engine.total_nodes / max(engine.total_seconds, 1e-9):.0f} nodes/s)")
+
+    elif args.command == "tt":
+        print(f"{'table':>9} {'games/s':>8} {'hit rate':>9} {'shared hits':>12} {'overwrites':>11} {'fill':>6}")
+        for table_size, stats, table_stats in benchmark_shared_table(
+                args.size, [int(size) for size in args.sizes.split(',')], args.workers, args.games, args.depth,
+                args.seed, args.opening):
+            games_per_second = stats.games / stats.seconds
+            if table_stats is None:
+                print(f"{'private':>9} {games_per_second:>8.2f}")
+            else:
+                print(f"{table_size:>9} {games_per_second:>8.2f} {table_stats['hit_rate']:>9.1%} "
+                      f"{table_stats['shared_hit_rate']:>12.1%} {table_stats['overwrite_rate']:>11.1%} "
+                      f"{table_stats['fill']:>6.1%}")
+
+    elif args.command == "mcts":
+        print(f"{'workers':>7} {'playouts/s':>11} {'tree nodes':>11} {'tree KiB':>9}")
+        for workers, stats in benchmark_mcts(args.size, [int(w) for w in args.workers.split(',')], args.time,
+                                             seed=args.seed):
+            print(f"{workers:>7} {stats['playouts_per_second']:>11.0f} {stats['tree_nodes']:>11} "
+                  f"{stats['tree_bytes'] / 1024:>9.0f}")
+
+
+def play_interactive(recorder=None):
+    """
+    The interactive game: asks for names and opponent, then plays games until players want to stop.
+
+    :param recorder: Instance of GameRecordWriter which saves every game, None to not save games.
+    """
+
+    name1 = input("Please enter your name player1:\n")
+    engine = choose_opponent()
+    if engine:
+        name2 = "Computer"
+    else:
+        name2 = input("Please enter your name player2:\n")
+    piece1, piece2 = assign_pieces(name1)  # get who starts and get other player
+
+    player1 = Player(name=name1, piece=piece1, wins=0)
+    player2 = Player(name=name2, piece=piece2, wins=0, engine=engine)
+
+    playing = True
+
+    while playing:
+        # get size of board user wants to have
+        size_board = get_board_size(SPARSE_BOARD_FROM - 1 if engine else None)
+
+        play_game(player1, player2, size_board, recorder)  # starts playing game
+
+        print("Current score is:")
+        player1.print_score()
+        player2.print_score()
+        print()
+
+        if not start_again():  # start game again or end game
+            playing = False
+
+    if engine and hasattr(engine, 'close'):
+        engine.close()  # stop worker processes
+
+    print(f"Game ended with score:")
+    player1.print_score()
+    player2.print_score()
+    print()
+
+    if player1.wins > player2.wins:
+        print(f"Player {player1.name} won, congratulations.\n")
+    elif player1.wins == player2.wins:
+        print("Game ended in draw.\n")
+    else:
+        print(f"Player {player2.name} won, congratulations.\n")
+
+    print("Thanks for playing!")
+
+
+if __name__ == '__main__':
+
+    if len(sys.argv) > 1:  # command line mode, e.g. benchmark
+        run_command(sys.argv[1:])
+        sys.exit()
+
+    play_interactive()
@@ -3,195 +3,763 @@ Squares game in tkinter. Clicking on green square adds one point, clicking on re
 points.
 
 Game contains 4 levels, and it always gets harder. To win 30 points are needed.
+
+The rules are in SquaresGame, which doesn't need tkinter (runs with logical clock and seeded random generator),
+so sessions can be played headless much faster than real time: python squares-tkinter-game.py simulate
 """
 
+import argparse
+import sys
+import time
 import tkinter
 import random as rd
 
 w = 800
 h = 800
-canvas = tkinter.Canvas(width=w, height=h)
-canvas.pack()
+WIN_POINTS = 30
+LEVELS = (  # (points needed, radius of the square, milliseconds between squares), from the highest level
+    (20, 20, 650),
+    (15, 20, 800),
+    (10, 25, 800),
+    (0, 40, 1000),
+)
+
+
+class SquaresGame:
+    """
+    State of the game without any drawing. Every tick shows a new square (tick returns milliseconds until the
+    next one), the player clicks between ticks. Time is logical (milliseconds from the start of the game), so the
+    game runs as fast as it's driven: by tkinter's after in real time or by play_session headless.
+
+    Args: seed - seed of the random generator (squares of the game with the same seed are the same)
+          width, height - size of the playing area
+    """
+
+    def __init__(self, seed=None, width=w, height=h):
+
+        self.rng = rd.Random(seed)
+        self.width = width
+        self.height = height
+        self.time = 0        # logical time of the last tick (ms)
+        self.next_tick = 0   # logical time of the next tick (ms)
+        self.ticks = 0
+        self.reset()
+
+    def reset(self):
+
+        self.level = 1
+        self.is_poisoned = -1  # red (poisoned) square
+        self.points = 0
+        self.shown_points = 0  # points shown in this tick (before green square took its point)
+        self.r = 40            # radius of the square
+        self.speed = 1000      # milliseconds between squares
+        self.win = 0           # check if we already won game (used when resetting game)
+        self.was_first_green = 0  # was first click on green square (to fix a bug - adding 2 points at the start)
+        self.was_clicked = 0   # check if we already clicked on some square (fixes bug - repeated clicking on square
+                               # increased points)
+        self.x_ = self.y_ = None  # center of the square, None before the first square
+
+    def tick(self):
+        """
+        Shows a new square. In the first part distributes levels depending on points, also changes radius of the
+        squares and speed of changing of squares. Next it randomly generates red or green square.
+
+        :return: milliseconds until the next tick, None if the game was won (no more ticks)
+        """
+
+        self.time = self.next_tick
+        self.ticks += 1
+        self.was_clicked = 0
+
+        if self.points >= WIN_POINTS:  # win
+            self.win = 1
+            self.x_ = self.y_ = None
+            return None
+
+        for index, (needed, r, speed) in enumerate(LEVELS):
+            if self.points >= needed:
+                self.level = len(LEVELS) - index
+                self.r = r
+                self.speed = speed
+                break
+
+        self.points = max(self.points, 0)  # fixes bug, at the start we could have negative points
+        self.shown_points = self.points
+
+        green_red = self.rng.randint(1, 10)  # chance 2/10 on red square, 8/10 on green square
+
+        self.x_ = self.rng.randint(self.r, self.width - self.r)
+        self.y_ = self.rng.randint(170 + self.r, self.height - self.r)
+
+        if green_red in range(1, 3):  # red square
+            self.is_poisoned = 1
+        else:  # green square
+            self.is_poisoned = 0
+            self.points -= 1
+
+        self.points = max(0, self.points)  # gets rid of negative points
+        self.next_tick = self.time + self.speed
+        return self.speed
+
+    def click(self, x, y):
+        """
+        Handles player's click and changes points accordingly, only the first click after a tick counts.
+
+        :return: change of points
+        """
+
+        change = 0
+        if (self.x_ is not None and self.x_ - self.r <= x < self.x_ + self.r
+                and self.y_ - self.r <= y < self.y_ + self.r and self.was_clicked == 0):
+            if self.is_poisoned == 1:
+                change = -2
+            elif self.was_first_green == 0:
+                change = 1
+                self.was_first_green = 1
+            else:
+                change = 2
+
+        self.points += change
+        self.was_clicked = 1
+        return change
+
+    def new_game(self):
+        """
+        Resets game.
+
+        :return: True if the ticks have to be started again (the game was won, so they stopped)
+        """
+
+        won = self.win == 1
+        self.reset()
+        return won
+
+
+def reaction_player(accuracy=0.9, reaction=350, mistakes=0.05):
+    """
+    Scripted player for play_session: clicks green square with probability accuracy, red one with probability
+    mistakes, in reaction milliseconds (normally distributed, sigma is reaction / 4). Clicks slower than the square
+    are missed.
+
+    :return: function (game, rng) -> milliseconds after the tick of the click on the square, None for no click
+    """
+
+    def decide(game, rng):
+        if rng.random() >= (mistakes if game.is_poisoned == 1 else accuracy):
+            return None
+        delay = rng.gauss(reaction, reaction / 4)
+        return delay if 0 <= delay < game.speed else None
 
-level = 1
-is_poisoned = -1  # red (poisoned) square
-points = 0
-r = 40            # radius of the square
-win = 0           # check if we already won game (used when resetting game)
-was_first_green = 0     # was first click on green square (to fix a bug - adding 2 points at the start)
+    return decide
 
 
-def draw_outline():
+def play_session(seed, player, max_time=300000):
     """
-    Draw outline / background of the program.
+    Plays one game headless: player (see reaction_player) decides after every tick, its click goes to the center
+    of the square.
 
-    Uses 2 global variables: points, level
+    :param seed: seed of the game and of the player
+    :param max_time: game is given up after this many logical milliseconds
+    :return: SquaresGame at the end of the session
     """
-    
-    canvas.create_text(w/9.3, h/40, text="Level 1: 0 - 9 p", font="Times 20")
-    canvas.create_text(w/8, h/16, text="Level 2: 10 - 14 p", font="Times 20")
-    canvas.create_text(w/8, h/10, text="Level 3: 15 - 19 p", font="Times 20")
-    canvas.create_text(w/5.26, h/7.27, text="Level 4: 20+ p (impossible)",
-                       font="Times 20")
-    canvas.create_text(w/14, h/5.71, text="Win: 30 b", font="Times 20")
-    canvas.create_text(w/2, h/14.5, text=f"Points: ", font="Times 40 bold")
-    canvas.create_text(w/1.61, h/14, text=points, font="Times 40 bold")
-    
-    canvas.create_text(w/2, h/6.5, text=f"Level: ", font="Times 40 bold")
-    canvas.create_text(w/1.61, h/6.5, text=level, font="Times 40 bold")
 
-    canvas.create_text(w/1.18, h/20, text="Warning, red square", font="Times 20")
-    canvas.create_text(w/1.18, h/11, text="is poisoned", font="Times 20")
-    canvas.create_text(w/1.21, h/6, text="Right click: reset", font="Times 20")
+    game = SquaresGame(seed)
+    rng = rd.Random(f"player {seed}")  # not the game's sequence of numbers
+    speed = game.tick()
+    while speed is not None and game.time < max_time:
+        if player(game, rng) is not None:
+            game.click(game.x_, game.y_)
+        speed = game.tick()
 
+    return game
 
-def rect():
+
+def simulate_sessions(sessions, player, max_time=300000, seed=0):
     """
-    Main function, draws squares, controls points...
+    Balance testing: plays sessions headless with the scripted player.
 
-    In the first part distributes levels depending on points, also changes
-    radius of the squares and speed of changing of squares.
+    :return: dictionary with sessions, win_rate, average seconds to win (logical), levels (level -> sessions which
+             ended in it), seconds, sessions_per_second and speedup (logical time / real time)
+    """
 
-    Next it randomly generates red or green square. Handles changing of points. With
-    help of function click checks squares which have been clicked.
+    start = time.perf_counter()
+    wins = 0
+    win_time = 0
+    played_time = 0
+    levels = {}
+    for session in range(sessions):
+        game = play_session(seed * sessions + session, player, max_time)
+        played_time += game.time
+        if game.win:
+            wins += 1
+            win_time += game.time
+        levels[game.level] = levels.get(game.level, 0) + 1
+    seconds = time.perf_counter() - start
+
+    return {'sessions': sessions, 'win_rate': wins / sessions, 'seconds_to_win': win_time / max(wins, 1) / 1000,
+            'levels': dict(sorted(levels.items())), 'seconds': seconds, 'sessions_per_second': sessions / seconds,
+            'speedup': played_time / 1000 / seconds}
+
+
+class SpatialHash:
+    """
+    Uniform grid over the playing area: every cell keeps ids of targets whose square overlaps it, so a click is
+    tested only against targets of its cell. Targets are added, moved and removed one by one, a moved target
+    changes its cells only when it crossed a border of a cell.
 
-    global variables:
-    x_, y_: coordinates
-    r: radius of randomly generated square
-    points: points of player
-    is_poisoned: 1 - square is red 0 - square is green
-    level: on which level we are currently on
-    win: 1 if the game was won
-    was_clicked: check if we already clicked on some square (fixes bug - repeated
-                 clicking on square increased points)
+    Args: cell - size of a cell in pixels (about the diameter of the biggest target is the best)
     """
 
-    global x_, y_, r, points, is_poisoned, level, win, was_clicked
+    def __init__(self, cell=64):
+
+        self.cell = cell
+        self.cells = {}   # (column, row) -> set of ids
+        self.ranges = {}  # id -> (first column, first row, last column, last row) of cells the target overlaps
+
+    def _range(self, x, y, r):
+
+        cell = self.cell
+        return int(x - r) // cell, int(y - r) // cell, int(x + r) // cell, int(y + r) // cell
+
+    def insert(self, key, x, y, r):
+
+        cells_range = self._range(x, y, r)
+        self.ranges[key] = cells_range
+        self._add(key, cells_range)
+
+    def move(self, key, x, y, r):
+
+        cells_range = self._range(x, y, r)
+        old = self.ranges[key]
+        if cells_range != old:
+            self._discard(key, old)
+            self._add(key, cells_range)
+            self.ranges[key] = cells_range
 
-    was_clicked = 0
+    def remove(self, key):
 
+        self._discard(key, self.ranges.pop(key))
+
+    def query(self, x, y):
+        """ :return: ids of targets which can contain point x, y """
+
+        return self.cells.get((int(x) // self.cell, int(y) // self.cell), ())
+
+    def _add(self, key, cells_range):
+
+        first_col, first_row, last_col, last_row = cells_range
+        for col in range(first_col, last_col + 1):
+            for row in range(first_row, last_row + 1):
+                ids = self.cells.get((col, row))
+                if ids is None:
+                    self.cells[col, row] = ids = set()
+                ids.add(key)
+
+    def _discard(self, key, cells_range):
+
+        first_col, first_row, last_col, last_row = cells_range
+        for col in range(first_col, last_col + 1):
+            for row in range(first_row, last_row + 1):
+                ids = self.cells[col, row]
+                ids.discard(key)
+                if not ids:
+                    del self.cells[col, row]
+
+
+class Target:
+    """ Moving square of SwarmGame, position and speed in pixels (per second). """
+
+    __slots__ = ('id', 'x', 'y', 'r', 'vx', 'vy', 'is_poisoned', 'expires')
+
+    def __init__(self, key, x, y, r, vx, vy, is_poisoned, expires):
+
+        self.id = key
+        self.x = x
+        self.y = y
+        self.r = r
+        self.vx = vx
+        self.vy = vy
+        self.is_poisoned = is_poisoned
+        self.expires = expires  # logical time (ms) when the target disappears
+
+
+class SwarmGame:
     """
-    Depending on points distributes levels. With each changed level changes also radius 
-    of squares and speed of changing.
+    Many-target mode: `targets` green and red squares of different sizes move around the playing area at once,
+    each one disappears after its lifetime and a new one appears instead. Clicking on green square adds a point,
+    on red one subtracts 2, the clicked square disappears. Logical clock and seeded random generator as in
+    SquaresGame, step moves the game by some milliseconds.
+
+    Clicks are resolved with SpatialHash (use_hash=False tests every target, for comparison).
+
+    Args: targets - number of squares on the playing area
+          seed - seed of the random generator
+          radius - smallest and biggest radius of the squares
+          speed - biggest speed of a square (pixels per second)
+          lifetime - shortest and longest life of a square (ms)
     """
 
-    if points >= 30:  # win
-        canvas.delete("all")
-        canvas.create_text(w/2, h/2.6, text="Congratulations, you won.",
-                           font="Times 50")
-        canvas.create_text(w/2, h/1.78, text="Play again? (left click)",
-                           font="Times 30")
-        win = 1
-        return
-    # level 4
-    elif points >= 20:
-        level = 4
-        r = 20
-        speed = 650
-        
-    # level 3
-    elif points >= 15:
-        level = 3
-        r = 20
-        speed = 800
-        
-    # level 2
-    elif points >= 10:
-        level = 2
-        r = 25
-        speed = 800
-
-    # level 1
-    else:
-        level = 1
-        r = 40
-        speed = 1000
+    def __init__(self, targets=500, seed=None, radius=(5, 30), speed=120, lifetime=(2000, 8000), width=w,
+                 height=h, use_hash=True):
+
+        self.rng = rd.Random(seed)
+        self.count = targets
+        self.radius = radius
+        self.max_speed = speed
+        self.lifetime = lifetime
+        self.width = width
+        self.height = height
+        self.top = 170  # the legend is above the playing area
+        self.use_hash = use_hash
+        self.grid = SpatialHash(2 * radius[1])
+        self.targets = {}  # id -> Target
+        self.next_id = 0
+        self.time = 0
+        self.points = 0
+        self.hits = 0
+        self.misses = 0
+        self.spawned = []  # ids of targets created since the view drew them
+        self.removed = []  # ids of targets removed since the view drew them
+        for _ in range(targets):
+            self._spawn()
+
+    def _spawn(self):
+
+        rng = self.rng
+        r = rng.randint(*self.radius)
+        target = Target(self.next_id, rng.uniform(r, self.width - r), rng.uniform(self.top + r, self.height - r), r,
+                        rng.uniform(-self.max_speed, self.max_speed), rng.uniform(-self.max_speed, self.max_speed),
+                        1 if rng.randint(1, 10) <= 2 else 0, self.time + rng.randint(*self.lifetime))
+        self.next_id += 1
+        self.targets[target.id] = target
+        self.grid.insert(target.id, target.x, target.y, r)
+        self.spawned.append(target.id)
+
+    def _remove(self, target):
+
+        del self.targets[target.id]
+        self.grid.remove(target.id)
+        self.removed.append(target.id)
+
+    def step(self, milliseconds):
+        """ Moves the targets (they bounce off the borders), replaces expired ones. """
+
+        self.time += milliseconds
+        seconds = milliseconds / 1000
+        grid = self.grid
+        expired = []
+        for target in self.targets.values():
+            if target.expires <= self.time:
+                expired.append(target)
+                continue
+
+            r = target.r
+            target.x += target.vx * seconds
+            target.y += target.vy * seconds
+            if not r <= target.x <= self.width - r:
+                target.vx = -target.vx
+                target.x = min(max(target.x, r), self.width - r)
+            if not self.top + r <= target.y <= self.height - r:
+                target.vy = -target.vy
+                target.y = min(max(target.y, self.top + r), self.height - r)
+            grid.move(target.id, target.x, target.y, r)
+
+        for target in expired:
+            self._remove(target)
+        while len(self.targets) < self.count:
+            self._spawn()
+
+    def target_at(self, x, y):
+        """ :return: the newest target containing point x, y (drawn on top), None if there isn't any """
+
+        candidates = self.grid.query(x, y) if self.use_hash else self.targets
+        found = None
+        for key in candidates:
+            target = self.targets[key]
+            r = target.r
+            if target.x - r <= x < target.x + r and target.y - r <= y < target.y + r:
+                if found is None or key > found.id:
+                    found = target
+
+        return found
+
+    def click(self, x, y):
+        """ :return: change of points """
+
+        target = self.target_at(x, y)
+        if target is None:
+            self.misses += 1
+            return 0
+
+        change = -2 if target.is_poisoned == 1 else 1
+        self.points += change
+        self.hits += 1
+        self._remove(target)
+        return change
+
+
+def benchmark_clicks(counts=(100, 1000, 5000, 20000), clicks=20000, seed=0):
+    """
+    Time of resolving a click with SpatialHash and with testing all targets, for different numbers of targets.
+    Targets are moved between batches of clicks, clicks are at random points of the playing area.
+
+    :return: list of (targets, microseconds per click with hash, without hash, microseconds per step of 33 ms)
+    """
 
+    results = []
+    for count in counts:
+        timings = []
+        step_timings = []
+        for use_hash in (True, False):
+            game = SwarmGame(count, seed, use_hash=use_hash)
+            rng = rd.Random(seed)
+            points = [(rng.uniform(0, game.width), rng.uniform(game.top, game.height)) for _ in range(clicks)]
+            batch = max(1, clicks // 20)
+            seconds = step_seconds = 0.0
+            for i in range(0, clicks, batch):
+                start = time.perf_counter()
+                game.step(33)
+                step_seconds += time.perf_counter() - start
+                start = time.perf_counter()
+                for x, y in points[i:i + batch]:
+                    game.target_at(x, y)
+                seconds += time.perf_counter() - start
+            timings.append(seconds / clicks * 1e6)
+            step_timings.append(step_seconds / -(-clicks // batch) * 1e6)
+        results.append((count, timings[0], timings[1], step_timings[0]))
+
+    return results
+
+
+class CanvasCalls:
     """
-    ------------------------------------------------------------------------------
+    Canvas wrapper counting calls of its methods (every one is a Tk command) for SquaresView. Without canvas
+    (no display) the calls are only counted, create_* return new item ids.
     """
 
-    canvas.delete("all")
+    def __init__(self, canvas=None):
 
-    points = max(points, 0)  # fixes bug, at the start we could have negative points
-    draw_outline()  # draws background
+        self.canvas = canvas
+        self.calls = 0
+        self._items = 0
 
-    green_red = rd.randint(1, 10)  # chance 2/10 on red square, 8/10 on green square
+    def __getattr__(self, name):
 
-    x_ = rd.randint(r, 800 - r)
-    y_ = rd.randint(170 + r, 800 - r)
+        method = getattr(self.canvas, name) if self.canvas is not None else None
 
-    if green_red in range(1, 3):  # red square
-        color = "red"
-        is_poisoned = 1
+        def call(*args, **kwargs):
+            self.calls += 1
+            if method is not None:
+                return method(*args, **kwargs)
+            if name.startswith("create_"):
+                self._items += 1
+                return self._items
 
-    else:  # green square
-        color = "green"
-        is_poisoned = 0
-        points -= 1
-        
-    canvas.create_rectangle(x_ - r, y_ - r, x_ + r, y_ + r, fill=color, tags="del")
-    canvas.after(speed, rect)
+        return call
 
-    points = max(0, points)  # gets rid of negative points
-    
 
-def click(event):
+class SquaresView:
     """
-    Handles user's left click and changes points accordingly
+    Draws SquaresGame on tkinter canvas and passes clicks to it, ticks are run by canvas.after.
 
-    was_first_green:   was first click on green square (to fix a bug - adding 2 points at the start)
-    was_clicked: check if we already clicked on some square (fixes bug - repeated
-                 clicking on square increased points)
+    Retained (default): the legend, labels, square and win screen are created once, every tick only changes what
+    changed (itemconfigure / coords) and screens are switched by hiding items. Otherwise everything is deleted and
+    drawn again every tick.
     """
-    global points, was_first_green, was_clicked
-    
-    click_x = event.x
-    click_y = event.y
 
-    if click_x in range(x_ - r, x_ + r) and click_y in range(y_ - r, y_ + r):
+    def __init__(self, game, canvas, retained=True):
+
+        self.game = game
+        self.canvas = canvas
+        self.retained = retained
+        self.points_item = self.level_item = self.square = None
+        self.shown = {}  # what the retained items show now
+        canvas.bind('<Button-1>', self.click)
+        canvas.bind('<Button-3>', self.nova_hra)
+
+    def draw_outline(self, tags=()):
+        """ Draw outline / background of the program (without points and level). """
+
+        canvas = self.canvas
+        canvas.create_text(w/9.3, h/40, text="Level 1: 0 - 9 p", font="Times 20", tags=tags)
+        canvas.create_text(w/8, h/16, text="Level 2: 10 - 14 p", font="Times 20", tags=tags)
+        canvas.create_text(w/8, h/10, text="Level 3: 15 - 19 p", font="Times 20", tags=tags)
+        canvas.create_text(w/5.26, h/7.27, text="Level 4: 20+ p (impossible)",
+                           font="Times 20", tags=tags)
+        canvas.create_text(w/14, h/5.71, text="Win: 30 b", font="Times 20", tags=tags)
+        canvas.create_text(w/2, h/14.5, text=f"Points: ", font="Times 40 bold", tags=tags)
+        canvas.create_text(w/2, h/6.5, text=f"Level: ", font="Times 40 bold", tags=tags)
+
+        canvas.create_text(w/1.18, h/20, text="Warning, red square", font="Times 20", tags=tags)
+        canvas.create_text(w/1.18, h/11, text="is poisoned", font="Times 20", tags=tags)
+        canvas.create_text(w/1.21, h/6, text="Right click: reset", font="Times 20", tags=tags)
+
+    def draw_won(self, tags=(), state="normal"):
+
+        self.canvas.create_text(w/2, h/2.6, text="Congratulations, you won.",
+                                font="Times 50", tags=tags, state=state)
+        self.canvas.create_text(w/2, h/1.78, text="Play again? (left click)",
+                                font="Times 30", tags=tags, state=state)
+
+    def rect(self):
+        """ Runs tick of the game, draws the new square (or the win screen) and schedules the next tick """
+
+        speed = self.game.tick()
+        self.draw()
+        if speed is not None:
+            self.canvas.after(speed, self.rect)
+
+    def draw(self):
+        """ Draws the game after its tick """
+
+        if self.retained:
+            self._update()
+            return
+
+        game = self.game
+        canvas = self.canvas
+        canvas.delete("all")
+        if game.win:
+            self.draw_won()
+            return
+
+        self.draw_outline()  # draws background
+        canvas.create_text(w/1.61, h/14, text=game.shown_points, font="Times 40 bold")
+        canvas.create_text(w/1.61, h/6.5, text=game.level, font="Times 40 bold")
+        color = "red" if game.is_poisoned == 1 else "green"
+        r = game.r
+        canvas.create_rectangle(game.x_ - r, game.y_ - r, game.x_ + r, game.y_ + r, fill=color, tags="del")
+
+    def _update(self):
+        """ Retained drawing: creates the items at the first tick, then only changes them. """
+
+        game = self.game
+        canvas = self.canvas
+        shown = self.shown
+        if self.square is None:
+            self.draw_outline(tags="game")
+            self.points_item = canvas.create_text(w/1.61, h/14, text="", font="Times 40 bold", tags="game")
+            self.level_item = canvas.create_text(w/1.61, h/6.5, text="", font="Times 40 bold", tags="game")
+            self.square = canvas.create_rectangle(0, 0, 0, 0, fill="", tags=("game", "del"))
+            self.draw_won(tags="won", state="hidden")
+            shown['screen'] = "game"
+
+        screen = "won" if game.win else "game"
+        if shown.get('screen') != screen:
+            self._show(screen)
+        if game.win:
+            return
+
+        changes = (('points', game.shown_points, self.points_item, 'text'),
+                   ('level', game.level, self.level_item, 'text'),
+                   ('color', "red" if game.is_poisoned == 1 else "green", self.square, 'fill'))
+        for name, value, item, option in changes:
+            if shown.get(name) != value:
+                canvas.itemconfigure(item, {option: value})
+                shown[name] = value
+
+        box = (game.x_ - game.r, game.y_ - game.r, game.x_ + game.r, game.y_ + game.r)
+        if shown.get('box') != box:
+            canvas.coords(self.square, *box)
+            shown['box'] = box
+
+    def _show(self, screen):
+        """ Shows items of the screen (game, won or None for empty canvas), hides the others. """
+
+        for tag in ("game", "won"):
+            self.canvas.itemconfigure(tag, state="normal" if tag == screen else "hidden")
+        self.shown['screen'] = screen
+
+    def click(self, event):
+        """ Handles user's left click """
+
+        self.game.click(event.x, event.y)
+        self.canvas.delete("square")
+
+    def nova_hra(self, _):
+        """ Resets game """
+
+        if self.retained and self.square is not None:
+            self._show(None)
+        elif not self.retained:
+            self.canvas.delete("all")
+        # if we called rect and the game wasn't won, game would unexpectedly speed up.
+        if self.game.new_game():
+            self.rect()
+
+
+def benchmark_render(ticks=2000, seed=0):
+    """
+    Compares drawing every tick from scratch with retained drawing on the same game (scripted player clicks 80 %
+    of squares, a new game starts when it's won): Tk calls per tick and milliseconds per tick (drawing and Tk's
+    update of the window). Without display only calls are counted.
 
-        if was_clicked == 0:
-            if is_poisoned == 1:
-                points -= 2
-            else:
-                if was_first_green == 0:
-                    points += 1
-                    was_first_green = 1
-                else:
-                    points += 2
-                  
-    canvas.delete("square")
-    was_clicked = 1
-    return
-
-
-def nova_hra(_):
-    """
-    Resets game.
-
-    r: radius of randomly generated square
-    points: points of player
-    is_poisoned: 1 - square is red 0 - square is green
-    level: on which level we are currently on
-    win: 1 if the game was won
-    was_first_green: was first click on green square (to fix a bug - adding 2 points at the start)
-    """
-
-    global r, points, is_poisoned, level, win, was_first_green
-
-    level = 1
-    is_poisoned = -1
-    points = 0
-    r = 40
-    was_first_green = 0
-    canvas.delete("all")
-    # if we called rect and the game wasn't won, game would unexpectedly speed up.
-    if win == 1:
-        win = 0
-        rect()
-    
-
-canvas.bind('<Button-1>', click)
-canvas.bind('<Button-3>', nova_hra)
-rect()
+    :return: dictionary mode ('redraw', 'retained') -> (calls per tick, milliseconds per tick), True if it was drawn
+             on a real canvas
+    """
+
+    try:
+        root = tkinter.Tk()
+        root.withdraw()
+    except tkinter.TclError:
+        root = None
+
+    results = {}
+    for mode, retained in (('redraw', False), ('retained', True)):
+        canvas = None
+        if root is not None:
+            canvas = tkinter.Canvas(root, width=w, height=h)
+            canvas.pack()
+        calls = CanvasCalls(canvas)
+        game = SquaresGame(seed)
+        player = rd.Random(seed)
+        view = SquaresView(game, calls, retained)
+        calls.calls = 0
+        seconds = 0.0
+        for _ in range(ticks):
+            if game.win:
+                game.new_game()  # not nova_hra, which would also run a tick of its own
+            elif game.x_ is not None and player.random() < 0.8:
+                game.click(game.x_, game.y_)
+            game.tick()
+            start = time.perf_counter()
+            view.draw()
+            if canvas is not None:
+                canvas.update_idletasks()
+            seconds += time.perf_counter() - start
+        results[mode] = (calls.calls / ticks, seconds / ticks * 1000)
+        if canvas is not None:
+            canvas.destroy()
+
+    if root is not None:
+        root.destroy()
+    return results, root is not None
+
+
+class SwarmView:
+    """ Draws SwarmGame on tkinter canvas: one item per target, created when it appears, moved with coords. """
+
+    def __init__(self, game, canvas, frame=33):
+
+        self.game = game
+        self.canvas = canvas
+        self.frame_ms = frame
+        self.items = {}  # id of target -> canvas item
+        self.shown_points = None
+        canvas.create_text(w/2, h/16, text=f"{game.count} squares: green +1 p, red -2 p", font="Times 20")
+        self.points_item = canvas.create_text(w/2, h/8, text="", font="Times 40 bold")
+        canvas.bind('<Button-1>', self.click)
+
+    def frame(self):
+        """ Moves the game by one frame, draws it and schedules the next frame """
+
+        self.game.step(self.frame_ms)
+        self.draw()
+        self.canvas.after(self.frame_ms, self.frame)
+
+    def draw(self):
+
+        game = self.game
+        canvas = self.canvas
+        for key in game.removed:
+            item = self.items.pop(key, None)
+            if item is not None:
+                canvas.delete(item)
+        for key in game.spawned:
+            target = game.targets.get(key)
+            if target is not None:
+                self.items[key] = canvas.create_rectangle(0, 0, 0, 0, fill="red" if target.is_poisoned else "green")
+        del game.removed[:], game.spawned[:]
+
+        for key, item in self.items.items():
+            target = game.targets[key]
+            canvas.coords(item, target.x - target.r, target.y - target.r, target.x + target.r, target.y + target.r)
+
+        if self.shown_points != game.points:
+            canvas.itemconfigure(self.points_item, text=f"Points: {game.points}")
+            self.shown_points = game.points
+
+    def click(self, event):
+
+        self.game.click(event.x, event.y)
+
+
+def run_command(argv):
+    """
+    Runs the game in command line mode (headless simulation instead of the window).
+
+    :param argv: command line arguments without the name of the program
+    """
+
+    parser = argparse.ArgumentParser(prog="squares-tkinter-game.py")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    simulate = commands.add_parser("simulate", help="play scripted sessions headless (balance testing)")
+    simulate.add_argument("--sessions", type=int, default=10000)
+    simulate.add_argument("--accuracy", default="0.7,0.8,0.9,1.0",
+                          help="comma separated probabilities of clicking green square")
+    simulate.add_argument("--reaction", type=float, default=350, help="average reaction time (ms)")
+    simulate.add_argument("--mistakes", type=float, default=0.05, help="probability of clicking red square")
+    simulate.add_argument("--max-time", type=float, default=300, help="seconds of game before the session ends")
+    simulate.add_argument("--seed", type=int, default=0)
+
+    render = commands.add_parser("render", help="Tk calls and time per tick of redrawing and retained drawing")
+    render.add_argument("--ticks", type=int, default=2000)
+    render.add_argument("--seed", type=int, default=0)
+
+    swarm = commands.add_parser("swarm", help="play many-target mode (many moving squares at once)")
+    swarm.add_argument("--targets", type=int, default=500)
+    swarm.add_argument("--seed", type=int, default=None)
+
+    clicks = commands.add_parser("clicks", help="time of resolving a click against many targets")
+    clicks.add_argument("--targets", default="100,1000,5000,20000", help="comma separated numbers of targets")
+    clicks.add_argument("--clicks", type=int, default=20000)
+    clicks.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "simulate":
+        print(f"{'accuracy':>8} {'win rate':>8} {'s to win':>8} {'levels reached (level: sessions)':>34} "
+              f"{'sessions/s':>10} {'speedup':>8}")
+        for accuracy in [float(value) for value in args.accuracy.split(',')]:
+            stats = simulate_sessions(args.sessions, reaction_player(accuracy, args.reaction, args.mistakes),
+                                      args.max_time * 1000, args.seed)
+            levels = ", ".join(f"{level}: {count}" for level, count in stats['levels'].items())
+            print(f"{accuracy:>8.2f} {stats['win_rate']:>8.1%} {stats['seconds_to_win']:>8.1f} {levels:>34} "
+                  f"{stats['sessions_per_second']:>10.0f} {stats['speedup']:>7.0f}x")
+
+    elif args.command == "render":
+        results, drawn = benchmark_render(args.ticks, args.seed)
+        print(f"{'mode':>8} {'Tk calls/tick':>13} {'ms/tick':>8}")
+        for mode, (calls, milliseconds) in results.items():
+            print(f"{mode:>8} {calls:>13.1f} {milliseconds:>8.3f}")
+        if not drawn:
+            print("\nno display, Tk calls were only counted (time is without Tk)")
+
+    elif args.command == "clicks":
+        print(f"{'targets':>8} {'hash us/click':>13} {'scan us/click':>13} {'speedup':>8} {'us/step':>9}")
+        for count, hashed, scanned, step in benchmark_clicks([int(value) for value in args.targets.split(',')],
+                                                             args.clicks, args.seed):
+            print(f"{count:>8} {hashed:>13.2f} {scanned:>13.2f} {scanned / hashed:>7.0f}x {step:>9.0f}")
+
+    elif args.command == "swarm":
+        canvas = tkinter.Canvas(width=w, height=h)
+        canvas.pack()
+        SwarmView(SwarmGame(args.targets, args.seed), canvas).frame()
+        canvas.mainloop()
+
+
+def main():
+
+    canvas = tkinter.Canvas(width=w, height=h)
+    canvas.pack()
+    view = SquaresView(SquaresGame(), canvas)
+    view.rect()
+    canvas.mainloop()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        run_command(sys.argv[1:])
+    else:
+        main()